@@ -0,0 +1,76 @@
+"""
+Deduplicação das entregas de atividades do Bot Framework.
+
+Os canais reenviam uma atividade quando a resposta HTTP demora; sem memória
+dos IDs já vistos, cada reenvio iniciaria outra conversa no Genie e outra
+execução no SQL warehouse. ``ActivityDeduplicator`` guarda, por uma janela de
+tempo e até um número máximo de entradas, as chaves (conversa, atividade)
+já recebidas, para que os reenvios sejam descartados antes de qualquer
+chamada ao Genie.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+
+class ActivityDeduplicator:
+    """Índice limitado e com janela de tempo das atividades já recebidas"""
+
+    def __init__(self, window: float = 600, max_size: int = 10000):
+        self.window = window
+        self.max_size = max_size
+        # (conversation_id, activity_id) -> [recebida_em, em_andamento]
+        self._seen: "OrderedDict[Tuple[str, str], list]" = OrderedDict()
+        self.checked = 0
+        self.duplicates = 0
+        self.duplicates_in_flight = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def begin(self, conversation_id: str, activity_id: str) -> bool:
+        """Registra a atividade. Retorna False se ela já foi recebida dentro da janela."""
+        now = time.monotonic()
+        self._expire(now)
+        self.checked += 1
+        key = (conversation_id, activity_id)
+        entry = self._seen.get(key)
+        if entry is not None:
+            self.duplicates += 1
+            if entry[1]:
+                self.duplicates_in_flight += 1
+            return False
+        self._seen[key] = [now, True]
+        while len(self._seen) > self.max_size:
+            self._seen.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    def end(self, conversation_id: str, activity_id: str, failed: bool = False):
+        """Marca a atividade como concluída; se falhou, um reenvio poderá processá-la de novo"""
+        key = (conversation_id, activity_id)
+        if failed:
+            self._seen.pop(key, None)
+            return
+        entry = self._seen.get(key)
+        if entry is not None:
+            entry[1] = False
+
+    def _expire(self, now: float):
+        cutoff = now - self.window
+        while self._seen:
+            key, (received_at, _) = next(iter(self._seen.items()))
+            if received_at > cutoff:
+                break
+            del self._seen[key]
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "tracked": len(self._seen),
+            "checked": self.checked,
+            "duplicates": self.duplicates,
+            "duplicates_in_flight": self.duplicates_in_flight,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,96 @@
+"""
+Controle de admissão das perguntas de dados.
+
+Cada pergunta ocupa o Genie e o SQL warehouse por segundos ou minutos. Em um
+pico de tráfego, aceitar tudo só aumenta a fila e o consumo de memória até as
+requisições expirarem. ``AdmissionController`` limita quantas perguntas rodam
+ao mesmo tempo, quantas podem esperar por uma vaga e por quanto tempo; acima
+disso a pergunta é recusada na hora, para que o bot responda "ocupado" em vez
+de deixar o usuário esperando um timeout. Comandos e feedbacks não passam por
+aqui, então nunca ficam presos atrás das perguntas.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """A pergunta não foi admitida: fila cheia ou espera longa demais"""
+
+
+class AdmissionController:
+    """Semáforo com fila limitada e tempo máximo de espera, em ordem de chegada"""
+
+    def __init__(self, max_running: int = 50, max_queued: int = 200, max_wait: float = 30.0):
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.max_wait = max_wait
+        self.running = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """Aguarda uma vaga; levanta AdmissionRejected se não houver como admitir"""
+        await self._acquire()
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self):
+        if self.running < self.max_running and not self._waiters:
+            self.running += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queued:
+            self.rejected += 1
+            logger.warning("Pergunta recusada: %d em execução e %d na fila", self.running, len(self._waiters))
+            raise AdmissionRejected("fila cheia")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.max_wait)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # A vaga chegou junto com o timeout/cancelamento: devolve para o próximo
+                self._release()
+            else:
+                future.cancel()
+                self._waiters.remove(future)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                logger.warning("Pergunta recusada após esperar %.0fs por uma vaga", self.max_wait)
+                raise AdmissionRejected("tempo de espera esgotado") from None
+            raise
+        self.admitted += 1
+
+    def _release(self):
+        # A vaga passa direto para o próximo da fila, sem voltar ao contador
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.running -= 1
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "running": self.running,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
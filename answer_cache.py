@@ -0,0 +1,103 @@
+"""
+Cache de respostas para perguntas repetidas.
+
+Muitas conversas começam com as mesmas perguntas (por exemplo as de
+SAMPLE_QUESTIONS). Para essas, a resposta já formatada por
+``process_query_results`` é guardada por um tempo limitado, evitando uma
+nova ida ao Genie e ao SQL warehouse. O cache só deve ser usado no início de
+uma conversa, quando não há contexto de perguntas anteriores.
+
+As entradas expiram pelo TTL e são descartadas de uma vez com ``invalidate``
+quando a configuração do espaço do Genie muda (ver ``ReadinessProbe``).
+Mudanças nos dados das tabelas não são detectáveis daqui: para elas vale o TTL.
+"""
+
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+# Prefixo "[Nome] " que identifica o autor da pergunta enviada ao Genie
+_NAME_PREFIX = re.compile(r"^\s*\[[^\]]*\]\s*")
+
+
+def normalize_question(question: str) -> str:
+    """Normaliza o texto da pergunta para uso como chave do cache"""
+    text = _NAME_PREFIX.sub("", question)
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = _WHITESPACE.sub(" ", text).strip()
+    return text.rstrip(" ?!.;")
+
+
+class AnswerCache:
+    """Cache LRU com expiração e limite de tamanho total em bytes"""
+
+    def __init__(self, ttl: float = 900, max_entries: int = 500, max_bytes: int = 5_000_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # chave -> (resposta, statement_id, tamanho em bytes, expira_em)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, Optional[str], int, float]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, space_id: str, question: str) -> Optional[Tuple[str, Optional[str]]]:
+        """(resposta, statement_id) em cache, ou None"""
+        key = (space_id, normalize_question(question))
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        response, statement_id, size, expires_at = entry
+        if time.monotonic() > expires_at:
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return response, statement_id
+
+    def set(self, space_id: str, question: str, response: str, statement_id: Optional[str] = None):
+        """Guarda a resposta e a instrução que a gerou, usada pelo comando ``export``"""
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        key = (space_id, normalize_question(question))
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (response, statement_id, size, time.monotonic() + self.ttl)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, space_id: Optional[str] = None):
+        """Descarta as respostas em cache (de um space ou de todos), ex.: após o espaço ser alterado"""
+        keys = [key for key in self._entries if space_id is None or key[0] == space_id]
+        for key in keys:
+            self._remove(key)
+        logger.info("Cache de respostas invalidado: %d entradas removidas", len(keys))
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, key: Tuple[str, str]):
+        _, _, size, _ = self._entries.pop(key)
+        self._bytes -= size
@@ -4,19 +4,17 @@ python3 -m aiohttp.web -H 0.0.0.0 -P 8000 app:init_func
 
 """
 
-from asyncio.log import logger
 import os
-import json
 import logging
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
 load_dotenv()
 from aiohttp import web
-from databricks.sdk import WorkspaceClient
-from databricks.sdk.service.dashboards import GenieAPI
+from databricks.sdk.service.dashboards import GenieAttachment, GenieMessage
+from databricks.sdk.service.sql import StatementResponse
 import asyncio
 import sys
-import traceback
+import time
 from datetime import datetime, timezone, timedelta
 from http import HTTPStatus
 from aiohttp.web import Request, Response, json_response
@@ -37,45 +35,51 @@ from botbuilder.schema import (
     ActivityTypes,
     ChannelAccount,
     InvokeResponse,
+    Attachment,
 )
-import requests
-import re
+from botbuilder.schema.teams import FileConsentCard, FileConsentCardResponse, FileInfoCard
+from botframework.connector.auth import ClaimsIdentity
 
 from config import DefaultConfig
+from genie_client import AsyncGenieClient, StatusCallback
+from http_client import create_http_session
+from feedback_ledger import FeedbackLedger
+from feedback_queue import FeedbackQueue
+from answer_cache import AnswerCache
+from genie_answer import GenieAnswer
+from result_renderer import render_table
+from statement_reader import StatementResultReader
+from result_export import EXPORT_FORMATS, ExportError, ResultExporter
+from session_store import UserSession, create_session_store
+from single_flight import Flight, UserLaneFull, UserLaneTimeout, UserSingleFlight
+from admission import AdmissionController, AdmissionRejected
+from background_tasks import BackgroundTasks
+from activity_dedup import ActivityDeduplicator
+from conversation_warmer import ConversationWarmer
+from log_config import setup_logging
+from readiness import ReadinessProbe
+from metrics import (
+    COMPONENT_STAT,
+    EXECUTOR_QUEUE_DEPTH,
+    CountingThreadPoolExecutor,
+    FEEDBACK_TOTAL,
+    GENIE_CIRCUIT_STATE,
+    IN_FLIGHT,
+    REGISTRY,
+    SESSIONS,
+    STAGE_SECONDS,
+)
 
 
 CONFIG = DefaultConfig()
 
+# Logs escritos por uma thread própria, fora do loop de eventos
+LOG_PIPELINE = setup_logging(CONFIG)
+logger = logging.getLogger(__name__)
+
+# Substitui o executor padrão do loop em _on_startup, para que /metrics veja a fila dele
+DEFAULT_EXECUTOR = CountingThreadPoolExecutor(thread_name_prefix="asyncio")
 
-class UserSession:
-    """Representa uma sessão de usuário"""
-    def __init__(self, user_id: str, name: str = None):
-        self.user_id = user_id  # Teams user ID
-        self.name = name or "Usuario"
-        self.conversation_id = None
-        self.created_at = datetime.now(timezone.utc)
-        self.last_activity = datetime.now(timezone.utc)
-        self.is_authenticated = True  # Always true for Teams users
-        self.user_context = {}
-    
-    def update_activity(self):
-        """Atualize o registro de data e hora da última atividade."""
-        self.last_activity = datetime.now(timezone.utc)
-    
-    def to_dict(self):
-        """Converta a sessão em dicionário para registro/debug"""
-        return {
-            "user_id": self.user_id,
-            "name": self.name,
-            "conversation_id": self.conversation_id,
-            "created_at": self.created_at.isoformat(),
-            "last_activity": self.last_activity.isoformat(),
-            "is_authenticated": self.is_authenticated
-        }
-    
-    def get_display_name(self):
-        """Pega um nome de exibição amigável para o usuário."""
-        return f"{self.name} ({self.user_id})"
 
 # Para desenvolvimento local com o Bot Framework Emulator, use BotFrameworkAdapter
 if CONFIG.APP_ID and CONFIG.APP_PASSWORD:
@@ -91,8 +95,7 @@ async def on_error(context: TurnContext, error: Exception):
     # Esta verificação escreve erros no console em vez de no Application Insights.
     # NOTA: Em ambiente de produção, você deve considerar registrar isso no Azure
     #       Application Insights.
-    logger.error(f"Erro inesperado no bot: {str(error)}")
-    traceback.print_exc()
+    logger.error("Erro inesperado no bot: %s", error, exc_info=error)
 
     # Não envie mensagens de erro para os usuários - apenas registre o erro
     # Isso evita que a mensagem "bot encontrou um erro" apareça
@@ -101,205 +104,385 @@ async def on_error(context: TurnContext, error: Exception):
 
 ADAPTER.on_turn_error = on_error
 
-# Inicializar o cliente Databricks com tratamento de erros.
-def get_databricks_client():
-    """Obtenha o WorkspaceClient do Databricks com tratamento adequado de erros"""
-    try:
-        # Depurar carregamento de variáveis de ambiente
-        logger.info(f"Carregando configuração do Databricks...")
-        logger.info(f"DATABRICKS_HOST: {CONFIG.DATABRICKS_HOST}")
-        logger.info(f"DATABRICKS_TOKEN present: {bool(CONFIG.DATABRICKS_TOKEN)}")
-        logger.info(f"DATABRICKS_TOKEN length: {len(CONFIG.DATABRICKS_TOKEN) if CONFIG.DATABRICKS_TOKEN else 0}")
-        
-        if not CONFIG.DATABRICKS_TOKEN:
-            raise ValueError("DATABRICKS_TOKEN variável de ambiente não está definida.")
-        
-        client = WorkspaceClient(
-            host=CONFIG.DATABRICKS_HOST, 
-            token=CONFIG.DATABRICKS_TOKEN
-        )
-        logger.info("Cliente Databricks inicializado com sucesso")
-        return client
-    except Exception as e:
-        logger.error(f"Falha ao inicializar o cliente Databricks: {str(e)}")
-        raise
-
 # Inicializar clientes
-workspace_client = get_databricks_client()
-genie_api = GenieAPI(workspace_client.api_client)
+genie_client = AsyncGenieClient(
+    host=CONFIG.DATABRICKS_HOST,
+    token=CONFIG.DATABRICKS_TOKEN,
+    max_concurrency=CONFIG.GENIE_MAX_CONCURRENCY,
+    pool_size=CONFIG.GENIE_HTTP_POOL_SIZE,
+    request_timeout=CONFIG.GENIE_REQUEST_TIMEOUT,
+    message_timeout=CONFIG.GENIE_MESSAGE_TIMEOUT,
+    poll_options={
+        "initial_interval": CONFIG.GENIE_POLL_INITIAL_INTERVAL,
+        "max_interval": CONFIG.GENIE_POLL_MAX_INTERVAL,
+        "backoff_factor": CONFIG.GENIE_POLL_BACKOFF_FACTOR,
+        "slow_status_interval": CONFIG.GENIE_POLL_SLOW_STATUS_INTERVAL,
+        "jitter": CONFIG.GENIE_POLL_JITTER,
+    },
+    breaker_options={
+        "window": CONFIG.GENIE_BREAKER_WINDOW_SECONDS,
+        "min_calls": CONFIG.GENIE_BREAKER_MIN_CALLS,
+        "failure_rate": CONFIG.GENIE_BREAKER_FAILURE_RATE,
+        "open_seconds": CONFIG.GENIE_BREAKER_OPEN_SECONDS,
+        "acl_open_seconds": CONFIG.GENIE_BREAKER_ACL_OPEN_SECONDS,
+        "half_open_probes": CONFIG.GENIE_BREAKER_HALF_OPEN_PROBES,
+    },
+)
+
+# Busca os blocos seguintes de resultados grandes, só até o necessário para a resposta
+result_reader = StatementResultReader(genie_client, max_concurrency=CONFIG.RESULT_FETCH_CONCURRENCY)
+
+# Token aceito e SQL warehouse acessível (rota /readyz), verificado em segundo plano na inicialização
+readiness = ReadinessProbe(
+    genie_client,
+    CONFIG.DATABRICKS_SPACE_ID,
+    warehouse_id=CONFIG.DATABRICKS_WAREHOUSE_ID,
+    cache_seconds=CONFIG.READINESS_CACHE_SECONDS,
+    retry_interval=CONFIG.READINESS_RETRY_SECONDS,
+)
 
 
 async def ask_genie(
-    question: str, space_id: str, user_session: UserSession, conversation_id: Optional[str] = None
-) -> tuple[str, str, str]:
+    question: str,
+    space_id: str,
+    user_session: UserSession,
+    conversation_id: Optional[str] = None,
+    on_status: Optional[StatusCallback] = None,
+) -> tuple[GenieAnswer, str, str]:
     try:
         # Adicionar contexto do usuário à pergunta para melhor rastreamento no Databricks
         contextual_question = f"[{user_session.name}] {question}"
         
-        loop = asyncio.get_running_loop()
+        stage_started = time.perf_counter()
         if conversation_id is None:
             # Iniciar uma nova conversa
-            initial_message = await loop.run_in_executor(
-                None, genie_api.start_conversation_and_wait, space_id, contextual_question
+            initial_message = await genie_client.start_conversation_and_wait(
+                space_id, contextual_question, on_status
             )
             conversation_id = initial_message.conversation_id
         else:
             # Continuar conversa existente com uma nova mensagem
-            initial_message = await loop.run_in_executor(
-                None, genie_api.create_message_and_wait, space_id, conversation_id, contextual_question
+            initial_message = await genie_client.create_message_and_wait(
+                space_id, conversation_id, contextual_question, on_status
             )
-           
-        query_result = None
-        if initial_message.query_result is not None:
-            query_result = await loop.run_in_executor(
-                None,
-                genie_api.get_message_attachment_query_result,
-                #genie_api.get_message_query_result,
-                space_id,
-                initial_message.conversation_id,
-                initial_message.message_id,
-                initial_message.attachments[0].attachment_id,
-           )
-        message_content = await loop.run_in_executor(
-            None,
-            genie_api.get_message,
-            space_id,
-            initial_message.conversation_id,
-            initial_message.message_id,
+        genie_seconds = time.perf_counter() - stage_started
+        STAGE_SECONDS.observe(genie_seconds, stage="genie")
+
+        # A mensagem concluída já traz os anexos (consulta, descrição e texto),
+        # então não é preciso buscá-la novamente com get_message.
+        attachments = initial_message.attachments or []
+        query_attachment = next((a for a in attachments if a.query), None)
+
+        stage_started = time.perf_counter()
+        results = None
+        row_chunks = []
+        if query_attachment is not None or initial_message.query_result is not None:
+            if on_status is not None:
+                notified = on_status(FETCHING_RESULTS_STATUS)
+                if asyncio.iscoroutine(notified):
+                    await notified
+            with STAGE_SECONDS.time(stage="statement"):
+                results = await _fetch_statement_results(space_id, initial_message, query_attachment)
+            if results is not None and results.manifest:
+                with STAGE_SECONDS.time(stage="chunks"):
+                    row_chunks = await result_reader.read(results, max_rows=CONFIG.RESULT_MAX_ROWS)
+        fetch_seconds = time.perf_counter() - stage_started
+        STAGE_SECONDS.observe(fetch_seconds, stage="fetch")
+        logger.info(
+            "Tempos do ask_genie para %s: genie=%.3fs fetch=%.3fs",
+            user_session.get_display_name(), genie_seconds, fetch_seconds,
+            extra={"event": "ask_genie_timings"},
         )
-        if query_result and query_result.statement_response:
-            results = await loop.run_in_executor(
-                None,
-                workspace_client.statement_execution.get_statement,
-                query_result.statement_response.statement_id,
-            )
 
+        if results is not None and results.manifest:
             query_description = ""
-            for attachment in message_content.attachments:
-                if attachment.query and attachment.query.description:
-                    query_description = attachment.query.description
-                    break
+            if query_attachment and query_attachment.query.description:
+                query_description = query_attachment.query.description
 
+            schema = results.manifest.schema
             return (
-                json.dumps(
-                    {
-                        "columns": results.manifest.schema.as_dict(),
-                        "data": results.result.as_dict(),
-                        "query_description": query_description,
-                    }
+                GenieAnswer(
+                    columns=(schema.columns if schema else None) or [],
+                    row_chunks=row_chunks,
+                    total_rows=results.manifest.total_row_count,
+                    description=query_description,
+                    statement_id=results.statement_id,
                 ),
                 conversation_id,
                 initial_message.message_id,
             )
 
-        if message_content.attachments:
-            for attachment in message_content.attachments:
-                if attachment.text and attachment.text.content:
-                    return (
-                        json.dumps({"message": attachment.text.content}),
-                        conversation_id,
-                        initial_message.message_id,
-                    )
+        for attachment in attachments:
+            if attachment.text and attachment.text.content:
+                return (
+                    GenieAnswer(text=attachment.text.content),
+                    conversation_id,
+                    initial_message.message_id,
+                )
 
-        return json.dumps({"message": message_content.content}), conversation_id, initial_message.message_id
+        return GenieAnswer(text=initial_message.content), conversation_id, initial_message.message_id
     except Exception as e:
         error_str = str(e).lower()  # Converter para minúsculas para correspondência sem distinção entre maiúsculas e minúsculas
         error_original = str(e)  # Manter original para registro
-        logger.error(f"Erro em ask_genie para o usuário {user_session.get_display_name()}: {error_original}")
+        logger.error("Erro em ask_genie para o usuário %s: %s", user_session.get_display_name(), error_original)
         
     
         if "ip acl" in error_str and "blocked" in error_str:
-            logger.error(f"Bloqueio de IP ACL detectado: {error_original}")
+            logger.error("Bloqueio de IP ACL detectado: %s", error_original)
             return (
-                json.dumps({
-                    "error": "⚠️ **Acesso IP Bloqueado**\n\n"
-                            "O endereço IP do bot está bloqueado pelas Listas de Controle de Acesso (ACLs) de IP da Conta Databricks.\n\n"
-                            "**Ação do Administrador Necessária:**\n"
-                            "Verificar a documentação TROUBLESHOOTING.md para instruções sobre como adicionar "
-                            "o endereço IP do bot à lista de permissões de IP da sua Conta Databricks."
-                }),
+                GenieAnswer.from_error(
+                    "⚠️ **Acesso IP Bloqueado**\n\n"
+                    "O endereço IP do bot está bloqueado pelas Listas de Controle de Acesso (ACLs) de IP da Conta Databricks.\n\n"
+                    "**Ação do Administrador Necessária:**\n"
+                    "Verificar a documentação TROUBLESHOOTING.md para instruções sobre como adicionar "
+                    "o endereço IP do bot à lista de permissões de IP da sua Conta Databricks."
+                ),
                 conversation_id,
                 None,
             )
         
         # Erro genérico para outros casos
         return (
-            json.dumps({"error": "Ocorreu um erro ao processar sua solicitação."}),
+            GenieAnswer.from_error("Ocorreu um erro ao processar sua solicitação."),
             conversation_id,
             None,
         )
 
 
-def process_query_results(answer_json: Dict) -> str:
-    response = ""
-    if "query_description" in answer_json and answer_json["query_description"]:
-        response += f"\n\n{answer_json['query_description']}\n\n"
-
-    if "columns" in answer_json and "data" in answer_json:
-        response += "\n"
-        columns = answer_json["columns"]
-        data = answer_json["data"]
-        if isinstance(columns, dict) and "columns" in columns:
-            header = "| " + " | ".join(col["name"] for col in columns["columns"]) + " |"
-            separator = "|" + "|".join(["---" for _ in columns["columns"]]) + "|"
-            response += header + "\n" + separator + "\n"
-            for row in data["data_array"]:
-                formatted_row = []
-                for value, col in zip(row, columns["columns"]):
-                    if value is None:
-                        formatted_value = "NULL"
-                    elif col["type_name"] in ["DECIMAL", "DOUBLE", "FLOAT"]:
-                        formatted_value = f"{float(value):,.2f}"
-                    elif col["type_name"] in ["INT", "BIGINT", "LONG"]:
-                        formatted_value = f"{int(value):,}"
-                    else:
-                        formatted_value = str(value)
-                    formatted_row.append(formatted_value)
-                response += "| " + " | ".join(formatted_row) + " |\n"
-        else:
-            response += f"Formato de coluna inesperado: {columns}\n\n"
-    elif "error" in answer_json:
-        response += f"{answer_json['error']}\n\n"
-    elif "message" in answer_json:
-        response += f"{answer_json['message']}\n\n"
+async def _fetch_statement_results(
+    space_id: str, message: GenieMessage, query_attachment: Optional[GenieAttachment]
+) -> Optional[StatementResponse]:
+    """Busca o resultado da consulta SQL de uma mensagem concluída.
+
+    O endpoint de query-result já devolve o manifesto e o primeiro bloco de dados,
+    então ``get_statement`` só é chamado quando o manifesto não vem embutido.
+    Os demais blocos são lidos depois por ``result_reader``.
+    """
+    if query_attachment is None:
+        # API legada: apenas o ID da instrução vem na mensagem
+        return await genie_client.get_statement(message.query_result.statement_id)
+
+    query_result = await genie_client.get_message_attachment_query_result(
+        space_id,
+        message.conversation_id,
+        message.message_id,
+        query_attachment.attachment_id,
+    )
+    statement = query_result.statement_response
+    if statement is not None and statement.manifest is None and statement.statement_id:
+        statement = await genie_client.get_statement(statement.statement_id)
+    return statement
+
+
+def process_query_results(answer: GenieAnswer) -> str:
+    parts = []
+    if answer.description:
+        parts.append(f"\n\n{answer.description}\n\n")
+
+    if answer.has_table:
+        parts.append("\n")
+        parts.append(
+            render_table(
+                answer.columns,
+                answer.rows(),
+                total_rows=answer.total_rows if answer.total_rows is not None else answer.row_count,
+                max_rows=CONFIG.RESULT_MAX_ROWS,
+                max_bytes=CONFIG.RESULT_MAX_BYTES,
+            )
+        )
+    elif answer.error is not None:
+        parts.append(f"{answer.error}\n\n")
+    elif answer.text:
+        parts.append(f"{answer.text}\n\n")
     else:
-        response += "Nenhum dado disponível.\n\n"
-
-    return response
+        parts.append("Nenhum dado disponível.\n\n")
+
+    return "".join(parts)
+
+
+# Etapa extra reportada após a conclusão da mensagem, enquanto os dados são buscados
+FETCHING_RESULTS_STATUS = "FETCHING_RESULTS"
+
+# Textos do placeholder exibido enquanto a pergunta é processada
+PROGRESS_MESSAGES = {
+    "THINKING": "🤔 Pensando…",
+    "SUBMITTED": "🤔 Pensando…",
+    "FETCHING_METADATA": "🔎 Analisando os dados disponíveis…",
+    "FILTERING_CONTEXT": "🔎 Analisando os dados disponíveis…",
+    "ASKING_AI": "✍️ Gerando a consulta SQL…",
+    "PENDING_WAREHOUSE": "⏳ Aguardando o SQL warehouse…",
+    "EXECUTING_QUERY": "⚙️ Executando a consulta…",
+    FETCHING_RESULTS_STATUS: "📥 Buscando os resultados…",
+}
+
+
+class ProgressMessage:
+    """Mensagem provisória atualizada no lugar conforme o Genie avança"""
+    def __init__(self, turn_context: TurnContext, header: str):
+        self.turn_context = turn_context
+        self.header = header
+        self.activity_id = None
+        self._sent = False
+        self._last_text = None
+        self._finished = False
+        # Garante que as atualizações cheguem ao canal na ordem em que foram geradas
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        """Envia o indicador de digitação e o placeholder inicial"""
+        try:
+            await self.turn_context.send_activity(Activity(type=ActivityTypes.typing))
+        except Exception as e:
+            logger.warning("Falha ao enviar indicador de digitação: %s", e)
+        async with self._lock:
+            await self._write(f"{self.header}\n\n{PROGRESS_MESSAGES['THINKING']}")
+
+    async def update(self, status):
+        """Atualiza o placeholder com o texto do novo status do Genie"""
+        text = PROGRESS_MESSAGES.get(getattr(status, "value", status))
+        if not text:
+            return
+        async with self._lock:
+            if not self._finished:
+                await self._write(f"{self.header}\n\n{text}")
+
+    async def finish(self, response: str):
+        """Substitui o placeholder pela resposta final"""
+        async with self._lock:
+            self._finished = True
+            if not await self._write(response):
+                # O canal não aceitou a atualização: envia a resposta como nova mensagem
+                await self.turn_context.send_activity(response)
+
+    async def _write(self, text: str) -> bool:
+        if text == self._last_text:
+            return True
+        try:
+            if not self._sent:
+                resource = await self.turn_context.send_activity(text)
+                self._sent = True
+                self.activity_id = resource.id if resource else None
+            elif self.activity_id is None:
+                # O canal não devolveu o ID do placeholder, então não há como atualizá-lo
+                return False
+            else:
+                await self.turn_context.update_activity(
+                    Activity(id=self.activity_id, type=ActivityTypes.message, text=text)
+                )
+            self._last_text = text
+            return True
+        except Exception as e:
+            logger.warning("Falha ao atualizar a mensagem de progresso: %s", e)
+            return False
 
 
 class MyBot(ActivityHandler):
     def __init__(self):
-        self.user_sessions: Dict[str, UserSession] = {}  # Mapeia o ID do usuário do Teams para UserSession
-        self.message_feedback: Dict[str, Dict] = {}  # Rastreia feedback para cada mensagem
+        # Mapeia o ID do usuário do Teams para UserSession (memória, SQLite ou Redis)
+        self.user_sessions = create_session_store(CONFIG)
+        # Registro persistente dos feedbacks; em memória fica só uma janela recente
+        self.feedback_ledger = FeedbackLedger(
+            CONFIG.FEEDBACK_LEDGER_PATH, recent_size=CONFIG.FEEDBACK_RECENT_WINDOW
+        )
+        # Envio dos feedbacks ao Genie em segundo plano, com novas tentativas
+        self.feedback_queue = FeedbackQueue(
+            self._deliver_feedback,
+            workers=CONFIG.FEEDBACK_QUEUE_WORKERS,
+            max_size=CONFIG.FEEDBACK_QUEUE_MAX_SIZE,
+            max_retries=CONFIG.FEEDBACK_MAX_RETRIES,
+            dead_letter_path=CONFIG.FEEDBACK_DEAD_LETTER_PATH,
+        )
+        # Limite global de perguntas de dados em execução e na fila; comandos e feedbacks não passam por ele
+        self.admission = AdmissionController(
+            max_running=CONFIG.ADMISSION_MAX_RUNNING,
+            max_queued=CONFIG.ADMISSION_MAX_QUEUED,
+            max_wait=CONFIG.ADMISSION_MAX_WAIT_SECONDS,
+        )
+        # Perguntas respondidas como mensagens proativas (ENABLE_PROACTIVE_RESPONSES)
+        self.background_tasks = BackgroundTasks(max_tasks=CONFIG.PROACTIVE_MAX_TASKS)
+        # IDs das atividades já recebidas, para descartar reenvios dos canais
+        self.activity_dedup = ActivityDeduplicator(
+            window=CONFIG.ACTIVITY_DEDUP_WINDOW_SECONDS, max_size=CONFIG.ACTIVITY_DEDUP_MAX_SIZE
+        )
+        # Conversas do Genie abertas antes da primeira pergunta, quando habilitado
+        self.conversation_warmer = None
+        if CONFIG.ENABLE_CONVERSATION_PREWARM:
+            self.conversation_warmer = ConversationWarmer(
+                genie_client,
+                CONFIG.DATABRICKS_SPACE_ID,
+                max_conversations=CONFIG.PREWARM_MAX_CONVERSATIONS,
+                ttl=CONFIG.PREWARM_TTL_SECONDS,
+            )
+            logger.warning(
+                "Pré-aquecimento de conversas ativo: cada entrada ou reset envia '%s' ao Genie como pergunta real",
+                CONFIG.PREWARM_PROMPT,
+            )
+        # Fila por usuário: perguntas em ordem e reenvios idênticos agrupados
+        self.user_flights = UserSingleFlight(max_per_user=CONFIG.USER_QUEUE_MAX_SIZE)
+        # Exportação do resultado completo da última consulta (comando `export`)
+        self.result_exporter = ResultExporter(
+            genie_client,
+            result_reader,
+            export_dir=CONFIG.EXPORT_DIR or None,
+            workers=CONFIG.EXPORT_WORKERS,
+            max_rows=CONFIG.EXPORT_MAX_ROWS,
+            file_ttl=CONFIG.EXPORT_FILE_TTL_SECONDS,
+        )
+        # Respostas das perguntas de abertura mais comuns, quando habilitado
+        self.answer_cache = None
+        if CONFIG.ENABLE_ANSWER_CACHE:
+            self.answer_cache = AnswerCache(
+                ttl=CONFIG.ANSWER_CACHE_TTL_SECONDS,
+                max_entries=CONFIG.ANSWER_CACHE_MAX_ENTRIES,
+                max_bytes=CONFIG.ANSWER_CACHE_MAX_BYTES,
+            )
+
+    async def on_turn(self, turn_context: TurnContext):
+        # Reenvios de uma mensagem já recebida são descartados antes de chegar ao Genie
+        activity = turn_context.activity
+        if activity.type != ActivityTypes.message or not activity.id:
+            await super().on_turn(turn_context)
+            return
+
+        conversation_id = activity.conversation.id if activity.conversation else ""
+        if not self.activity_dedup.begin(conversation_id, activity.id):
+            logger.info("Entrega duplicada da atividade %s descartada", activity.id)
+            return
+        try:
+            await super().on_turn(turn_context)
+        except Exception:
+            self.activity_dedup.end(conversation_id, activity.id, failed=True)
+            raise
+        self.activity_dedup.end(conversation_id, activity.id)
 
     async def get_or_create_user_session(self, turn_context: TurnContext) -> UserSession:
         """Obter ou criar uma sessão de usuário com base nas informações do usuário do Teams"""
         user_id = turn_context.activity.from_property.id
         
         # Verificar se já temos uma sessão para este usuário
-        if user_id in self.user_sessions:
-            session = self.user_sessions[user_id]
-            
+        session = await self.user_sessions.get(user_id)
+        if session is not None:
             # Verificar se a conversa expirou (4 horas)
             if self._is_conversation_timed_out(session):
-                logger.info(f"Conversation timed out for user {session.get_display_name()}, resetting conversation")
+                logger.info("Conversation timed out for user %s, resetting conversation", session.get_display_name())
                 # Redefinir ID da conversa e contexto do usuário para começar do zero
                 session.conversation_id = None
                 session.user_context.pop('last_conversation_id', None)
                 # Atualizar o tempo de atividade
                 session.update_activity()
+                await self.user_sessions.set(session)
                 return session
             else:
-                # Atualizar o tempo de atividade para sessão ativa
+                # Atualizar o tempo de atividade para sessão ativa (renova também o TTL no armazenamento)
                 session.update_activity()
+                await self.user_sessions.set(session)
                 return session
         
         user_name = getattr(turn_context.activity.from_property, 'name', None) or "Usuário"
         session = UserSession(user_id, user_name)
         
-        self.user_sessions[user_id] = session
-        logger.info(f"Sessão automática criada para: {user_name}")
+        await self.user_sessions.set(session)
+        logger.info("Sessão automática criada para: %s", user_name)
         
         return session 
 
@@ -402,10 +585,12 @@ class MyBot(ActivityHandler):
 
     async def on_message_activity(self, turn_context: TurnContext):
         # Registro de depuração para todas as atividades de mensagem
-        logger.info(f"Tipo de atividade de mensagem: {turn_context.activity.type}")
-        logger.info(f"Nome da atividade de mensagem: {turn_context.activity.name}")
-        logger.info(f"Valor da atividade de mensagem: {turn_context.activity.value}")
-        logger.info(f"Texto da atividade de mensagem: {turn_context.activity.text}")
+        # O texto do usuário vai em um campo próprio, mascarado a menos que LOG_USER_TEXT esteja ativo
+        logger.debug(
+            "Atividade de mensagem recebida: %s",
+            turn_context.activity.id,
+            extra={"event": "message_received", "user_text": turn_context.activity.text},
+        )
         
         # Lida com casos onde o campo de texto pode ser None (ex: cliques em cartões)
         if not turn_context.activity.text:
@@ -413,7 +598,7 @@ class MyBot(ActivityHandler):
             if turn_context.activity.value and isinstance(turn_context.activity.value, dict):
                 action = turn_context.activity.value.get("action")
                 if action == "feedback":
-                    logger.info("Detectado clique no botão de feedback do cartão adaptativo na atividade de mensagem")
+                    logger.debug("Detectado clique no botão de feedback do cartão adaptativo na atividade de mensagem")
                     # Lida com o envio de feedback
                     try:
                         message_id = turn_context.activity.value.get("messageId")
@@ -424,33 +609,18 @@ class MyBot(ActivityHandler):
                             logger.error("Dados de feedback obrigatórios ausentes na atividade de mensagem")
                             return
                         
-                        # Armazenar dados de feedback
-                        feedback_key = f"{user_id}_{message_id}"
-                        user_session = self.user_sessions.get(user_id)
-                        self.message_feedback[feedback_key] = {
-                            "message_id": message_id,
-                            "user_id": user_id,
-                            "feedback": feedback,
-                            "conversation_id": user_session.conversation_id if user_session else None,
-                            "timestamp": datetime.now(timezone.utc).isoformat(),
-                            "user_session": user_session.to_dict() if user_session else None
-                        }
-                        
-                        # Enviar feedback para a API Databricks Genie
-                        try:
-                            await self._send_feedback_to_api(feedback_key, self.message_feedback[feedback_key])
-                            
+                        # Registrar o feedback (cliques repetidos não são reenviados);
+                        # o envio para a API Databricks Genie acontece em segundo plano
+                        if await self._submit_feedback(message_id, user_id, feedback):
                             # Enviar mensagem de agradecimento
                             await turn_context.send_activity("✅ Obrigado pelo seu feedback!")
-                            
-                        except Exception as e:
-                            logger.error(f"Falha ao enviar feedback para a API Genie: {str(e)}")
+                        else:
                             await turn_context.send_activity("❌ Falha ao enviar feedback. Por favor, tente novamente.")
                         
                         return
                         
                     except Exception as e:
-                        logger.error(f"Erro ao lidar com feedback na atividade de mensagem: {str(e)}")
+                        logger.error("Erro ao lidar com feedback na atividade de mensagem: %s", e)
                         return
             
             logger.info("Atividade de mensagem recebida sem conteúdo de texto, ignorando")
@@ -471,8 +641,99 @@ class MyBot(ActivityHandler):
         if await self._handle_special_commands(turn_context, question, user_session):
             return
         
+        # As perguntas de um mesmo usuário são respondidas em ordem, para que cada uma
+        # continue a conversa deixada pela anterior. Um reenvio idêntico de uma pergunta
+        # que ainda está em andamento aguarda a original em vez de gerar outra no Genie.
+        running = self.user_flights.join(user_session.user_id, question)
+        if running is not None:
+            logger.info("Pergunta repetida de %s anexada à que está em andamento", user_session.get_display_name())
+            if not CONFIG.ENABLE_PROACTIVE_RESPONSES:
+                await running
+            return
+
+        # O lugar na fila do usuário é reservado já aqui, antes de qualquer espera,
+        # para que a ordem e o agrupamento de reenvios valham também no modo proativo
+        try:
+            flight = self.user_flights.reserve(user_session.user_id, question)
+        except UserLaneFull as e:
+            logger.warning("Pergunta de %s recusada: %s", user_session.get_display_name(), e)
+            await self._send_busy_message(turn_context, user_session)
+            return
+
+        if CONFIG.ENABLE_PROACTIVE_RESPONSES:
+            # A requisição do Bot Connector termina aqui; a resposta é enviada depois como
+            # mensagem proativa, sem estourar o timeout do canal e provocar reenvios
+            reference = TurnContext.get_conversation_reference(turn_context.activity)
+            if not self.background_tasks.spawn(self._answer_proactively(reference, user_session, question, flight)):
+                self.user_flights.release(flight)
+                await self._send_busy_message(turn_context, user_session)
+            return
+
+        await self._process_question(turn_context, user_session, question, flight)
+
+    async def _process_question(
+        self, turn_context: TurnContext, user_session: UserSession, question: str, flight: Flight
+    ):
+        """Responde a pergunta na fila do usuário, respeitando o controle de admissão"""
+        try:
+            async with self.user_flights.run_reserved(flight, CONFIG.USER_QUEUE_MAX_WAIT_SECONDS):
+                # A pergunta anterior pode ter atualizado a sessão enquanto esta aguardava
+                user_session = await self.user_sessions.get(user_session.user_id) or user_session
+                try:
+                    async with self.admission.admit():
+                        IN_FLIGHT.inc(kind="questions")
+                        try:
+                            with STAGE_SECONDS.time(stage="answer"):
+                                await self._answer_question(turn_context, user_session, question)
+                        finally:
+                            IN_FLIGHT.dec(kind="questions")
+                except AdmissionRejected:
+                    await self._send_busy_message(turn_context, user_session)
+        except UserLaneTimeout as e:
+            logger.warning("Pergunta de %s descartada na fila do usuário: %s", user_session.get_display_name(), e)
+            await turn_context.send_activity(
+                f"**👤 {user_session.name}**\n\n"
+                "⏳ **Sua pergunta anterior ainda está em andamento.**\n\n"
+                "Por favor, envie esta pergunta novamente quando receber a resposta anterior."
+            )
+
+    async def _answer_proactively(
+        self, reference: ConversationReference, user_session: UserSession, question: str, flight: Flight
+    ):
+        """Processa a pergunta em segundo plano e responde por meio de continue_conversation"""
+        async def callback(turn_context: TurnContext):
+            await self._process_question(turn_context, user_session, question, flight)
+
+        try:
+            if CONFIG.APP_ID:
+                await ADAPTER.continue_conversation(reference, callback, CONFIG.APP_ID)
+            else:
+                # Emulador sem credenciais: o BotFrameworkAdapter exige uma identidade, que fica anônima
+                await ADAPTER.continue_conversation(
+                    reference, callback, claims_identity=ClaimsIdentity({}, True)
+                )
+        except Exception as e:
+            logger.error("Erro ao responder proativamente para %s: %s", user_session.get_display_name(), e)
+        finally:
+            # Se o callback nem chegou a rodar, a vez precisa passar para a próxima pergunta
+            self.user_flights.release(flight)
+
+    def _prewarm_conversation(self, user_session: UserSession):
+        """Abre em segundo plano a conversa do Genie que a próxima pergunta do usuário vai usar"""
+        if self.conversation_warmer is not None and user_session.conversation_id is None:
+            self.conversation_warmer.warm(user_session.user_id, f"[{user_session.name}] {CONFIG.PREWARM_PROMPT}")
+
+    async def _send_busy_message(self, turn_context: TurnContext, user_session: UserSession):
+        await turn_context.send_activity(
+            f"**👤 {user_session.name}**\n\n"
+            "⏳ **Estou com muitas solicitações no momento.**\n\n"
+            "Por favor, envie sua pergunta novamente em alguns instantes."
+        )
+
+    async def _answer_question(self, turn_context: TurnContext, user_session: UserSession, question: str):
+        """Responde a uma pergunta sobre os dados, mantendo o contexto da conversa do usuário"""
         # Verificar se a conversa foi reiniciada devido ao tempo limite (apenas para perguntas de dados, não comandos)
-        if user_session.conversation_id is None and user_session.user_id in self.user_sessions:
+        if user_session.conversation_id is None:
             # Isso significa que a conversa foi reiniciada devido ao tempo limite
             await turn_context.send_activity(
                 "⏰ **Conversa Reiniciada**\n\n"
@@ -481,10 +742,47 @@ class MyBot(ActivityHandler):
                 "Estou processando sua resposta agora!"
             )
         
+        # Perguntas de abertura repetidas são respondidas pelo cache, sem passar pelo Genie.
+        # Só vale para conversas novas: perguntas de acompanhamento dependem do contexto.
+        use_cache = self.answer_cache is not None and user_session.conversation_id is None
+        if use_cache:
+            cached = self.answer_cache.get(CONFIG.DATABRICKS_SPACE_ID, question)
+            if cached is not None:
+                cached_response, cached_statement_id = cached
+                logger.info("Resposta servida do cache para %s", user_session.get_display_name())
+                user_session.user_context['last_question'] = question
+                user_session.user_context['last_response_time'] = datetime.now(timezone.utc).isoformat()
+                user_session.user_context['last_statement_id'] = cached_statement_id
+                await self.user_sessions.set(user_session)
+                # Sem cartão de feedback: a resposta não corresponde a uma mensagem do Genie deste usuário
+                await turn_context.send_activity(f"**👤 {user_session.name}**\n\n{cached_response}")
+                return
+
+        # No modo de resposta progressiva, mostra um placeholder que é atualizado
+        # conforme o Genie avança e depois substituído pela resposta final
+        progress = None
+        if CONFIG.ENABLE_STREAMING_RESPONSES:
+            progress = ProgressMessage(turn_context, f"**👤 {user_session.name}**")
+            await progress.start()
+
+        # Uma conversa nova usa a conversa pré-aquecida do usuário, se houver,
+        # e segue pelo caminho mais rápido de mensagem de acompanhamento
+        conversation_id = user_session.conversation_id
+        if conversation_id is None and self.conversation_warmer is not None:
+            conversation_id = self.conversation_warmer.take(user_session.user_id)
+            if conversation_id is not None:
+                # A conversa pré-aquecida já tem o PREWARM_PROMPT no contexto: a resposta
+                # pode diferir da de uma conversa nova e não vai para o cache
+                use_cache = False
+
         # Processa a mensagem mantendo o contexto da conversa
         try:
             answer, new_conversation_id, genie_message_id = await ask_genie(
-                question, CONFIG.DATABRICKS_SPACE_ID, user_session, user_session.conversation_id
+                question,
+                CONFIG.DATABRICKS_SPACE_ID,
+                user_session,
+                conversation_id,
+                on_status=progress.update if progress else None,
             )
             
             # Atualizar sessão do usuário com novo ID de conversa e armazenar o ID da mensagem específica para feedback
@@ -492,33 +790,44 @@ class MyBot(ActivityHandler):
             user_session.user_context['last_question'] = question
             user_session.user_context['last_response_time'] = datetime.now(timezone.utc).isoformat()
             user_session.user_context['last_genie_message_id'] = genie_message_id
-
-            answer_json = json.loads(answer)
-            response = process_query_results(answer_json)
+            # Guardado para o comando `export`, que busca o resultado completo desta consulta
+            statement_id = answer.statement_id if answer.has_table else None
+            user_session.user_context['last_statement_id'] = statement_id
+            await self.user_sessions.set(user_session)
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Resposta do Genie: %s", answer.to_json())
+            with STAGE_SECONDS.time(stage="render"):
+                response = process_query_results(answer)
+            if use_cache and answer.error is None:
+                self.answer_cache.set(CONFIG.DATABRICKS_SPACE_ID, question, response, statement_id)
             
             # Adiciona o contexto do usuário à resposta
             response = f"**👤 {user_session.name}**\n\n{response}"
 
             # Enviar a resposta principal
-            await turn_context.send_activity(response)
+            await self._send_response(turn_context, response, progress)
             
             # Enviar cartão de feedback como uma mensagem separada
             await self._send_feedback_card(turn_context, user_session)
             
-        except json.JSONDecodeError:
-            await turn_context.send_activity(
-                f"**👤 {user_session.name}**\n\n❌ Falha ao decodificar a resposta do servidor."
-            )
-            # Enviar cartão de feedback para respostas com erro também
-            await self._send_feedback_card(turn_context, user_session)
         except Exception as e:
-            logger.error(f"Erro ao processar mensagem para {user_session.get_display_name()}: {str(e)}")
-            await turn_context.send_activity(
-                f"**👤 {user_session.name}**\n\n❌ Ocorreu um erro ao processar sua solicitação."
+            logger.error("Erro ao processar mensagem para %s: %s", user_session.get_display_name(), e)
+            await self._send_response(
+                turn_context,
+                f"**👤 {user_session.name}**\n\n❌ Ocorreu um erro ao processar sua solicitação.",
+                progress,
             )
             # Enviar cartão de feedback para respostas com erro também
             await self._send_feedback_card(turn_context, user_session)
 
+    async def _send_response(self, turn_context: TurnContext, response: str, progress: Optional["ProgressMessage"]):
+        """Envia a resposta final, substituindo o placeholder quando houver um"""
+        if progress is not None:
+            await progress.finish(response)
+        else:
+            await turn_context.send_activity(response)
+
     async def _handle_user_identification(self, turn_context: TurnContext, question: str):
         """Lida com casos onde o email do usuário não está disponível"""
         user_id = turn_context.activity.from_property.id
@@ -555,7 +864,7 @@ Sou um bot do Teams que se conecta a um Databricks Genie Space, permitindo que v
                 # Update existing session or create new one
                 user_id = turn_context.activity.from_property.id
                 session = UserSession(user_id, new_name)
-                self.user_sessions[user_id] = session
+                await self.user_sessions.set(session)
                 
                 await turn_context.send_activity(
                     f"✅ **Identidade Atualizada!**\n\n"
@@ -586,6 +895,7 @@ Sou um bot do Teams que se conecta a um Databricks Genie Space, permitindo que v
 **Comandos de Usuário:**
 - `help` - Mostrar informações detalhadas do bot
 - `logout` - Limpar sua sessão (você será reidentificado automaticamente na próxima mensagem)
+- `export csv` ou `export parquet` - Baixar o resultado completo da última consulta
 """
 
             # Se estiver no Emulator, mostramos o comando novo de trocar nome
@@ -612,8 +922,9 @@ Sou um bot do Teams que se conecta a um Databricks Genie Space, permitindo que v
             # Limpar sessão do usuário
             user_id = user_session.user_id
 
-            if user_id in self.user_sessions:
-                del self.user_sessions[user_id]
+            await self.user_sessions.delete(user_id)
+            if self.conversation_warmer is not None:
+                self.conversation_warmer.discard(user_id)
 
             await turn_context.send_activity(
                 f"👋 **Até logo, {user_session.name}!**\n\n"
@@ -641,12 +952,24 @@ Sou um bot do Teams que se conecta a um Databricks Genie Space, permitindo que v
 • `help` - Mostra informações detalhadas do bot
 • `info` - Ajuda a utilizar o bot
 • `reset` - Inicia uma nova conversa
+• `export` - Baixa o resultado completo da última consulta (CSV ou Parquet)
 • `logout` - Limpa sua sessão
             """
             
             await turn_context.send_activity(help_message)
             return True
 
+        # Comando export: resultado completo da última consulta como arquivo
+        # Só o comando exato, com o formato opcional: "exportar o total de vendas..." é uma pergunta
+        words = question.lower().split()
+        if (
+            words
+            and words[0] in ["export", "/export", "exportar", "/exportar"]
+            and (len(words) == 1 or (len(words) == 2 and words[1] in EXPORT_FORMATS))
+        ):
+            await self._handle_export(turn_context, user_session, words[1] if len(words) == 2 else "csv")
+            return True
+
         # Gatilhos para nova conversa
         new_conversation_triggers = [
             "new conversation", "new chat", "start over", "reset", "clear conversation",
@@ -656,6 +979,8 @@ Sou um bot do Teams que se conecta a um Databricks Genie Space, permitindo que v
         if question.lower() in [trigger.lower() for trigger in new_conversation_triggers]:
             user_session.conversation_id = None
             user_session.user_context.pop('last_conversation_id', None)
+            await self.user_sessions.set(user_session)
+            self._prewarm_conversation(user_session)
             await turn_context.send_activity(
                     f"🔄 **Iniciando uma nova conversa, {user_session.name}!**\n\n"
                     "Você pode me perguntar qualquer coisa sobre seus dados."
@@ -664,24 +989,145 @@ Sou um bot do Teams que se conecta a um Databricks Genie Space, permitindo que v
 
         return False
 
+    async def _handle_export(self, turn_context: TurnContext, user_session: UserSession, file_format: str):
+        """Gera o arquivo com o resultado da última consulta e o envia como anexo"""
+        if file_format not in EXPORT_FORMATS:
+            await turn_context.send_activity(
+                "❌ **Formato inválido**\n\nUse `export csv` ou `export parquet`."
+            )
+            return
+
+        statement_id = user_session.user_context.get('last_statement_id')
+        if not statement_id:
+            await turn_context.send_activity(
+                "ℹ️ Não há resultado para exportar. Faça uma pergunta sobre os dados e depois use `export`."
+            )
+            return
+
+        await turn_context.send_activity(Activity(type=ActivityTypes.typing))
+        try:
+            export = await self.result_exporter.export(statement_id, file_format)
+        except ExportError as e:
+            await turn_context.send_activity(f"❌ {str(e)}")
+            return
+        except Exception as e:
+            logger.error("Erro ao exportar resultado para %s: %s", user_session.get_display_name(), e)
+            await turn_context.send_activity("❌ Falha ao exportar os dados. Por favor, tente novamente.")
+            return
+
+        summary = f"📎 **Exportação pronta:** {export.rows:,} linhas ({export.size / 1024:,.0f} KB)"
+        if export.truncated:
+            summary += f"\n\nO arquivo foi limitado às primeiras {export.rows:,} linhas."
+
+        if turn_context.activity.channel_id == "msteams":
+            # No Teams o arquivo é enviado ao OneDrive do usuário após o consentimento
+            context = {"exportId": export.export_id, "format": export.file_format}
+            consent_card = FileConsentCard(
+                description=summary,
+                size_in_bytes=export.size,
+                accept_context=context,
+                decline_context=context,
+            )
+            await turn_context.send_activity(
+                Activity(
+                    type=ActivityTypes.message,
+                    attachments=[
+                        Attachment(
+                            content_type="application/vnd.microsoft.teams.card.file.consent",
+                            name=export.filename,
+                            content=consent_card,
+                        )
+                    ],
+                )
+            )
+            return
+
+        try:
+            if export.size > CONFIG.EXPORT_INLINE_MAX_BYTES:
+                await turn_context.send_activity(
+                    f"{summary}\n\n❌ O arquivo é grande demais para ser enviado neste canal. "
+                    "Refine a consulta para reduzir o resultado."
+                )
+                return
+            data_uri = await self.result_exporter.read_data_uri(export)
+            await turn_context.send_activity(
+                Activity(
+                    type=ActivityTypes.message,
+                    text=summary,
+                    attachments=[
+                        Attachment(content_type=export.content_type, content_url=data_uri, name=export.filename)
+                    ],
+                )
+            )
+        finally:
+            self.result_exporter.discard(export.path)
+
+    async def _on_file_consent(self, turn_context: TurnContext, response: FileConsentCardResponse) -> InvokeResponse:
+        """Conclui o envio de uma exportação quando o usuário aceita (ou recusa) o arquivo no Teams"""
+        context = response.context or {}
+        try:
+            path = self.result_exporter.path_for(context.get("exportId"), context.get("format"))
+        except ExportError:
+            return InvokeResponse(status_code=400, body="Exportação inválida")
+
+        if response.action != "accept":
+            self.result_exporter.discard(path)
+            await turn_context.send_activity("Exportação cancelada.")
+            return InvokeResponse(status_code=200)
+
+        upload_info = response.upload_info
+        try:
+            await self.result_exporter.upload(path, upload_info.upload_url)
+        except FileNotFoundError:
+            await turn_context.send_activity("❌ O arquivo expirou. Use `export` novamente.")
+            return InvokeResponse(status_code=200)
+        except Exception as e:
+            logger.error("Erro ao enviar o arquivo exportado: %s", e)
+            await turn_context.send_activity("❌ Falha ao enviar o arquivo. Por favor, tente novamente.")
+            return InvokeResponse(status_code=200)
+        finally:
+            self.result_exporter.discard(path)
+
+        await turn_context.send_activity(
+            Activity(
+                type=ActivityTypes.message,
+                attachments=[
+                    Attachment(
+                        content_type="application/vnd.microsoft.teams.card.file.info",
+                        content_url=upload_info.content_url,
+                        name=upload_info.name,
+                        content=FileInfoCard(unique_id=upload_info.unique_id, file_type=upload_info.file_type),
+                    )
+                ],
+            )
+        )
+        return InvokeResponse(status_code=200)
+
     async def on_invoke_activity(self, turn_context: TurnContext) -> InvokeResponse:
         """Lida com invocações (como cliques em botões de cartões)"""
         try:
-            logger.info(f"Invocação de atividade recebida: {turn_context.activity.name}")
-            logger.info(f"Valor da atividade de invocação: {turn_context.activity.value}")
+            logger.debug(
+                "Invocação de atividade recebida: %s", turn_context.activity.name, extra={"event": "invoke_received"}
+            )
             
             # Verifica se esta é uma invocação de cartão adaptativo
             if turn_context.activity.name == "adaptiveCard/action":
                 invoke_value = turn_context.activity.value
-                logger.info(f"Processando invocação de cartão adaptativo com valor: {invoke_value}")
+                logger.debug("Processando invocação de cartão adaptativo: ação %s", invoke_value.get("action"))
                 return await self.on_adaptive_card_invoke(turn_context, invoke_value)
             
+            # Resposta ao cartão de consentimento de arquivo do Teams (comando export)
+            if turn_context.activity.name == "fileConsent/invoke":
+                return await self._on_file_consent(
+                    turn_context, FileConsentCardResponse().deserialize(turn_context.activity.value)
+                )
+            
             # Lida com outras atividades de invocação, se necessário
-            logger.info(f"Tipo de atividade de invocação não tratado: {turn_context.activity.name}")
+            logger.info("Tipo de atividade de invocação não tratado: %s", turn_context.activity.name)
             return InvokeResponse(status_code=200, body="OK")
             
         except Exception as e:
-            logger.error(f"Erro ao lidar com a invocação de atividade: {str(e)}")
+            logger.error("Erro ao lidar com a invocação de atividade: %s", e)
             return InvokeResponse(status_code=500, body="Erro ao processar a atividade de invocação")
 
     async def on_adaptive_card_invoke(self, turn_context: TurnContext, invoke_value: Dict) -> InvokeResponse:
@@ -697,22 +1143,10 @@ Sou um bot do Teams que se conecta a um Databricks Genie Space, permitindo que v
                 if not all([message_id, user_id, feedback]):
                     return InvokeResponse(status_code=400, body="Dados de feedback obrigatórios ausentes")
                 
-                # Armazenar dados de feedback
-                feedback_key = f"{user_id}_{message_id}"
-                user_session = self.user_sessions.get(user_id)
-                self.message_feedback[feedback_key] = {
-                    "message_id": message_id,
-                    "user_id": user_id,
-                    "feedback": feedback,
-                    "conversation_id": user_session.conversation_id if user_session else None,
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "user_session": user_session.to_dict() if user_session else None
-                }
-                
-                # Enviar feedback para a API do Databricks Genie
-                try:
-                    await self._send_feedback_to_api(feedback_key, self.message_feedback[feedback_key])
-                    
+                # Registrar o feedback (cliques repetidos não são reenviados)
+                # O envio para a API do Databricks Genie acontece em segundo plano,
+                # então o cartão é respondido sem esperar pelo workspace
+                if await self._submit_feedback(message_id, user_id, feedback):
                     # Retornar cartão atualizado com mensagem de agradecimento
                     updated_card = self.create_thank_you_card()
                     
@@ -724,9 +1158,7 @@ Sou um bot do Teams que se conecta a um Databricks Genie Space, permitindo que v
                             "body": updated_card["body"]
                         }
                     )
-                except Exception as e:
-                    logger.error(f"Falha ao enviar feedback para a API do Genie: {str(e)}")
-                    
+                else:
                     # Retornar cartão de erro
                     error_card = self.create_error_card("Falha ao enviar feedback. Por favor, tente novamente.")
                     
@@ -742,13 +1174,43 @@ Sou um bot do Teams que se conecta a um Databricks Genie Space, permitindo que v
             return InvokeResponse(status_code=400, body="Unknown action")
             
         except Exception as e:
-            logger.error(f"Error handling adaptive card invoke: {str(e)}")
+            logger.error("Error handling adaptive card invoke: %s", e)
             return InvokeResponse(status_code=500, body="Error processing feedback")
 
+    async def _record_feedback(self, message_id: str, user_id: str, feedback: str) -> Optional[Dict]:
+        """Registra o feedback no ledger. Retorna None se for um clique repetido."""
+        user_session = await self.user_sessions.get(user_id)
+        return self.feedback_ledger.record(
+            message_id, user_id, feedback, user_session.conversation_id if user_session else None
+        )
+
+    async def _submit_feedback(self, message_id: str, user_id: str, feedback: str) -> bool:
+        """Registra o feedback e o coloca na fila de envio, contabilizando o resultado.
+
+        Retorna False apenas se a fila recusar o registro; cliques repetidos contam como aceitos.
+        """
+        feedback_record = await self._record_feedback(message_id, user_id, feedback)
+        if feedback_record is None:
+            FEEDBACK_TOTAL.inc(outcome="duplicate_click")
+            return True
+        accepted = self.feedback_queue.submit(feedback_record)
+        FEEDBACK_TOTAL.inc(outcome="queued" if accepted else "rejected")
+        return accepted
+
+    async def _deliver_feedback(self, feedback_data: Dict):
+        """Worker da fila de feedback: envia um registro para a API do Genie"""
+        feedback_key = FeedbackLedger.key(feedback_data["user_id"], feedback_data["message_id"])
+        try:
+            await self._send_feedback_to_api(feedback_key, feedback_data)
+        except Exception:
+            FEEDBACK_TOTAL.inc(outcome="delivery_failed")
+            raise
+        FEEDBACK_TOTAL.inc(outcome="delivered")
+
     async def _send_feedback_to_api(self, feedback_key: str, feedback_data: Dict):
         """Envia feedback para a API de feedback de mensagens do Databricks Genie"""
         try:
-            logger.info(f"Feedback received: {feedback_data}")
+            logger.debug("Feedback recebido: %s", feedback_data, extra={"event": "feedback_received"})
             
             # Verificar se a API de feedback do Genie está habilitada
             if not CONFIG.ENABLE_GENIE_FEEDBACK_API:
@@ -759,16 +1221,18 @@ Sou um bot do Teams que se conecta a um Databricks Genie Space, permitindo que v
             message_id = feedback_data.get("message_id")
             user_id = feedback_data.get("user_id")
             feedback_type = feedback_data.get("feedback")
-            user_session_data = feedback_data.get("user_session")
             
             if not all([message_id, user_id, feedback_type]):
-                logger.error(f"Missing required feedback data: {feedback_data}")
+                logger.error("Missing required feedback data: %s", feedback_data)
                 return
             
-            # Obter a sessão do usuário para acessar conversation_id
-            user_session = self.user_sessions.get(user_id)
-            if not user_session or not user_session.conversation_id:
-                logger.error(f"Nenhuma conversa ativa encontrada para o usuário {user_id}")
+            # Usar a conversa registrada no clique; o usuário pode ter reiniciado a conversa desde então
+            conversation_id = feedback_data.get("conversation_id")
+            if not conversation_id:
+                user_session = await self.user_sessions.get(user_id)
+                conversation_id = user_session.conversation_id if user_session else None
+            if not conversation_id:
+                logger.error("Nenhuma conversa ativa encontrada para o usuário %s", user_id)
                 return
             
             # Converter o tipo de feedback para o formato da API do Genie
@@ -776,168 +1240,32 @@ Sou um bot do Teams que se conecta a um Databricks Genie Space, permitindo que v
             genie_feedback_type = "POSITIVE" if feedback_type == "positive" else "NEGATIVE"
             
             # Chamar a API de feedback de mensagem do Databricks Genie
-            logger.info(f"Enviando feedback para o ID da mensagem específica: {message_id} na conversa: {user_session.conversation_id}")
+            logger.debug("Enviando feedback para o ID da mensagem específica: %s na conversa: %s", message_id, conversation_id)
             await self._send_genie_feedback(
                 space_id=CONFIG.DATABRICKS_SPACE_ID,
-                conversation_id=user_session.conversation_id,
+                conversation_id=conversation_id,
                 message_id=message_id,
                 feedback_type=genie_feedback_type
             )
             
-            logger.info(f"Feedback enviado com sucesso para a API do Genie para {feedback_key}")
+            logger.info("Feedback enviado com sucesso para a API do Genie para %s", feedback_key)
             
         except Exception as e:
-            logger.error(f"Erro ao enviar feedback para a API do Genie: {str(e)}")
+            logger.error("Erro ao enviar feedback para a API do Genie: %s", e)
             raise
 
     async def _send_genie_feedback(self, space_id: str, conversation_id: str, message_id: str, feedback_type: str):
         """Envia feedback para a API do Databricks Genie"""
         try:
-            loop = asyncio.get_running_loop()
-            
-            # Use the Genie API to send feedback for a message
-            await loop.run_in_executor(
-                None,
-                genie_api.send_message_feedback,
-                space_id,
-                conversation_id,
-                message_id,
-                feedback_type
-            )
+            # Chamada REST direta pelo cliente assíncrono, usando o pool HTTP compartilhado
+            await genie_client.send_message_feedback(space_id, conversation_id, message_id, feedback_type)
             
-            logger.info(f"Feedback {feedback_type} enviado com sucesso para a mensagem {message_id} na conversa {conversation_id}")
+            logger.debug("Feedback %s enviado com sucesso para a mensagem %s na conversa %s", feedback_type, message_id, conversation_id)
             
-        except AttributeError:
-            # Se o método send_message_feedback não existir, tenta nomes de métodos alternativos
-            logger.warning(f"Método send_message_feedback não encontrado, tentando abordagem alternativa")
-            await self._send_genie_feedback_alternative(space_id, conversation_id, message_id, feedback_type)
         except Exception as e:
-            logger.error(f"Erro ao chamar a API do Genie para feedback: {str(e)}")
+            logger.error("Erro ao chamar a API do Genie para feedback: %s", e)
             raise
 
-    async def _send_genie_feedback_alternative(self, space_id: str, conversation_id: str, message_id: str, feedback_type: str):
-        """Método alternativo para enviar feedback se o método direto da API não estiver disponível"""
-        try:
-            # Se o método direto da API não estiver disponível, podemos usar o cliente do workspace
-            # para fazer uma requisição HTTP direta ao endpoint de feedback do Genie
-            import aiohttp
-            
-            # Construir a URL do endpoint da API
-            base_url = CONFIG.DATABRICKS_HOST.rstrip('/')
-            api_endpoint = f"{base_url}/api/2.0/genie/spaces/{space_id}/conversations/{conversation_id}/messages/{message_id}/feedback"
-            
-            # Preparar o payload da requisição
-            payload = {
-                "rating": feedback_type
-            }
-            
-            # Prepare headers
-            headers = {
-                "Authorization": f"Bearer {CONFIG.DATABRICKS_TOKEN}",
-                "Content-Type": "application/json"
-            }
-            
-            # Faz a requisição HTTP
-            logger.info(f"Sending feedback to: {api_endpoint}")
-            logger.info(f"Payload: {payload}")
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(api_endpoint, json=payload, headers=headers) as response:
-                    response_text = await response.text()
-                    if response.status == 200:
-                        logger.info(f"Feedback {feedback_type} enviado com sucesso via API HTTP")
-                    else:
-                        logger.error(f"Falha ao enviar feedback via API HTTP: {response.status} - {response_text}")
-                        raise Exception(f"HTTP {response.status}: {response_text}")
-                        
-        except Exception as e:
-            logger.error(f"Erro no método alternativo de feedback: {str(e)}")
-            raise
-
-    async def _get_last_genie_message_id(self, conversation_id: str) -> Optional[str]:
-        """Obter o ID da última mensagem da conversa do Genie"""
-        try:
-            if not conversation_id:
-                return None
-                
-            loop = asyncio.get_running_loop()
-            # Tenta nomes de métodos diferentes para listar mensagens
-            try:
-                # Tenta list_conversation_messages primeiro
-                messages = await loop.run_in_executor(
-                    None,
-                    genie_api.list_conversation_messages,
-                    CONFIG.DATABRICKS_SPACE_ID,
-                    conversation_id,
-                )
-            except AttributeError:
-                try:
-                    # Tenta get_conversation_messages
-                    messages = await loop.run_in_executor(
-                        None,
-                        genie_api.get_conversation_messages,
-                        CONFIG.DATABRICKS_SPACE_ID,
-                        conversation_id,
-                    )
-                except AttributeError:
-                    # Se nenhum dos métodos existir, retorna None e registra um aviso
-                    logger.warning("Nenhum método adequado encontrado para listar mensagens da conversa do Genie")
-                    return None
-            
-            # Lida com diferentes tipos de resposta
-            if messages:
-                logger.info(f"Messages response type: {type(messages)}")
-                logger.info(f"Messages response attributes: {dir(messages)}")
-                
-                # Verifica se é um objeto de resposta com a propriedade messages
-                if hasattr(messages, 'messages') and messages.messages:
-                    logger.info(f"Found {len(messages.messages)} messages in response.messages")
-                    # Ordena as mensagens por carimbo de data/hora para obter a mais recente
-                    try:
-                        sorted_messages = sorted(messages.messages, key=lambda x: getattr(x, 'created_at', 0), reverse=True)
-                        if sorted_messages:
-                            latest_message = sorted_messages[0]
-                            logger.info(f"ID da última mensagem: {latest_message.message_id}")
-                            return latest_message.message_id
-                    except Exception as e:
-                        logger.warning(f"Não foi possível ordenar as mensagens por carimbo de data/hora: {e}, usando a última mensagem")
-                        return messages.messages[-1].message_id
-                # Verifica se é um objeto semelhante a uma lista
-                elif hasattr(messages, '__len__') and len(messages) > 0:
-                    logger.info(f"Found {len(messages)} messages in response (list-like)")
-                    # Ordena as mensagens por carimbo de data/hora para obter a mais recente
-                    try:
-                        sorted_messages = sorted(messages, key=lambda x: getattr(x, 'created_at', 0), reverse=True)
-                        if sorted_messages:
-                            latest_message = sorted_messages[0]
-                            logger.info(f"ID da última mensagem: {latest_message.message_id}")
-                            return latest_message.message_id
-                    except Exception as e:
-                        logger.warning(f"Não foi possível ordenar as mensagens por carimbo de data/hora: {e}, usando a última mensagem")
-                        return messages[-1].message_id
-                # Verifica se é iterável
-                elif hasattr(messages, '__iter__'):
-                    message_list = list(messages)
-                    if message_list:
-                        logger.info(f"Found {len(message_list)} messages in response (iterable)")
-                        # Ordena as mensagens por carimbo de data/hora para obter a mais recente
-                        try:
-                            sorted_messages = sorted(message_list, key=lambda x: getattr(x, 'created_at', 0), reverse=True)
-                            if sorted_messages:
-                                latest_message = sorted_messages[0]
-                                logger.info(f"ID da última mensagem: {latest_message.message_id}")
-                                return latest_message.message_id
-                        except Exception as e:
-                            logger.warning(f"Não foi possível ordenar as mensagens por carimbo de data/hora: {e}, usando a última mensagem")
-                            return message_list[-1].message_id
-                else:
-                    logger.warning(f"Não foi possível extrair mensagens da resposta do tipo {type(messages)}")
-            return None
-            
-        except Exception as e:
-            logger.error(f"Erro ao obter o ID da última mensagem do Genie: {str(e)}")
-            return None
-
     async def _send_feedback_card(self, turn_context: TurnContext, user_session: UserSession):
         """Enviar um cartão de feedback após uma resposta do bot"""
         try:
@@ -949,11 +1277,11 @@ Sou um bot do Teams que se conecta a um Databricks Genie Space, permitindo que v
             genie_message_id = user_session.user_context.get('last_genie_message_id')
             if genie_message_id:
                 message_id = genie_message_id
-                logger.info(f"Criando cartão de feedback para o ID específico da mensagem do Genie: {message_id}")
+                logger.debug("Criando cartão de feedback para o ID específico da mensagem do Genie: %s", message_id)
             else:
                 # Fallback to generated ID if we don't have the Genie message ID
                 message_id = f"msg_{int(datetime.now().timestamp() * 1000)}"
-                logger.warning(f"Nenhum ID de mensagem do Genie disponível para o usuário {user_session.get_display_name()}, usando fallback: {message_id}")
+                logger.warning("Nenhum ID de mensagem do Genie disponível para o usuário %s, usando fallback: %s", user_session.get_display_name(), message_id)
             
             # Cria o cartão de feedback
             feedback_card = self.create_feedback_card(message_id, user_session.user_id)
@@ -970,7 +1298,7 @@ Sou um bot do Teams que se conecta a um Databricks Genie Space, permitindo que v
             await turn_context.send_activity(activity)
             
         except Exception as e:
-            logger.error(f"Erro ao enviar o cartão de feedback: {str(e)}")
+            logger.error("Erro ao enviar o cartão de feedback: %s", e)
 
     async def on_members_added_activity(
         self, members_added: List[ChannelAccount], turn_context: TurnContext
@@ -979,6 +1307,7 @@ Sou um bot do Teams que se conecta a um Databricks Genie Space, permitindo que v
             if member.id != turn_context.activity.recipient.id:
                 # Tenta obter informações do usuário para uma recepção personalizada
                 user_session = await self.get_or_create_user_session(turn_context)
+                self._prewarm_conversation(user_session)
                 
                 welcome_message = f"""
 🤖 **Bem-vindo ao Bot de Funil de Vendas, {user_session.name}!**
@@ -996,6 +1325,10 @@ Eu posso ajudar você a analisar seus dados usando linguagem natural. Vou lembra
 
 BOT = MyBot()
 
+if BOT.answer_cache is not None:
+    # Respostas em cache deixam de valer quando o espaço do Genie é reconfigurado
+    readiness.on_space_change = lambda: BOT.answer_cache.invalidate(CONFIG.DATABRICKS_SPACE_ID)
+
 
 async def messages(req: Request) -> Response:
     if "application/json" in req.headers["Content-Type"]:
@@ -1006,6 +1339,7 @@ async def messages(req: Request) -> Response:
     activity = Activity().deserialize(body)
     auth_header = req.headers.get("Authorization", "")
 
+    IN_FLIGHT.inc(kind="http_requests")
     try:
         # Lida com diferentes tipos de adaptadores
         if hasattr(ADAPTER, 'process'):
@@ -1021,13 +1355,109 @@ async def messages(req: Request) -> Response:
                 return json_response(data=response.body, status=response.status)
             return Response(status=201)
     except Exception as e:
-        logger.error(f"Erro ao processar a requisição: {str(e)}")
+        logger.error("Erro ao processar a requisição: %s", e)
         return Response(status=500)
+    finally:
+        IN_FLIGHT.dec(kind="http_requests")
+
+
+async def _collect_runtime_metrics():
+    """Atualiza, a cada leitura de /metrics, os valores que só existem sob demanda"""
+    SESSIONS.set(await BOT.user_sessions.size())
+    IN_FLIGHT.set(BOT.admission.queued, kind="questions_queued")
+    IN_FLIGHT.set(len(BOT.background_tasks), kind="background_tasks")
+    IN_FLIGHT.set(genie_client.poller.pending_count, kind="genie_polls")
+
+    EXECUTOR_QUEUE_DEPTH.set(DEFAULT_EXECUTOR.queue_depth, executor="default")
+    EXECUTOR_QUEUE_DEPTH.set(BOT.result_exporter.queue_depth, executor="export")
+
+    components = {
+        "sessions": BOT.user_sessions,
+        "feedback_queue": BOT.feedback_queue,
+        "admission": BOT.admission,
+        "background_tasks": BOT.background_tasks,
+        "activity_dedup": BOT.activity_dedup,
+        "user_flights": BOT.user_flights,
+        "answer_cache": BOT.answer_cache,
+        "conversation_warmer": BOT.conversation_warmer,
+        "genie_breaker": genie_client.breaker,
+        "logging": LOG_PIPELINE,
+        "readiness": readiness,
+    }
+    for component, source in components.items():
+        if source is None:
+            continue
+        for stat, value in source.metrics().items():
+            if isinstance(value, (int, float)):
+                COMPONENT_STAT.set(value, component=component, stat=stat)
+
+    breaker = genie_client.breaker
+    for state in (breaker.CLOSED, breaker.OPEN, breaker.HALF_OPEN):
+        GENIE_CIRCUIT_STATE.set(1 if breaker.state == state else 0, state=state)
+
+
+REGISTRY.add_collector(_collect_runtime_metrics)
+
+
+async def metrics(req: Request) -> Response:
+    """Métricas no formato texto do Prometheus"""
+    if CONFIG.METRICS_AUTH_TOKEN and req.headers.get("Authorization", "") != f"Bearer {CONFIG.METRICS_AUTH_TOKEN}":
+        return Response(status=401)
+    return Response(
+        text=await REGISTRY.render(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+async def healthz(req: Request) -> Response:
+    """Liveness: o processo está de pé e o loop de eventos responde"""
+    return json_response({"status": "ok"})
+
+
+async def readyz(req: Request) -> Response:
+    """Readiness: 200 só depois que o token e o SQL warehouse foram verificados"""
+    # Resultado da verificação em segundo plano: a sonda nunca espera pelo workspace
+    result = readiness.result
+    return json_response(result, status=200 if result["ready"] else 503)
+
+
+async def _on_startup(app: web.Application):
+    # to_thread e run_in_executor(None, ...) passam a usar o executor contado
+    asyncio.get_running_loop().set_default_executor(DEFAULT_EXECUTOR)
+    # Sessão HTTP única da aplicação, compartilhada por todas as chamadas REST
+    app["http_session"] = create_http_session(CONFIG)
+    genie_client.attach_session(app["http_session"])
+    BOT.result_exporter.attach_session(app["http_session"])
+    BOT.user_sessions.start()
+    BOT.feedback_ledger.start()
+    BOT.feedback_queue.start()
+    # A porta já está aberta; a verificação do workspace segue em segundo plano
+    readiness.start()
+
+
+async def _on_cleanup(app: web.Application):
+    # Deixa as respostas em andamento terminarem antes de fechar o que elas usam
+    await BOT.background_tasks.close(CONFIG.PROACTIVE_SHUTDOWN_GRACE_SECONDS)
+    if BOT.conversation_warmer is not None:
+        await BOT.conversation_warmer.close()
+    await BOT.user_sessions.close()
+    await BOT.feedback_queue.close()
+    await BOT.feedback_ledger.close()
+    BOT.result_exporter.close()
+    await readiness.close()
+    await genie_client.close()
+    await app["http_session"].close()
 
 
 def init_func(argv):
     APP = web.Application(middlewares=[aiohttp_error_middleware])
     APP.router.add_post("/api/messages", messages)
+    APP.router.add_get("/healthz", healthz)
+    APP.router.add_get("/readyz", readyz)
+    if CONFIG.ENABLE_METRICS_ENDPOINT:
+        APP.router.add_get("/metrics", metrics)
+    APP.on_startup.append(_on_startup)
+    APP.on_cleanup.append(_on_cleanup)
     return APP
 
 
@@ -0,0 +1,65 @@
+"""
+Conjunto limitado de tarefas em segundo plano.
+
+No modo de respostas proativas, a requisição do Bot Connector é respondida na
+hora e a pergunta segue em uma tarefa própria. ``BackgroundTasks`` guarda a
+referência dessas tarefas (o asyncio só mantém referências fracas), limita
+quantas podem existir ao mesmo tempo e as encerra no desligamento do app.
+"""
+
+import asyncio
+import logging
+from typing import Coroutine, Dict, Set
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundTasks:
+    """Tarefas asyncio com limite de quantidade e encerramento ordenado"""
+
+    def __init__(self, max_tasks: int = 1000):
+        self.max_tasks = max_tasks
+        self._tasks: Set[asyncio.Task] = set()
+        self.started = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def spawn(self, coro: Coroutine) -> bool:
+        """Inicia a corrotina em segundo plano. Retorna False se o limite foi atingido."""
+        if len(self._tasks) >= self.max_tasks:
+            coro.close()
+            self.rejected += 1
+            return False
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_done)
+        self.started += 1
+        return True
+
+    def _on_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.failed += 1
+            logger.error("Tarefa em segundo plano falhou: %s", task.exception())
+
+    async def close(self, timeout: float = 10.0):
+        """Aguarda as tarefas em andamento por até ``timeout`` segundos e cancela o restante"""
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning("%d tarefas em segundo plano canceladas no desligamento", len(pending))
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "running": len(self._tasks),
+            "started": self.started,
+            "rejected": self.rejected,
+            "failed": self.failed,
+        }
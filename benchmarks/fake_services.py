@@ -0,0 +1,249 @@
+"""
+Serviços falsos usados nos benchmarks.
+
+``FakeGenieServer`` imita as APIs REST do Genie e de execução de instruções SQL
+que o bot usa (``DATABRICKS_HOST`` apontando para ele), com latência, tamanho
+do resultado e taxa de erro configuráveis. ``FakeConnector`` faz o papel do
+Bot Connector: recebe as respostas do bot (``serviceUrl`` das atividades) e
+avisa quem está aguardando a resposta de cada conversa.
+"""
+
+import asyncio
+import math
+import random
+import time
+import uuid
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+# Prefixo das respostas finais do bot (resposta, erro ou "ocupado"); o placeholder
+# do modo progressivo também começa assim, por isso o load test o desabilita
+ANSWER_PREFIX = "**👤"
+
+COLUMNS = [
+    {"name": "id", "type_name": "LONG", "type_text": "bigint", "position": 0},
+    {"name": "cliente", "type_name": "STRING", "type_text": "string", "position": 1},
+    {"name": "valor", "type_name": "DECIMAL", "type_text": "decimal(18,2)", "position": 2},
+    {"name": "observacao", "type_name": "STRING", "type_text": "string", "position": 3},
+]
+
+
+def synthetic_rows(count: int, seed: int = 42) -> List[List[Optional[str]]]:
+    """Linhas no formato JSON_ARRAY (tudo como texto), com BIGINT, STRING, DECIMAL e NULLs"""
+    rng = random.Random(seed)
+    rows = []
+    for index in range(count):
+        amount = Decimal(rng.randint(-10_000_000, 10_000_000)) / 100
+        note = None if index % 7 == 0 else f"observação {rng.randint(0, 999)}"
+        rows.append([str(index), f"Cliente {index % 1000:04d}", str(amount), note])
+    return rows
+
+
+def _now() -> float:
+    return time.monotonic()
+
+
+class FakeGenieServer:
+    """Genie + execução de instruções com comportamento controlado pelo benchmark"""
+
+    def __init__(
+        self,
+        genie_latency: float = 2.0,
+        request_latency: float = 0.0,
+        rows: int = 100,
+        chunk_rows: int = 0,
+        error_rate: float = 0.0,
+        seed: int = 42,
+    ):
+        self.genie_latency = genie_latency
+        self.request_latency = request_latency
+        self.chunk_rows = chunk_rows or max(rows, 1)
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._rows = synthetic_rows(rows, seed)
+        # message_id -> (conversation_id, criada_em, statement_id)
+        self._messages: Dict[str, tuple] = {}
+        self.requests = 0
+        self.errors_injected = 0
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        prefix = "/api/2.0/genie/spaces/{space}"
+        app.router.add_get(prefix, self._space)
+        app.router.add_post(f"{prefix}/start-conversation", self._start_conversation)
+        app.router.add_post(f"{prefix}/conversations/{{conversation}}/messages", self._create_message)
+        app.router.add_get(f"{prefix}/conversations/{{conversation}}/messages/{{message}}", self._get_message)
+        app.router.add_get(
+            f"{prefix}/conversations/{{conversation}}/messages/{{message}}/attachments/{{attachment}}/query-result",
+            self._query_result,
+        )
+        app.router.add_post(f"{prefix}/conversations/{{conversation}}/messages/{{message}}/feedback", self._feedback)
+        app.router.add_get("/api/2.0/sql/warehouses/{warehouse}", self._warehouse)
+        app.router.add_get("/api/2.0/sql/statements/{statement}", self._statement)
+        app.router.add_get("/api/2.0/sql/statements/{statement}/result/chunks/{chunk}", self._chunk)
+        return app
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        self.requests += 1
+        if self.request_latency:
+            await asyncio.sleep(self.request_latency)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.errors_injected += 1
+            return web.json_response({"error_code": "INTERNAL_ERROR", "message": "falha simulada"}, status=500)
+        return await handler(request)
+
+    def _new_message(self, conversation_id: str, content: str) -> Dict:
+        message_id = uuid.uuid4().hex
+        self._messages[message_id] = (conversation_id, _now(), uuid.uuid4().hex)
+        return {
+            "id": message_id,
+            "message_id": message_id,
+            "conversation_id": conversation_id,
+            "content": content,
+            "status": "SUBMITTED",
+        }
+
+    async def _space(self, request: web.Request) -> web.Response:
+        space_id = request.match_info["space"]
+        return web.json_response({"space_id": space_id, "title": "Benchmark", "warehouse_id": "benchmark"})
+
+    async def _warehouse(self, request: web.Request) -> web.Response:
+        return web.json_response({"id": request.match_info["warehouse"], "name": "Benchmark", "state": "RUNNING"})
+
+    async def _start_conversation(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        message = self._new_message(uuid.uuid4().hex, body.get("content", ""))
+        return web.json_response(
+            {"conversation_id": message["conversation_id"], "message_id": message["message_id"], "message": message}
+        )
+
+    async def _create_message(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        return web.json_response(self._new_message(request.match_info["conversation"], body.get("content", "")))
+
+    async def _get_message(self, request: web.Request) -> web.Response:
+        message_id = request.match_info["message"]
+        entry = self._messages.get(message_id)
+        if entry is None:
+            return web.json_response({"error_code": "NOT_FOUND", "message": "mensagem não encontrada"}, status=404)
+        conversation_id, created_at, statement_id = entry
+        elapsed = _now() - created_at
+        message = {
+            "id": message_id,
+            "message_id": message_id,
+            "conversation_id": conversation_id,
+            "content": "",
+        }
+        if elapsed < self.genie_latency / 2:
+            message["status"] = "ASKING_AI"
+        elif elapsed < self.genie_latency:
+            message["status"] = "EXECUTING_QUERY"
+        else:
+            message["status"] = "COMPLETED"
+            message["attachments"] = [
+                {
+                    "attachment_id": "a1",
+                    "query": {
+                        "description": "Resultado sintético do benchmark",
+                        "query": "SELECT * FROM benchmark",
+                        "statement_id": statement_id,
+                    },
+                }
+            ]
+        return web.json_response(message)
+
+    async def _query_result(self, request: web.Request) -> web.Response:
+        entry = self._messages.get(request.match_info["message"])
+        if entry is None:
+            return web.json_response({"error_code": "NOT_FOUND", "message": "mensagem não encontrada"}, status=404)
+        return web.json_response({"statement_response": self._statement_response(entry[2])})
+
+    async def _statement(self, request: web.Request) -> web.Response:
+        return web.json_response(self._statement_response(request.match_info["statement"]))
+
+    async def _chunk(self, request: web.Request) -> web.Response:
+        return web.json_response(self._result_data(int(request.match_info["chunk"])))
+
+    async def _feedback(self, request: web.Request) -> web.Response:
+        return web.json_response({})
+
+    @property
+    def chunk_count(self) -> int:
+        return max(1, math.ceil(len(self._rows) / self.chunk_rows))
+
+    def _result_data(self, chunk_index: int) -> Dict:
+        offset = chunk_index * self.chunk_rows
+        rows = self._rows[offset:offset + self.chunk_rows]
+        data = {"chunk_index": chunk_index, "row_offset": offset, "row_count": len(rows), "data_array": rows}
+        if chunk_index + 1 < self.chunk_count:
+            data["next_chunk_index"] = chunk_index + 1
+        return data
+
+    def _statement_response(self, statement_id: str) -> Dict:
+        chunks = []
+        for index in range(self.chunk_count):
+            offset = index * self.chunk_rows
+            chunks.append(
+                {
+                    "chunk_index": index,
+                    "row_offset": offset,
+                    "row_count": len(self._rows[offset:offset + self.chunk_rows]),
+                }
+            )
+        return {
+            "statement_id": statement_id,
+            "status": {"state": "SUCCEEDED"},
+            "manifest": {
+                "format": "JSON_ARRAY",
+                "schema": {"column_count": len(COLUMNS), "columns": COLUMNS},
+                "total_row_count": len(self._rows),
+                "total_chunk_count": self.chunk_count,
+                "chunks": chunks,
+            },
+            "result": self._result_data(0),
+        }
+
+    def metrics(self) -> Dict[str, int]:
+        return {"requests": self.requests, "errors_injected": self.errors_injected}
+
+
+class FakeConnector:
+    """Bot Connector mínimo: aceita as atividades enviadas pelo bot e entrega as respostas finais"""
+
+    def __init__(self):
+        # conversation_id -> future da próxima resposta final
+        self._waiters: Dict[str, asyncio.Future] = {}
+        self.activities = 0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v3/conversations/{conversation}/activities", self._activity)
+        app.router.add_post("/v3/conversations/{conversation}/activities/{activity}", self._activity)
+        app.router.add_put("/v3/conversations/{conversation}/activities/{activity}", self._activity)
+        return app
+
+    def expect(self, conversation_id: str) -> asyncio.Future:
+        """Future resolvida com o texto da próxima resposta final enviada à conversa"""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[conversation_id] = future
+        return future
+
+    async def _activity(self, request: web.Request) -> web.Response:
+        self.activities += 1
+        body = await request.json()
+        text = body.get("text") or ""
+        if text.startswith(ANSWER_PREFIX):
+            future = self._waiters.pop(request.match_info["conversation"], None)
+            if future is not None and not future.done():
+                future.set_result(text)
+        return web.json_response({"id": uuid.uuid4().hex})
+
+
+async def start_site(app: web.Application, port: int, host: str = "127.0.0.1") -> web.AppRunner:
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
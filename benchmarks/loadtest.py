@@ -0,0 +1,378 @@
+"""
+Teste de carga do bot sem workspace Databricks nem Teams.
+
+Sobe o Genie falso e o Bot Connector falso (``fake_services``), inicia o app
+do bot (``app.py``, que chama ``init_func``) em outro processo apontando para
+eles e envia perguntas para ``/api/messages`` a partir de N usuários
+simultâneos. Cada usuário só manda a próxima pergunta depois de receber a
+resposta da anterior.
+
+Ao final mostra perguntas/s, latências p50/p95/p99 (até a resposta chegar ao
+connector e até o retorno do POST), crescimento de memória do processo do bot
+e a saturação observada em ``/metrics`` (fila dos executores, perguntas em
+execução e na fila de admissão).
+
+Exemplo:
+    python benchmarks/loadtest.py --users 100 --questions 5 --genie-latency 2 --rows 500
+    python benchmarks/loadtest.py --users 50 --output resultado.json --min-rps 10 --max-p95 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from fake_services import FakeConnector, FakeGenieServer, start_site
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_SAMPLE_RE = re.compile(r'^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(?P<labels>[^}]*)\})? (?P<value>\S+)$')
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """Percentil pelo método do posto mais próximo"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(values: List[float]) -> Dict[str, Optional[float]]:
+    ordered = sorted(values)
+    return {
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1] if ordered else None,
+    }
+
+
+def parse_metrics(text: str) -> Dict[str, float]:
+    """Converte o texto do Prometheus em {'nome{rótulos}': valor}"""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        match = _SAMPLE_RE.match(line)
+        if match:
+            key = match["name"] + (f"{{{match['labels']}}}" if match["labels"] else "")
+            samples[key] = float(match["value"])
+    return samples
+
+
+def process_rss_bytes(pid: int) -> Optional[int]:
+    """Memória residente do processo (Linux); None onde /proc não existe"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.genie = FakeGenieServer(
+            genie_latency=args.genie_latency,
+            request_latency=args.request_latency,
+            rows=args.rows,
+            chunk_rows=args.chunk_rows,
+            error_rate=args.error_rate,
+        )
+        self.connector = FakeConnector()
+        self.genie_port = args.genie_port or _free_port()
+        self.connector_port = args.connector_port or _free_port()
+        self.bot_port = args.bot_port or _free_port()
+        self.bot_url = f"http://127.0.0.1:{self.bot_port}"
+        self.process: Optional[subprocess.Popen] = None
+        self.workdir = tempfile.mkdtemp(prefix="genie-bot-loadtest-")
+        self.answer_latencies: List[float] = []
+        self.post_latencies: List[float] = []
+        self.outcomes: Dict[str, int] = {"ok": 0, "error": 0, "busy": 0, "timeout": 0, "http_error": 0}
+        self.saturation: Dict[str, float] = {}
+        self.rss_samples: List[int] = []
+
+    def _bot_env(self) -> Dict[str, str]:
+        env = dict(os.environ)
+        env.update(
+            {
+                "PORT": str(self.bot_port),
+                "APP_ID": "",
+                "APP_PASSWORD": "",
+                "DATABRICKS_HOST": f"http://127.0.0.1:{self.genie_port}",
+                "DATABRICKS_TOKEN": "loadtest",
+                "DATABRICKS_SPACE_ID": "loadtest",
+                # Com o placeholder progressivo a resposta final vira uma edição da mensagem
+                "ENABLE_STREAMING_RESPONSES": "False",
+                "ENABLE_METRICS_ENDPOINT": "True",
+                "METRICS_AUTH_TOKEN": "",
+                "PYTHONPATH": REPO_ROOT + os.pathsep + env.get("PYTHONPATH", ""),
+            }
+        )
+        for item in self.args.bot_env:
+            key, _, value = item.partition("=")
+            env[key] = value
+        return env
+
+    async def start(self):
+        self._runners = [
+            await start_site(self.genie.app(), self.genie_port),
+            await start_site(self.connector.app(), self.connector_port),
+        ]
+        log_path = os.path.join(self.workdir, "bot.log")
+        self._log = open(log_path, "wb")
+        # O diretório de trabalho temporário recebe feedback.db e demais arquivos do bot
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(REPO_ROOT, "app.py")],
+            cwd=self.workdir,
+            env=self._bot_env(),
+            stdout=self._log,
+            stderr=subprocess.STDOUT,
+        )
+        deadline = time.monotonic() + self.args.startup_timeout
+        async with aiohttp.ClientSession() as session:
+            while True:
+                if self.process.poll() is not None:
+                    raise RuntimeError(f"O bot encerrou durante a inicialização; veja {log_path}")
+                try:
+                    # A carga só começa quando o bot se declara pronto, como faria o balanceador
+                    async with session.get(f"{self.bot_url}/readyz") as response:
+                        if response.status == 200:
+                            return
+                except aiohttp.ClientError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"O bot não ficou pronto na porta {self.bot_port} a tempo; veja {log_path}")
+                await asyncio.sleep(0.2)
+
+    async def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            # SIGINT deixa o aiohttp executar os hooks de on_cleanup
+            self.process.send_signal(2)
+            try:
+                await asyncio.to_thread(self.process.wait, 30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self._log.close()
+        for runner in self._runners:
+            await runner.cleanup()
+
+    def _activity(self, user: int, turn: int) -> Dict:
+        return {
+            "type": "message",
+            "id": f"act-{user}-{turn}",
+            "channelId": "emulator",
+            "serviceUrl": f"http://127.0.0.1:{self.connector_port}",
+            "from": {"id": f"user-{user}", "name": f"Usuário {user}"},
+            "recipient": {"id": "bot", "name": "bot"},
+            "conversation": {"id": f"conv-{user}"},
+            "text": f"Pergunta {turn} do usuário {user}: qual foi o total de vendas por cliente?",
+        }
+
+    async def _ask(self, session: aiohttp.ClientSession, user: int, turn: int, record: bool):
+        activity = self._activity(user, turn)
+        answer = self.connector.expect(activity["conversation"]["id"])
+        started = time.perf_counter()
+        try:
+            async with session.post(f"{self.bot_url}/api/messages", json=activity) as response:
+                await response.read()
+                status = response.status
+        except aiohttp.ClientError:
+            status = 0
+        posted = time.perf_counter() - started
+        if status >= 400 or status == 0:
+            answer.cancel()
+            if record:
+                self.outcomes["http_error"] += 1
+            return
+        try:
+            text = await asyncio.wait_for(answer, self.args.answer_timeout)
+        except asyncio.TimeoutError:
+            if record:
+                self.outcomes["timeout"] += 1
+            return
+        elapsed = time.perf_counter() - started
+        if not record:
+            return
+        self.post_latencies.append(posted)
+        self.answer_latencies.append(elapsed)
+        if "muitas solicitações" in text:
+            self.outcomes["busy"] += 1
+        elif "❌" in text or "⚠️" in text:
+            self.outcomes["error"] += 1
+        else:
+            self.outcomes["ok"] += 1
+
+    async def _user(self, session: aiohttp.ClientSession, user: int):
+        for turn in range(self.args.questions):
+            await self._ask(session, user, turn, record=True)
+            if self.args.think_time:
+                await asyncio.sleep(self.args.think_time)
+
+    async def _sample(self, session: aiohttp.ClientSession):
+        """Amostra /metrics e a memória do bot enquanto a carga roda"""
+        while True:
+            rss = process_rss_bytes(self.process.pid)
+            if rss is not None:
+                self.rss_samples.append(rss)
+            try:
+                async with session.get(f"{self.bot_url}/metrics") as response:
+                    samples = parse_metrics(await response.text())
+            except aiohttp.ClientError:
+                samples = {}
+            for key, value in samples.items():
+                if key.startswith(("genie_bot_executor_queue_depth", "genie_bot_in_flight")):
+                    self.saturation[key] = max(self.saturation.get(key, 0), value)
+            await asyncio.sleep(self.args.sample_interval)
+
+    async def run(self) -> Dict:
+        connector = aiohttp.TCPConnector(limit=0)
+        timeout = aiohttp.ClientTimeout(total=None)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            # Aquecimento: a primeira pergunta paga imports tardios e a abertura das conexões
+            for user in range(min(self.args.warmup, self.args.users)):
+                await self._ask(session, -(user + 1), 0, record=False)
+            rss_before = process_rss_bytes(self.process.pid)
+
+            sampler = asyncio.get_running_loop().create_task(self._sample(session))
+            started = time.perf_counter()
+            await asyncio.gather(*(self._user(session, user) for user in range(self.args.users)))
+            duration = time.perf_counter() - started
+            sampler.cancel()
+            await asyncio.gather(sampler, return_exceptions=True)
+
+            async with session.get(f"{self.bot_url}/metrics") as response:
+                final_metrics = parse_metrics(await response.text())
+            rss_after = process_rss_bytes(self.process.pid)
+
+        completed = len(self.answer_latencies)
+        return {
+            "config": {
+                key: value for key, value in vars(self.args).items() if key not in ("output", "bot_env")
+            },
+            "duration_seconds": round(duration, 3),
+            "questions": self.args.users * self.args.questions,
+            "completed": completed,
+            "outcomes": self.outcomes,
+            "throughput_rps": round(completed / duration, 3) if duration else None,
+            "answer_latency_seconds": latency_summary(self.answer_latencies),
+            "post_latency_seconds": latency_summary(self.post_latencies),
+            "memory": {
+                "rss_before_bytes": rss_before,
+                "rss_after_bytes": rss_after,
+                "rss_peak_bytes": max(self.rss_samples) if self.rss_samples else None,
+                "growth_bytes": rss_after - rss_before if rss_before and rss_after else None,
+            },
+            "saturation_max": self.saturation,
+            "genie_stage_sum_seconds": {
+                key: value for key, value in final_metrics.items() if key.startswith("genie_bot_stage_seconds_sum")
+            },
+            "fake_genie": self.genie.metrics(),
+        }
+
+
+def _fmt_seconds(value: Optional[float]) -> str:
+    return "n/d" if value is None else f"{value * 1000:.0f} ms"
+
+
+def _fmt_bytes(value: Optional[int]) -> str:
+    return "n/d" if value is None else f"{value / 1024 / 1024:.1f} MiB"
+
+
+def print_report(result: Dict):
+    answer = result["answer_latency_seconds"]
+    post = result["post_latency_seconds"]
+    memory = result["memory"]
+    print(f"Perguntas: {result['completed']}/{result['questions']} em {result['duration_seconds']:.1f}s")
+    print(f"Vazão: {result['throughput_rps']} perguntas/s")
+    print("Resultados: " + ", ".join(f"{key}={value}" for key, value in result["outcomes"].items()))
+    print(
+        f"Latência até a resposta: p50={_fmt_seconds(answer['p50'])} p95={_fmt_seconds(answer['p95'])} "
+        f"p99={_fmt_seconds(answer['p99'])} max={_fmt_seconds(answer['max'])}"
+    )
+    print(
+        f"Latência do POST /api/messages: p50={_fmt_seconds(post['p50'])} p95={_fmt_seconds(post['p95'])} "
+        f"p99={_fmt_seconds(post['p99'])}"
+    )
+    print(
+        f"Memória do bot: antes={_fmt_bytes(memory['rss_before_bytes'])} depois={_fmt_bytes(memory['rss_after_bytes'])} "
+        f"pico={_fmt_bytes(memory['rss_peak_bytes'])} crescimento={_fmt_bytes(memory['growth_bytes'])}"
+    )
+    print("Saturação (máximo observado):")
+    for key, value in sorted(result["saturation_max"].items()):
+        print(f"  {key} = {value:g}")
+    print(f"Genie falso: {result['fake_genie']}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Teste de carga do bot com Genie e Bot Connector falsos")
+    parser.add_argument("--users", type=int, default=50, help="Usuários simultâneos")
+    parser.add_argument("--questions", type=int, default=5, help="Perguntas por usuário")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Pausa entre as perguntas de um usuário (s)")
+    parser.add_argument("--warmup", type=int, default=1, help="Perguntas de aquecimento, fora da medição")
+    parser.add_argument("--genie-latency", type=float, default=2.0, help="Tempo até o Genie concluir a mensagem (s)")
+    parser.add_argument("--request-latency", type=float, default=0.0, help="Atraso de cada chamada REST falsa (s)")
+    parser.add_argument("--rows", type=int, default=100, help="Linhas do resultado de cada pergunta")
+    parser.add_argument("--chunk-rows", type=int, default=0, help="Linhas por bloco do resultado (0 = bloco único)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração das chamadas REST que retornam 500")
+    parser.add_argument("--answer-timeout", type=float, default=120.0, help="Espera máxima por uma resposta (s)")
+    parser.add_argument("--startup-timeout", type=float, default=60.0, help="Espera máxima pelo /readyz do bot (s)")
+    parser.add_argument("--sample-interval", type=float, default=0.5, help="Intervalo de leitura de /metrics (s)")
+    parser.add_argument("--bot-port", type=int, default=0, help="Porta do bot (0 = livre)")
+    parser.add_argument("--genie-port", type=int, default=0, help="Porta do Genie falso (0 = livre)")
+    parser.add_argument("--connector-port", type=int, default=0, help="Porta do connector falso (0 = livre)")
+    parser.add_argument(
+        "--bot-env", action="append", default=[], metavar="CHAVE=VALOR",
+        help="Configuração extra do bot, ex.: --bot-env ENABLE_PROACTIVE_RESPONSES=True",
+    )
+    parser.add_argument("--output", help="Grava o resultado em JSON neste arquivo")
+    parser.add_argument("--min-rps", type=float, help="Falha (código 1) se a vazão ficar abaixo disto")
+    parser.add_argument("--max-p95", type=float, help="Falha (código 1) se o p95 até a resposta passar disto (s)")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None) -> int:
+    args = parse_args(argv)
+    test = LoadTest(args)
+    await test.start()
+    try:
+        result = await test.run()
+    finally:
+        await test.stop()
+
+    print_report(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(result, output, indent=2, ensure_ascii=False)
+
+    failures = []
+    if args.min_rps is not None and (result["throughput_rps"] or 0) < args.min_rps:
+        failures.append(f"vazão {result['throughput_rps']} < {args.min_rps} perguntas/s")
+    p95 = result["answer_latency_seconds"]["p95"]
+    if args.max_p95 is not None and (p95 is None or p95 > args.max_p95):
+        failures.append(f"p95 {p95} > {args.max_p95}s")
+    for failure in failures:
+        print(f"REGRESSÃO: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,259 @@
+"""
+Micro-benchmarks dos caminhos de CPU do ``app.py``.
+
+Mede, sem rede:
+
+- ``process_query_results`` com resultados sintéticos de 10 a 100 mil linhas
+  (colunas BIGINT, STRING, DECIMAL e NULLs);
+- a passagem da resposta para fora do ``ask_genie``: o antigo
+  ``json.dumps``/``json.loads`` do resultado, reproduzido aqui como
+  referência, e a construção do ``GenieAnswer`` usado hoje;
+- ``get_or_create_user_session`` com 100 mil sessões no armazenamento em memória;
+- ``create_feedback_card``.
+
+Cada caso é repetido algumas vezes e o tempo por operação (mediana, mínimo,
+máximo) vai para um JSON que serve de baseline. Com ``--compare`` o resultado
+atual é comparado com uma baseline e os casos mais lentos que o limite são
+apontados como regressão (código de saída 1).
+
+Exemplo:
+    python benchmarks/microbench.py --output baseline.json
+    python benchmarks/microbench.py --compare baseline.json --threshold 0.15
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+# O app é importado sem workspace real; o armazenamento em memória precisa caber 100 mil sessões
+os.environ.setdefault("DATABRICKS_HOST", "http://127.0.0.1:9")
+os.environ.setdefault("DATABRICKS_TOKEN", "microbench")
+os.environ.setdefault("DATABRICKS_SPACE_ID", "microbench")
+os.environ["SESSION_BACKEND"] = "memory"
+os.environ["SESSION_MAX_SIZE"] = "200000"
+
+import app  # noqa: E402
+from botbuilder.schema import Activity, ChannelAccount  # noqa: E402
+from databricks.sdk.service.sql import StatementResponse  # noqa: E402
+from fake_services import COLUMNS, synthetic_rows  # noqa: E402
+from genie_answer import GenieAnswer  # noqa: E402
+
+# Os logs de INFO do app (ex.: criação de sessão) dominariam as medições
+logging.disable(logging.INFO)
+
+ROW_COUNTS = (10, 1_000, 10_000, 100_000)
+SESSION_COUNT = 100_000
+
+
+def _statement(rows: List[List[Optional[str]]]) -> StatementResponse:
+    return StatementResponse.from_dict(
+        {
+            "statement_id": "0" * 32,
+            "status": {"state": "SUCCEEDED"},
+            "manifest": {
+                "format": "JSON_ARRAY",
+                "schema": {"column_count": len(COLUMNS), "columns": COLUMNS},
+                "total_row_count": len(rows),
+            },
+            "result": {"chunk_index": 0, "row_offset": 0, "row_count": len(rows), "data_array": rows},
+        }
+    )
+
+
+def _answer(statement: StatementResponse) -> GenieAnswer:
+    return GenieAnswer(
+        columns=statement.manifest.schema.columns,
+        row_chunks=[statement.result.data_array],
+        total_rows=statement.manifest.total_row_count,
+        description="Resultado sintético do benchmark",
+        statement_id=statement.statement_id,
+    )
+
+
+def _turn_context(user_id: str) -> SimpleNamespace:
+    return SimpleNamespace(activity=Activity(from_property=ChannelAccount(id=user_id, name=f"Usuário {user_id}")))
+
+
+class Case:
+    """Um caso de benchmark: ``run`` executa ``ops`` operações"""
+
+    def __init__(self, name: str, run: Callable[[], None], ops: int = 1):
+        self.name = name
+        self.run = run
+        self.ops = ops
+
+
+def build_cases(row_counts) -> List[Case]:
+    cases = []
+    for count in row_counts:
+        statement = _statement(synthetic_rows(count))
+        answer = _answer(statement)
+        cases.append(Case(f"process_query_results[{count}]", lambda answer=answer: app.process_query_results(answer)))
+
+        def legacy_handoff(statement=statement):
+            # Forma usada antes do GenieAnswer: resultado serializado em ask_genie e decodificado no handler
+            payload = json.dumps(
+                {
+                    "columns": statement.manifest.schema.as_dict(),
+                    "data": statement.result.as_dict(),
+                    "query_description": "Resultado sintético do benchmark",
+                }
+            )
+            json.loads(payload)
+
+        cases.append(Case(f"handoff_json[{count}]", legacy_handoff))
+        cases.append(Case(f"handoff_genie_answer[{count}]", lambda statement=statement: _answer(statement)))
+
+    bot = app.BOT
+    loop = asyncio.new_event_loop()
+    user_ids = [f"user-{index}" for index in range(SESSION_COUNT)]
+    contexts = [_turn_context(user_id) for user_id in user_ids]
+
+    async def fill():
+        for context in contexts:
+            await bot.get_or_create_user_session(context)
+
+    loop.run_until_complete(fill())
+    lookups = random.Random(42).sample(contexts, 1000)
+
+    async def existing_sessions():
+        for context in lookups:
+            await bot.get_or_create_user_session(context)
+
+    cases.append(
+        Case(
+            f"get_or_create_user_session[existing,{SESSION_COUNT}]",
+            lambda: loop.run_until_complete(existing_sessions()),
+            ops=len(lookups),
+        )
+    )
+
+    new_contexts = iter(_turn_context(f"new-user-{index}") for index in range(10_000_000))
+
+    async def new_sessions():
+        for _ in range(1000):
+            await bot.get_or_create_user_session(next(new_contexts))
+
+    cases.append(
+        Case(
+            f"get_or_create_user_session[new,{SESSION_COUNT}]",
+            lambda: loop.run_until_complete(new_sessions()),
+            ops=1000,
+        )
+    )
+
+    cases.append(Case("create_feedback_card", lambda: bot.create_feedback_card("0" * 32, "user-1")))
+    return cases
+
+
+def measure(case: Case, repeat: int, min_time: float) -> Dict:
+    """Calibra o número de chamadas para durar ``min_time`` e repete a medição"""
+    case.run()
+    calls = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(calls):
+            case.run()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or calls >= 1_000_000:
+            break
+        calls = max(calls * 2, int(calls * min_time / max(elapsed, 1e-9)))
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(calls):
+            case.run()
+        samples.append((time.perf_counter() - started) / (calls * case.ops))
+    return {
+        "median_seconds": statistics.median(samples),
+        "min_seconds": min(samples),
+        "max_seconds": max(samples),
+        "ops_per_sample": calls * case.ops,
+        "repeat": repeat,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Casos cuja mediana piorou mais que ``threshold`` (fração) em relação à baseline"""
+    regressions = []
+    for name, result in current["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            print(f"  {name}: sem baseline")
+            continue
+        ratio = result["median_seconds"] / previous["median_seconds"]
+        flag = "REGRESSÃO" if ratio > 1 + threshold else "ok"
+        print(f"  {name}: {ratio:.2f}x da baseline ({flag})")
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return regressions
+
+
+def _fmt(seconds: float) -> str:
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.2f} µs"
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks dos caminhos de CPU do bot")
+    parser.add_argument("--filter", default="", help="Roda apenas os casos cujo nome contém este texto")
+    parser.add_argument("--repeat", type=int, default=5, help="Medições por caso")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Duração mínima de cada medição (s)")
+    parser.add_argument("--quick", action="store_true", help="Pula os resultados de 100 mil linhas")
+    parser.add_argument("--output", help="Grava o resultado (baseline) em JSON neste arquivo")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compara com uma baseline gravada antes")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Piora tolerada na comparação (0.10 = 10%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    row_counts = [count for count in ROW_COUNTS if not (args.quick and count >= 100_000)]
+    cases = [case for case in build_cases(row_counts) if args.filter in case.name]
+
+    current = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": {},
+    }
+    for case in cases:
+        result = measure(case, args.repeat, args.min_time)
+        current["results"][case.name] = result
+        print(f"{case.name}: {_fmt(result['median_seconds'])}/op (min {_fmt(result['min_seconds'])})")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(current, output, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        print(f"Comparação com {args.compare} (limite {args.threshold:.0%}):")
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressões: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
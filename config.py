@@ -18,6 +18,7 @@ class DefaultConfig:
     DATABRICKS_SPACE_ID = os.getenv("DATABRICKS_SPACE_ID", "")
     DATABRICKS_HOST = os.getenv("DATABRICKS_HOST", "")
     DATABRICKS_TOKEN = os.getenv("DATABRICKS_TOKEN", "")
+    DATABRICKS_WAREHOUSE_ID = os.getenv("DATABRICKS_WAREHOUSE_ID", "")  # Vazio: usa o warehouse do espaço do Genie
     
     # Valida variáveis de ambiente obrigatórias (pula validação para teste no emulador)
     if not DATABRICKS_TOKEN and APP_ID:  
@@ -36,4 +37,104 @@ class DefaultConfig:
     
     # Configurações de Feedback
     ENABLE_FEEDBACK_CARDS = os.getenv("ENABLE_FEEDBACK_CARDS", "True").lower() == "true"
-    ENABLE_GENIE_FEEDBACK_API = os.getenv("ENABLE_GENIE_FEEDBACK_API", "True").lower() == "true"
\ No newline at end of file
+    ENABLE_GENIE_FEEDBACK_API = os.getenv("ENABLE_GENIE_FEEDBACK_API", "True").lower() == "true"
+    FEEDBACK_LEDGER_PATH = os.getenv("FEEDBACK_LEDGER_PATH", "feedback.db")  # Arquivo SQLite com o histórico de feedbacks
+    FEEDBACK_RECENT_WINDOW = int(os.getenv("FEEDBACK_RECENT_WINDOW", "1000"))  # Feedbacks recentes mantidos em memória
+    FEEDBACK_QUEUE_WORKERS = int(os.getenv("FEEDBACK_QUEUE_WORKERS", "4"))  # Envios simultâneos para a API do Genie
+    FEEDBACK_QUEUE_MAX_SIZE = int(os.getenv("FEEDBACK_QUEUE_MAX_SIZE", "1000"))  # Feedbacks aguardando envio
+    FEEDBACK_MAX_RETRIES = int(os.getenv("FEEDBACK_MAX_RETRIES", "5"))  # Novas tentativas antes do dead-letter
+    FEEDBACK_DEAD_LETTER_PATH = os.getenv("FEEDBACK_DEAD_LETTER_PATH", "feedback_dead_letter.jsonl")
+
+    # Configurações do cliente assíncrono do Genie
+    GENIE_MAX_CONCURRENCY = int(os.getenv("GENIE_MAX_CONCURRENCY", "50"))  # Requisições HTTP simultâneas ao Databricks
+    GENIE_HTTP_POOL_SIZE = int(os.getenv("GENIE_HTTP_POOL_SIZE", "100"))  # Conexões com o workspace mantidas no pool
+    GENIE_REQUEST_TIMEOUT = float(os.getenv("GENIE_REQUEST_TIMEOUT", "30"))  # Timeout de cada requisição (segundos)
+    GENIE_MESSAGE_TIMEOUT = float(os.getenv("GENIE_MESSAGE_TIMEOUT", "1200"))  # Tempo máximo de espera por uma resposta (segundos)
+
+    # Configurações do agendador de polling do Genie (intervalos em segundos)
+    GENIE_POLL_INITIAL_INTERVAL = float(os.getenv("GENIE_POLL_INITIAL_INTERVAL", "1.0"))
+    GENIE_POLL_MAX_INTERVAL = float(os.getenv("GENIE_POLL_MAX_INTERVAL", "15"))
+    GENIE_POLL_BACKOFF_FACTOR = float(os.getenv("GENIE_POLL_BACKOFF_FACTOR", "1.5"))
+    GENIE_POLL_SLOW_STATUS_INTERVAL = float(os.getenv("GENIE_POLL_SLOW_STATUS_INTERVAL", "3"))  # Intervalo mínimo enquanto o SQL executa
+    GENIE_POLL_JITTER = float(os.getenv("GENIE_POLL_JITTER", "0.2"))  # Variação aleatória relativa (0.2 = ±20%)
+
+    # Disjuntor (circuit breaker) das chamadas ao Databricks
+    GENIE_BREAKER_WINDOW_SECONDS = float(os.getenv("GENIE_BREAKER_WINDOW_SECONDS", "30"))  # Janela da taxa de falhas
+    GENIE_BREAKER_MIN_CALLS = int(os.getenv("GENIE_BREAKER_MIN_CALLS", "10"))  # Chamadas mínimas na janela para avaliar a taxa
+    GENIE_BREAKER_FAILURE_RATE = float(os.getenv("GENIE_BREAKER_FAILURE_RATE", "0.5"))  # Taxa de falhas que abre o circuito
+    GENIE_BREAKER_OPEN_SECONDS = float(os.getenv("GENIE_BREAKER_OPEN_SECONDS", "30"))  # Tempo aberto antes de testar de novo
+    GENIE_BREAKER_ACL_OPEN_SECONDS = float(os.getenv("GENIE_BREAKER_ACL_OPEN_SECONDS", "300"))  # Tempo aberto após bloqueio por IP ACL
+    GENIE_BREAKER_HALF_OPEN_PROBES = int(os.getenv("GENIE_BREAKER_HALF_OPEN_PROBES", "1"))  # Chamadas de teste no estado meio aberto
+
+    # Resposta progressiva: envia um placeholder que é atualizado conforme o Genie avança
+    ENABLE_STREAMING_RESPONSES = os.getenv("ENABLE_STREAMING_RESPONSES", "True").lower() == "true"
+
+    # Configurações do armazenamento de sessões
+    SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")  # memory, sqlite ou redis
+    SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", "sessions.db")
+    SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+    SESSION_MAX_SIZE = int(os.getenv("SESSION_MAX_SIZE", "10000"))  # Máximo de sessões em memória (LRU, apenas backend memory)
+    SESSION_IDLE_TTL_SECONDS = float(os.getenv("SESSION_IDLE_TTL_SECONDS", "14400"))  # Remove sessões inativas (4 horas)
+    SESSION_SWEEP_INTERVAL_SECONDS = float(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "300"))  # Intervalo da limpeza periódica
+
+    # Respostas proativas: confirma a requisição do Bot Connector na hora e responde depois
+    ENABLE_PROACTIVE_RESPONSES = os.getenv("ENABLE_PROACTIVE_RESPONSES", "False").lower() == "true"
+    PROACTIVE_MAX_TASKS = int(os.getenv("PROACTIVE_MAX_TASKS", "1000"))  # Perguntas em segundo plano ao mesmo tempo
+    PROACTIVE_SHUTDOWN_GRACE_SECONDS = float(os.getenv("PROACTIVE_SHUTDOWN_GRACE_SECONDS", "10"))  # Espera no desligamento
+
+    # Deduplicação das atividades reenviadas pelos canais
+    ACTIVITY_DEDUP_WINDOW_SECONDS = float(os.getenv("ACTIVITY_DEDUP_WINDOW_SECONDS", "600"))
+    ACTIVITY_DEDUP_MAX_SIZE = int(os.getenv("ACTIVITY_DEDUP_MAX_SIZE", "10000"))
+
+    # Controle de admissão das perguntas de dados (comandos e feedbacks não entram na fila)
+    ADMISSION_MAX_RUNNING = int(os.getenv("ADMISSION_MAX_RUNNING", "50"))  # Perguntas respondidas ao mesmo tempo
+    ADMISSION_MAX_QUEUED = int(os.getenv("ADMISSION_MAX_QUEUED", "200"))  # Perguntas aguardando uma vaga
+    ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "30"))  # Espera máxima por uma vaga
+    USER_QUEUE_MAX_SIZE = int(os.getenv("USER_QUEUE_MAX_SIZE", "5"))  # Perguntas de um mesmo usuário em andamento ou aguardando
+    USER_QUEUE_MAX_WAIT_SECONDS = float(os.getenv("USER_QUEUE_MAX_WAIT_SECONDS", "300"))  # Espera pelas perguntas anteriores do mesmo usuário
+
+    # Limites da tabela de resultados enviada ao usuário
+    RESULT_MAX_ROWS = int(os.getenv("RESULT_MAX_ROWS", "200"))
+    RESULT_MAX_BYTES = int(os.getenv("RESULT_MAX_BYTES", "20000"))  # O Teams rejeita mensagens com mais de ~28 KB
+    RESULT_FETCH_CONCURRENCY = int(os.getenv("RESULT_FETCH_CONCURRENCY", "4"))  # Blocos de resultado baixados em paralelo
+
+    # Exportação do resultado completo (comando export)
+    EXPORT_DIR = os.getenv("EXPORT_DIR", "")  # Pasta dos arquivos temporários; vazio usa a pasta temporária do sistema
+    EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))  # Threads que gravam os arquivos (e exportações simultâneas)
+    EXPORT_MAX_ROWS = int(os.getenv("EXPORT_MAX_ROWS", "1000000"))
+    EXPORT_FILE_TTL_SECONDS = float(os.getenv("EXPORT_FILE_TTL_SECONDS", "3600"))  # Arquivos não enviados são apagados depois disso
+    EXPORT_INLINE_MAX_BYTES = int(os.getenv("EXPORT_INLINE_MAX_BYTES", "1000000"))  # Limite do anexo embutido fora do Teams
+
+    # Pré-aquecimento: abre a conversa do Genie antes da primeira pergunta do usuário
+    # Cada conversa pré-aquecida é uma pergunta real ao Genie, que fica no contexto da conversa
+    ENABLE_CONVERSATION_PREWARM = os.getenv("ENABLE_CONVERSATION_PREWARM", "False").lower() == "true"
+    PREWARM_PROMPT = os.getenv("PREWARM_PROMPT", "Olá! Quais dados estão disponíveis?")  # Mensagem que abre a conversa
+    PREWARM_MAX_CONVERSATIONS = int(os.getenv("PREWARM_MAX_CONVERSATIONS", "100"))  # Conversas prontas, somando todos os usuários
+    PREWARM_TTL_SECONDS = float(os.getenv("PREWARM_TTL_SECONDS", "1800"))  # Conversas prontas não usadas expiram
+
+    # Cache de respostas para perguntas repetidas no início de uma conversa
+    ENABLE_ANSWER_CACHE = os.getenv("ENABLE_ANSWER_CACHE", "False").lower() == "true"
+    ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "900"))  # Ajuste à frequência de atualização dos dados
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "500"))
+    ANSWER_CACHE_MAX_BYTES = int(os.getenv("ANSWER_CACHE_MAX_BYTES", "5000000"))  # Tamanho máximo total das respostas em cache
+
+    # Logs (escritos fora do loop de eventos por um QueueListener)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json ou text
+    LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "aiohttp.access=0.1")  # evento ou logger=fração mantida, separados por vírgula
+    LOG_USER_TEXT = os.getenv("LOG_USER_TEXT", "False").lower() == "true"  # Falso: texto do usuário sai só como tamanho e hash
+    LOG_QUEUE_MAX_SIZE = int(os.getenv("LOG_QUEUE_MAX_SIZE", "10000"))  # Registros além disso são descartados em vez de bloquear
+
+    # Verificação de prontidão (rota /readyz)
+    READINESS_CACHE_SECONDS = float(os.getenv("READINESS_CACHE_SECONDS", "30"))  # Intervalo entre verificações do workspace quando pronto
+    READINESS_RETRY_SECONDS = float(os.getenv("READINESS_RETRY_SECONDS", "5"))  # Nova tentativa na inicialização enquanto não estiver pronto
+
+    # Métricas no formato do Prometheus (rota /metrics)
+    ENABLE_METRICS_ENDPOINT = os.getenv("ENABLE_METRICS_ENDPOINT", "True").lower() == "true"
+    METRICS_AUTH_TOKEN = os.getenv("METRICS_AUTH_TOKEN", "")  # Se definido, exige "Authorization: Bearer <token>"
+
+    # Configurações do cliente HTTP compartilhado
+    HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "200"))  # Total de conexões, somando todos os hosts
+    HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "60"))  # Tempo que uma conexão ociosa fica aberta (segundos)
+    HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))  # Cache de resolução DNS (segundos)
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))  # Timeout para abrir uma conexão (segundos)
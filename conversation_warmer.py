@@ -0,0 +1,111 @@
+"""
+Pré-aquecimento de conversas do Genie.
+
+A primeira pergunta de uma conversa passa por ``start_conversation``, que é
+mais lento que enviar uma mensagem a uma conversa existente. Quando um usuário
+entra no chat ou reinicia a conversa, ``ConversationWarmer`` abre em segundo
+plano uma conversa com um prompt curto e a guarda por um tempo limitado; a
+primeira pergunta real do usuário então usa o caminho de acompanhamento.
+
+A API do Genie não abre conversas vazias: o prompt é uma mensagem de verdade.
+Cada pré-aquecimento custa uma resposta do Genie (e possivelmente uma consulta
+no SQL warehouse), mesmo que o usuário nunca pergunte nada, e o prompt fica no
+contexto da conversa que as perguntas seguintes do usuário vão continuar. Por
+isso o recurso vem desligado.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationWarmer:
+    """Uma conversa pronta por usuário, com limite total e expiração"""
+
+    def __init__(self, client, space_id: str, max_conversations: int = 100, ttl: float = 1800):
+        self.client = client
+        self.space_id = space_id
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        # user_id -> (conversation_id, expira_em)
+        self._warm: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Task] = {}
+        self.warmed = 0
+        self.used = 0
+        self.expired = 0
+        self.failed = 0
+
+    def warm(self, user_id: str, content: str) -> bool:
+        """Abre uma conversa para o usuário em segundo plano, se ainda não houver uma"""
+        self._expire()
+        if user_id in self._warm or user_id in self._pending:
+            return False
+        if len(self._warm) + len(self._pending) >= self.max_conversations:
+            return False
+        task = asyncio.get_running_loop().create_task(self._open(user_id, content))
+        self._pending[user_id] = task
+        return True
+
+    def take(self, user_id: str) -> Optional[str]:
+        """Retira a conversa pronta do usuário, se houver uma ainda válida"""
+        entry = self._warm.pop(user_id, None)
+        if entry is None:
+            return None
+        conversation_id, expires_at = entry
+        if time.monotonic() > expires_at:
+            self.expired += 1
+            return None
+        self.used += 1
+        return conversation_id
+
+    def discard(self, user_id: str):
+        """Descarta a conversa pronta do usuário (ex.: logout)"""
+        self._warm.pop(user_id, None)
+        task = self._pending.pop(user_id, None)
+        if task is not None:
+            task.cancel()
+
+    async def _open(self, user_id: str, content: str):
+        try:
+            message = await self.client.start_conversation_and_wait(self.space_id, content)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.warning("Falha ao pré-aquecer conversa do Genie para %s: %s", user_id, e)
+            return
+        finally:
+            # Depois de discard() + warm() a tarefa registrada já é outra
+            if self._pending.get(user_id) is asyncio.current_task():
+                del self._pending[user_id]
+        self._warm[user_id] = (message.conversation_id, time.monotonic() + self.ttl)
+        self.warmed += 1
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = [user_id for user_id, (_, expires_at) in self._warm.items() if expires_at < now]
+        for user_id in expired:
+            del self._warm[user_id]
+        self.expired += len(expired)
+
+    async def close(self):
+        tasks = list(self._pending.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._pending.clear()
+        self._warm.clear()
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "ready": len(self._warm),
+            "pending": len(self._pending),
+            "warmed": self.warmed,
+            "used": self.used,
+            "expired": self.expired,
+            "failed": self.failed,
+        }
@@ -0,0 +1,148 @@
+"""
+Registro persistente dos feedbacks (👍/👎) enviados pelos usuários.
+
+Cada clique vira uma linha compacta em um arquivo SQLite, gravada em lotes
+por uma tarefa em segundo plano. Em memória fica apenas uma janela pequena
+com os feedbacks mais recentes, usada para descartar cliques repetidos, então
+o consumo de memória não cresce com o tempo e o histórico sobrevive a
+reinicializações.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FeedbackLedger:
+    """Livro de registro de feedbacks com gravação em lote no SQLite"""
+
+    COLUMNS = ("message_id", "user_id", "feedback", "conversation_id", "timestamp")
+
+    def __init__(self, path: str, recent_size: int = 1000, flush_interval: float = 1.0, batch_size: int = 100):
+        self.path = path
+        self.recent_size = recent_size
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS feedback ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " message_id TEXT NOT NULL, user_id TEXT NOT NULL, feedback TEXT NOT NULL,"
+            " conversation_id TEXT, timestamp TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS feedback_user ON feedback (user_id, timestamp)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS feedback_message ON feedback (message_id)")
+        self._conn.commit()
+        self._db_lock = threading.Lock()
+        # Janela dos feedbacks mais recentes, por "{user_id}_{message_id}"
+        self._recent: "OrderedDict[str, Dict]" = OrderedDict()
+        self._pending: List[Dict] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @staticmethod
+    def key(user_id: str, message_id: str) -> str:
+        return f"{user_id}_{message_id}"
+
+    def record(self, message_id: str, user_id: str, feedback: str, conversation_id: Optional[str]) -> Optional[Dict]:
+        """Registra um feedback e o retorna, ou None se for repetição do último clique"""
+        feedback_key = self.key(user_id, message_id)
+        previous = self._recent.get(feedback_key)
+        if previous is not None and previous["feedback"] == feedback:
+            self._recent.move_to_end(feedback_key)
+            return None
+
+        entry = {
+            "message_id": message_id,
+            "user_id": user_id,
+            "feedback": feedback,
+            "conversation_id": conversation_id,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+        self._recent[feedback_key] = entry
+        self._recent.move_to_end(feedback_key)
+        while len(self._recent) > self.recent_size:
+            self._recent.popitem(last=False)
+
+        self._pending.append(entry)
+        if len(self._pending) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+        return entry
+
+    def get_recent(self, user_id: str, message_id: str) -> Optional[Dict]:
+        return self._recent.get(self.key(user_id, message_id))
+
+    async def query(
+        self, user_id: Optional[str] = None, message_id: Optional[str] = None, limit: int = 100
+    ) -> List[Dict]:
+        """Consulta o histórico gravado, filtrando por usuário e/ou mensagem"""
+        await self.flush()
+        conditions, params = [], []
+        if user_id is not None:
+            conditions.append("user_id = ?")
+            params.append(user_id)
+        if message_id is not None:
+            conditions.append("message_id = ?")
+            params.append(message_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f"SELECT {', '.join(self.COLUMNS)} FROM feedback {where} ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        rows = await asyncio.to_thread(self._fetch, sql, tuple(params))
+        return [dict(zip(self.COLUMNS, row)) for row in rows]
+
+    def _fetch(self, sql: str, params: tuple) -> List[tuple]:
+        with self._db_lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _write_batch(self, batch: List[Dict]):
+        with self._db_lock:
+            self._conn.executemany(
+                f"INSERT INTO feedback ({', '.join(self.COLUMNS)}) VALUES (?, ?, ?, ?, ?)",
+                [tuple(entry[column] for column in self.COLUMNS) for entry in batch],
+            )
+            self._conn.commit()
+
+    async def flush(self):
+        """Grava no disco os feedbacks pendentes em uma única transação"""
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        try:
+            await asyncio.to_thread(self._write_batch, batch)
+        except sqlite3.Error as e:
+            logger.error("Falha ao gravar %d feedbacks no registro: %s", len(batch), e)
+            # Devolve o lote para a próxima tentativa
+            self._pending[:0] = batch
+
+    def start(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._wakeup = asyncio.Event()
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def close(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
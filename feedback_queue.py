@@ -0,0 +1,178 @@
+"""
+Fila assíncrona para envio dos feedbacks à API do Genie.
+
+O clique no cartão é confirmado na hora; o envio ao Databricks acontece em
+segundo plano, por um número limitado de workers, com novas tentativas em
+backoff exponencial. Feedbacks que esgotam as tentativas (ou que não cabem na
+fila) vão para um arquivo JSONL de dead-letter para reprocessamento manual; a
+gravação desse arquivo é feita por uma tarefa própria, fora do event loop.
+"""
+
+import asyncio
+import json
+import logging
+import random
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class FeedbackQueue:
+    """Fila de feedbacks com deduplicação por (user_id, message_id)"""
+
+    def __init__(
+        self,
+        submit: Callable[[Dict], Awaitable[None]],
+        workers: int = 4,
+        max_size: int = 1000,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        dead_letter_path: str = "feedback_dead_letter.jsonl",
+    ):
+        self._submit = submit
+        self.worker_count = workers
+        self.max_size = max_size
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.dead_letter_path = dead_letter_path
+        self._queue: Optional[asyncio.Queue] = None
+        # Feedback mais recente de cada chave ainda não enviada, e quantas tentativas já falharam
+        self._pending: Dict[Tuple[str, str], Dict] = {}
+        self._attempts: Dict[Tuple[str, str], int] = {}
+        self._workers: List[asyncio.Task] = []
+        self._retry_handles: Dict[Tuple[str, str], asyncio.TimerHandle] = {}
+        # Registros de dead-letter aguardando gravação e a tarefa que os grava
+        self._dead_letter_buffer: List[Dict] = []
+        self._dead_letter_writer: Optional[asyncio.Task] = None
+        self.submitted = 0
+        self.deduplicated = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.dead_lettered = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def submit(self, entry: Dict) -> bool:
+        """Aceita um feedback para envio. Retorna False se a fila estiver cheia."""
+        key = (entry["user_id"], entry["message_id"])
+        if key in self._pending:
+            # Já há um envio pendente para esta mensagem: vale a avaliação mais recente
+            self._pending[key] = entry
+            self.deduplicated += 1
+            return True
+        if self._queue is None or len(self._pending) >= self.max_size:
+            logger.error("Fila de feedback cheia, enviando para dead-letter: %s", key)
+            self._dead_letter(entry, "fila cheia")
+            return False
+        self._pending[key] = entry
+        self._queue.put_nowait(key)
+        self.submitted += 1
+        return True
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "depth": self.depth,
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+        }
+
+    def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        self._workers = [loop.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def close(self):
+        for handle in self._retry_handles.values():
+            handle.cancel()
+        self._retry_handles.clear()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        # Não perde o que ficou pendente no desligamento
+        for entry in self._pending.values():
+            self._dead_letter(entry, "desligamento com envio pendente")
+        self._pending.clear()
+        self._attempts.clear()
+        self._queue = None
+        if self._dead_letter_writer is not None:
+            await self._dead_letter_writer
+
+    async def _worker(self):
+        while True:
+            key = await self._queue.get()
+            entry = self._pending.get(key)
+            if entry is None:
+                continue
+            try:
+                await self._submit(entry)
+            except Exception as e:
+                self._handle_failure(key, entry, e)
+            else:
+                self.succeeded += 1
+                self._attempts.pop(key, None)
+                # Se chegou uma avaliação nova durante o envio, ela ainda precisa ser enviada
+                if self._pending.get(key) is entry:
+                    del self._pending[key]
+                else:
+                    self._queue.put_nowait(key)
+
+    def _handle_failure(self, key: Tuple[str, str], entry: Dict, error: Exception):
+        attempts = self._attempts.get(key, 0) + 1
+        retryable = getattr(error, "is_retryable", True)
+        if not retryable or attempts > self.max_retries:
+            logger.error("Feedback %s descartado após %d tentativa(s): %s", key, attempts, error)
+            self._attempts.pop(key, None)
+            if self._pending.get(key) is entry:
+                del self._pending[key]
+                self._dead_letter(entry, str(error))
+            else:
+                # Uma avaliação mais nova chegou durante o envio: ela substitui a que
+                # falhou e recomeça as tentativas
+                self._queue.put_nowait(key)
+            return
+
+        self._attempts[key] = attempts
+        self.retried += 1
+        delay = min(self.base_delay * (2 ** (attempts - 1)), self.max_delay)
+        delay *= random.uniform(0.5, 1.0)
+        logger.warning("Falha ao enviar feedback %s (tentativa %d), nova tentativa em %.1fs: %s",
+                       key, attempts, delay, error)
+        # O worker fica livre durante a espera; a chave volta para a fila depois do atraso
+        self._retry_handles[key] = asyncio.get_running_loop().call_later(delay, self._requeue, key)
+
+    def _requeue(self, key: Tuple[str, str]):
+        self._retry_handles.pop(key, None)
+        if key in self._pending and self._queue is not None:
+            self._queue.put_nowait(key)
+
+    def _dead_letter(self, entry: Dict, reason: str):
+        self.dead_lettered += 1
+        record = dict(entry, error=reason, failed_at=datetime.now(timezone.utc).isoformat())
+        self._dead_letter_buffer.append(record)
+        # Chamado também no caminho do invoke (fila cheia): o disco não pode atrasar a resposta
+        if self._dead_letter_writer is None or self._dead_letter_writer.done():
+            self._dead_letter_writer = asyncio.get_running_loop().create_task(self._flush_dead_letters())
+
+    async def _flush_dead_letters(self):
+        while self._dead_letter_buffer:
+            records, self._dead_letter_buffer = self._dead_letter_buffer, []
+            await asyncio.to_thread(self._write_dead_letters, records)
+
+    def _write_dead_letters(self, records: List[Dict]):
+        try:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as dead_letter:
+                dead_letter.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        except OSError as e:
+            logger.error("Falha ao gravar %d feedback(s) no dead-letter %s: %s",
+                         len(records), self.dead_letter_path, e)
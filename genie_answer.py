@@ -0,0 +1,72 @@
+"""
+Resposta do Genie já no formato usado pelo bot.
+
+``ask_genie`` devolve um ``GenieAnswer`` que referencia diretamente as colunas
+e os blocos de linhas retornados pela API, sem serializar o resultado para
+JSON e decodificá-lo de novo. A forma JSON continua disponível apenas para
+depuração, via ``to_dict``/``to_json``.
+"""
+
+import itertools
+import json
+from typing import Any, Dict, Iterator, List, Optional
+
+from databricks.sdk.service.sql import ColumnInfo
+
+
+class GenieAnswer:
+    """Resultado de uma pergunta: tabela de dados, texto ou erro"""
+    __slots__ = ("columns", "row_chunks", "total_rows", "description", "text", "error", "statement_id")
+
+    def __init__(
+        self,
+        columns: Optional[List[ColumnInfo]] = None,
+        row_chunks: Optional[List[List[List[Any]]]] = None,
+        total_rows: Optional[int] = None,
+        description: str = "",
+        text: Optional[str] = None,
+        error: Optional[str] = None,
+        statement_id: Optional[str] = None,
+    ):
+        self.columns = columns
+        # Linhas agrupadas nos blocos (chunks) em que a API as entregou
+        self.row_chunks = row_chunks if row_chunks is not None else []
+        self.total_rows = total_rows
+        self.description = description
+        self.text = text
+        self.error = error
+        self.statement_id = statement_id
+
+    @classmethod
+    def from_error(cls, error: str) -> "GenieAnswer":
+        return cls(error=error)
+
+    @property
+    def has_table(self) -> bool:
+        return self.columns is not None
+
+    @property
+    def row_count(self) -> int:
+        """Quantidade de linhas já recebidas"""
+        return sum(len(chunk) for chunk in self.row_chunks)
+
+    def rows(self) -> Iterator[List[Any]]:
+        """Percorre as linhas de todos os blocos, sem copiá-las"""
+        return itertools.chain.from_iterable(self.row_chunks)
+
+    def to_dict(self) -> Dict:
+        """Forma JSON da resposta, usada apenas para depuração"""
+        if self.error is not None:
+            return {"error": self.error}
+        if self.has_table:
+            return {
+                "columns": {"columns": [column.as_dict() for column in self.columns]},
+                "data": {"data_array": list(self.rows())},
+                "total_rows": self.total_rows,
+                "query_description": self.description,
+                "statement_id": self.statement_id,
+            }
+        return {"message": self.text}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False)
@@ -0,0 +1,667 @@
+"""
+Cliente assíncrono para a API REST do Databricks Genie.
+
+As chamadas ``*_and_wait`` do SDK bloqueiam uma thread do executor durante toda
+a geração da resposta. Este cliente usa aiohttp com um único pool de conexões e
+acompanha o status das mensagens por um agendador central de polling
+(``GeniePollScheduler``), sem ocupar nenhuma thread.
+Os objetos retornados são os mesmos tipos do SDK (``GenieMessage``,
+``StatementResponse``...), então o restante do bot não precisa mudar.
+"""
+
+import asyncio
+import functools
+import heapq
+import logging
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple, Union
+
+import aiohttp
+from databricks.sdk.service.dashboards import (
+    GenieGetMessageQueryResultResponse,
+    GenieMessage,
+    GenieSpace,
+    MessageStatus,
+)
+from databricks.sdk.service.sql import GetWarehouseResponse, ResultData, StatementResponse
+
+from metrics import DATABRICKS_REQUEST_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Recebe o novo status de uma mensagem em processamento; pode ser síncrono ou uma corrotina
+StatusCallback = Callable[[MessageStatus], Union[None, Awaitable[None]]]
+
+
+# Status finais de uma mensagem do Genie que não são sucesso
+FAILED_MESSAGE_STATUSES = (
+    MessageStatus.FAILED,
+    MessageStatus.CANCELLED,
+    MessageStatus.QUERY_RESULT_EXPIRED,
+)
+
+
+# Status em que o Genie está executando SQL no warehouse: costumam demorar mais
+SLOW_MESSAGE_STATUSES = (
+    MessageStatus.PENDING_WAREHOUSE,
+    MessageStatus.EXECUTING_QUERY,
+)
+
+
+class GenieAPIError(Exception):
+    """Erro HTTP retornado pela API do Databricks"""
+    def __init__(self, status: int, error_code: str, message: str, retry_after: Optional[float] = None):
+        self.status = status
+        self.error_code = error_code
+        self.message = message
+        self.retry_after = retry_after
+        super().__init__(f"HTTP {status} {error_code}: {message}")
+
+    @property
+    def is_retryable(self) -> bool:
+        return self.status == 429 or self.status >= 500
+
+
+class CircuitOpenError(GenieAPIError):
+    """Chamada recusada localmente porque o circuito para o Databricks está aberto"""
+    def __init__(self, status: int, message: str, retry_after: float):
+        super().__init__(status, "CIRCUIT_OPEN", message, retry_after)
+
+
+class GenieMessageFailedError(Exception):
+    """A mensagem do Genie terminou em um status de falha"""
+    def __init__(self, message: GenieMessage):
+        self.genie_message = message
+        status = message.status.value if message.status else "UNKNOWN"
+        error = message.error.error if message.error else ""
+        super().__init__(f"failed to reach COMPLETED, got {status}: {error}")
+
+
+def _is_ip_acl_block(error: BaseException) -> bool:
+    text = str(error).lower()
+    return "ip acl" in text and "blocked" in text
+
+
+class CircuitBreaker:
+    """Disjuntor das chamadas ao workspace Databricks.
+
+    Conta sucessos e falhas em uma janela deslizante e abre o circuito quando a
+    taxa de falhas passa do limite; um bloqueio por IP ACL abre na hora, por mais
+    tempo. Aberto, recusa as chamadas sem tocar a rede. Depois do tempo de espera
+    deixa passar algumas chamadas de teste (meio aberto): um sucesso fecha o
+    circuito, uma falha o abre de novo.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        window: float = 30.0,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        open_seconds: float = 30.0,
+        acl_open_seconds: float = 300.0,
+        half_open_probes: int = 1,
+    ):
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.acl_open_seconds = acl_open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = self.CLOSED
+        self._results: Deque[Tuple[float, bool]] = deque()
+        self._failures = 0
+        self._open_until = 0.0
+        self._open_status = 503
+        self._open_message = ""
+        self._probes = 0
+        self.opened = 0
+        self.rejected = 0
+
+    def before_call(self):
+        """Levanta CircuitOpenError se a chamada não deve ser feita agora"""
+        if self.state == self.OPEN:
+            remaining = self._open_until - time.monotonic()
+            if remaining > 0:
+                self._reject(remaining)
+            self.state = self.HALF_OPEN
+            self._probes = 0
+            logger.info("Circuito do Databricks meio aberto, testando a conexão")
+        if self.state == self.HALF_OPEN:
+            if self._probes >= self.half_open_probes:
+                self._reject(self.open_seconds)
+            self._probes += 1
+
+    def record_success(self):
+        if self.state == self.HALF_OPEN:
+            logger.info("Circuito do Databricks fechado")
+            self.state = self.CLOSED
+            self._results.clear()
+            self._failures = 0
+        self._add(True)
+
+    def record_failure(self, error: BaseException):
+        if _is_ip_acl_block(error):
+            # O bloqueio por IP ACL não se resolve sozinho em segundos: abre na hora
+            self._open(self.acl_open_seconds, 403, str(error))
+            return
+        if not self._is_failure(error):
+            # Erros do cliente (400, 404, 429...) mostram que o serviço está respondendo
+            self.record_success()
+            return
+        if self.state == self.HALF_OPEN:
+            self._open(self.open_seconds, 503, str(error))
+            return
+        self._add(False)
+        total = len(self._results)
+        if total >= self.min_calls and self._failures / total >= self.failure_rate:
+            self._open(self.open_seconds, 503, str(error))
+
+    def record_cancel(self):
+        """Devolve a vaga de teste de uma chamada cancelada antes de terminar"""
+        if self.state == self.HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    @staticmethod
+    def _is_failure(error: BaseException) -> bool:
+        if isinstance(error, GenieAPIError):
+            return error.status >= 500
+        return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError, OSError))
+
+    def _add(self, ok: bool):
+        now = time.monotonic()
+        self._results.append((now, ok))
+        if not ok:
+            self._failures += 1
+        cutoff = now - self.window
+        while self._results and self._results[0][0] < cutoff:
+            _, old_ok = self._results.popleft()
+            if not old_ok:
+                self._failures -= 1
+
+    def _open(self, duration: float, status: int, message: str):
+        if self.state != self.OPEN:
+            self.opened += 1
+            logger.error("Circuito do Databricks aberto por %.0fs: %s", duration, message)
+        self.state = self.OPEN
+        self._open_until = time.monotonic() + duration
+        self._open_status = status
+        self._open_message = message
+        self._results.clear()
+        self._failures = 0
+
+    def _reject(self, retry_after: float):
+        self.rejected += 1
+        raise CircuitOpenError(
+            self._open_status, f"circuito aberto, última falha: {self._open_message}", retry_after
+        )
+
+    def metrics(self) -> Dict[str, Union[str, int]]:
+        return {"state": self.state, "opened": self.opened, "rejected": self.rejected}
+
+
+class AsyncGenieClient:
+    """Cliente aiohttp para as APIs do Genie e de execução de instruções SQL"""
+
+    def __init__(
+        self,
+        host: str,
+        token: str,
+        max_concurrency: int = 50,
+        pool_size: int = 100,
+        request_timeout: float = 30.0,
+        message_timeout: float = 1200.0,
+        poll_options: Optional[Dict] = None,
+        breaker_options: Optional[Dict] = None,
+    ):
+        host = (host or "").rstrip("/")
+        if host and not host.startswith(("http://", "https://")):
+            host = f"https://{host}"
+        self._base_url = host
+        self._pool_size = pool_size
+        self._request_timeout = request_timeout
+        self.message_timeout = message_timeout
+        # Limita o número de requisições HTTP simultâneas, não o de perguntas:
+        # perguntas aguardando o Genie não ocupam vagas enquanto dormem.
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._headers = {
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+        }
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._owns_session = False
+        self.poller = GeniePollScheduler(self, **(poll_options or {}))
+        self.breaker = CircuitBreaker(**(breaker_options or {}))
+
+    def attach_session(self, session: aiohttp.ClientSession):
+        """Passa a usar a sessão HTTP da aplicação, que continua pertencendo a quem a criou"""
+        self._session = session
+        self._owns_session = False
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Retorna a sessão HTTP em uso, criando uma própria se nenhuma foi anexada"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self._pool_size, limit_per_host=self._pool_size)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self._request_timeout),
+            )
+            self._owns_session = True
+        return self._session
+
+    async def close(self):
+        """Encerra o agendador de polling e fecha o pool de conexões, se for próprio"""
+        await self.poller.close()
+        if self._owns_session and self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _request(self, operation: str, method: str, path: str, body: Optional[Dict] = None) -> Dict:
+        # Com o circuito aberto a chamada falha na hora, sem ocupar conexão nem esperar timeout
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            DATABRICKS_REQUEST_SECONDS.observe(0, operation=operation, outcome="rejected")
+            raise
+        started = time.perf_counter()
+        try:
+            result = await self._send(method, path, body)
+        except asyncio.CancelledError:
+            self.breaker.record_cancel()
+            DATABRICKS_REQUEST_SECONDS.observe(time.perf_counter() - started, operation=operation, outcome="cancelled")
+            raise
+        except Exception as e:
+            self.breaker.record_failure(e)
+            DATABRICKS_REQUEST_SECONDS.observe(time.perf_counter() - started, operation=operation, outcome="error")
+            raise
+        self.breaker.record_success()
+        DATABRICKS_REQUEST_SECONDS.observe(time.perf_counter() - started, operation=operation, outcome="ok")
+        return result
+
+    async def _send(self, method: str, path: str, body: Optional[Dict] = None) -> Dict:
+        session = self._get_session()
+        async with self._semaphore:
+            async with session.request(
+                method, f"{self._base_url}{path}", json=body, headers=self._headers
+            ) as response:
+                if response.status >= 400:
+                    text = await response.text()
+                    error_code = "UNKNOWN"
+                    message = text
+                    try:
+                        payload = await response.json(content_type=None)
+                        error_code = payload.get("error_code", error_code)
+                        message = payload.get("message", text)
+                    except (ValueError, AttributeError):
+                        pass
+                    retry_after = None
+                    if response.headers.get("Retry-After", "").isdigit():
+                        retry_after = float(response.headers["Retry-After"])
+                    raise GenieAPIError(response.status, error_code, message, retry_after)
+                if response.content_length == 0:
+                    return {}
+                return await response.json(content_type=None) or {}
+
+    async def start_conversation(self, space_id: str, content: str) -> GenieMessage:
+        """Inicia uma nova conversa e retorna a mensagem criada (ainda em processamento)"""
+        res = await self._request(
+            "start_conversation", "POST", f"/api/2.0/genie/spaces/{space_id}/start-conversation", {"content": content}
+        )
+        if res.get("message"):
+            return GenieMessage.from_dict(res["message"])
+        return GenieMessage(
+            content=content,
+            conversation_id=res["conversation_id"],
+            message_id=res["message_id"],
+            space_id=space_id,
+        )
+
+    async def create_message(self, space_id: str, conversation_id: str, content: str) -> GenieMessage:
+        """Envia uma nova mensagem em uma conversa existente"""
+        res = await self._request(
+            "create_message",
+            "POST",
+            f"/api/2.0/genie/spaces/{space_id}/conversations/{conversation_id}/messages",
+            {"content": content},
+        )
+        return GenieMessage.from_dict(res)
+
+    async def get_message(self, space_id: str, conversation_id: str, message_id: str) -> GenieMessage:
+        res = await self._request(
+            "get_message",
+            "GET",
+            f"/api/2.0/genie/spaces/{space_id}/conversations/{conversation_id}/messages/{message_id}",
+        )
+        return GenieMessage.from_dict(res)
+
+    async def wait_for_message(
+        self, space_id: str, conversation_id: str, message_id: str, on_status: Optional[StatusCallback] = None
+    ) -> GenieMessage:
+        """Aguarda a mensagem chegar em COMPLETED sem bloquear o loop de eventos.
+
+        ``on_status`` é chamado a cada mudança de status enquanto a mensagem é processada.
+        """
+        return await self.poller.wait(space_id, conversation_id, message_id, self.message_timeout, on_status)
+
+    async def start_conversation_and_wait(
+        self, space_id: str, content: str, on_status: Optional[StatusCallback] = None
+    ) -> GenieMessage:
+        message = await self.start_conversation(space_id, content)
+        return await self.wait_for_message(space_id, message.conversation_id, message.message_id, on_status)
+
+    async def create_message_and_wait(
+        self, space_id: str, conversation_id: str, content: str, on_status: Optional[StatusCallback] = None
+    ) -> GenieMessage:
+        message = await self.create_message(space_id, conversation_id, content)
+        return await self.wait_for_message(space_id, conversation_id, message.message_id, on_status)
+
+    async def get_message_attachment_query_result(
+        self, space_id: str, conversation_id: str, message_id: str, attachment_id: str
+    ) -> GenieGetMessageQueryResultResponse:
+        res = await self._request(
+            "get_query_result",
+            "GET",
+            f"/api/2.0/genie/spaces/{space_id}/conversations/{conversation_id}"
+            f"/messages/{message_id}/attachments/{attachment_id}/query-result",
+        )
+        return GenieGetMessageQueryResultResponse.from_dict(res)
+
+    async def send_message_feedback(self, space_id: str, conversation_id: str, message_id: str, rating: str):
+        """Envia a avaliação (POSITIVE, NEGATIVE ou NONE) de uma mensagem"""
+        await self._request(
+            "send_feedback",
+            "POST",
+            f"/api/2.0/genie/spaces/{space_id}/conversations/{conversation_id}/messages/{message_id}/feedback",
+            {"rating": rating},
+        )
+
+    async def get_space(self, space_id: str) -> GenieSpace:
+        """Dados do espaço do Genie, incluindo o SQL warehouse que ele usa"""
+        res = await self._request("get_space", "GET", f"/api/2.0/genie/spaces/{space_id}")
+        return GenieSpace.from_dict(res)
+
+    async def get_warehouse(self, warehouse_id: str) -> GetWarehouseResponse:
+        res = await self._request("get_warehouse", "GET", f"/api/2.0/sql/warehouses/{warehouse_id}")
+        return GetWarehouseResponse.from_dict(res)
+
+    async def get_statement(self, statement_id: str) -> StatementResponse:
+        res = await self._request("get_statement", "GET", f"/api/2.0/sql/statements/{statement_id}")
+        return StatementResponse.from_dict(res)
+
+    async def get_statement_result_chunk(self, statement_id: str, chunk_index: int) -> ResultData:
+        """Busca um bloco (chunk) do resultado de uma instrução SQL"""
+        res = await self._request(
+            "get_result_chunk", "GET", f"/api/2.0/sql/statements/{statement_id}/result/chunks/{chunk_index}"
+        )
+        return ResultData.from_dict(res)
+
+    async def download_external_link(self, url: str) -> bytes:
+        """Baixa um bloco de resultado de um link externo pré-assinado.
+
+        O link já carrega a autorização, então o token do workspace não é enviado.
+        """
+        session = self._get_session()
+        async with self._semaphore:
+            async with session.get(url) as response:
+                if response.status >= 400:
+                    raise GenieAPIError(response.status, "EXTERNAL_LINK_ERROR", await response.text())
+                return await response.read()
+
+
+class _PendingMessage:
+    """Mensagem do Genie acompanhada pelo agendador"""
+    __slots__ = (
+        "space_id", "conversation_id", "message_id", "future", "deadline",
+        "attempt", "errors", "status", "listeners",
+    )
+
+    def __init__(self, space_id: str, conversation_id: str, message_id: str, future: asyncio.Future, deadline: float):
+        self.space_id = space_id
+        self.conversation_id = conversation_id
+        self.message_id = message_id
+        self.future = future
+        self.deadline = deadline
+        self.attempt = 0
+        self.errors = 0
+        self.status: Optional[MessageStatus] = None
+        self.listeners: List[StatusCallback] = []
+
+
+class GeniePollScheduler:
+    """Agendador central que acompanha todas as mensagens do Genie em andamento.
+
+    Em vez de um loop de polling por pergunta, uma única tarefa consulta as
+    mensagens pendentes conforme vencem, com backoff exponencial e jitter.
+    Mensagens que vencem dentro da mesma janela são consultadas no mesmo ciclo,
+    uma mesma mensagem nunca é consultada duas vezes em paralelo e respostas
+    429 pausam o polling inteiro pelo tempo indicado em ``Retry-After``.
+    """
+
+    def __init__(
+        self,
+        client: "AsyncGenieClient",
+        initial_interval: float = 1.0,
+        max_interval: float = 15.0,
+        backoff_factor: float = 1.5,
+        slow_status_interval: float = 3.0,
+        jitter: float = 0.2,
+        coalesce_window: float = 0.25,
+        max_batch_size: int = 20,
+        max_errors: int = 5,
+    ):
+        self._client = client
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.slow_status_interval = slow_status_interval
+        self.jitter = jitter
+        self.coalesce_window = coalesce_window
+        self.max_batch_size = max_batch_size
+        self.max_errors = max_errors
+        self._pending: Dict[str, _PendingMessage] = {}
+        self._heap: list = []  # (vencimento, sequência, message_id)
+        self._sequence = 0
+        self._paused_until = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # Callbacks assíncronos em execução; a referência evita que o loop os descarte no meio
+        self._callbacks: Set[asyncio.Task] = set()
+        self.polls = 0  # Total de consultas feitas, para diagnóstico
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def watch(
+        self,
+        space_id: str,
+        conversation_id: str,
+        message_id: str,
+        timeout: float,
+        on_status: Optional[StatusCallback] = None,
+    ) -> asyncio.Future:
+        """Registra uma mensagem e retorna um future resolvido quando ela terminar"""
+        entry = self._pending.get(message_id)
+        if entry is not None:
+            if on_status is not None:
+                entry.listeners.append(on_status)
+            return entry.future
+
+        loop = asyncio.get_running_loop()
+        entry = _PendingMessage(
+            space_id, conversation_id, message_id, loop.create_future(), loop.time() + timeout
+        )
+        if on_status is not None:
+            entry.listeners.append(on_status)
+        self._pending[message_id] = entry
+        self._schedule(entry, self.initial_interval)
+        self._ensure_running()
+        return entry.future
+
+    async def wait(
+        self,
+        space_id: str,
+        conversation_id: str,
+        message_id: str,
+        timeout: float,
+        on_status: Optional[StatusCallback] = None,
+    ) -> GenieMessage:
+        # shield: o cancelamento de um aguardador não cancela o future compartilhado
+        return await asyncio.shield(self.watch(space_id, conversation_id, message_id, timeout, on_status))
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._callbacks):
+            task.cancel()
+        if self._callbacks:
+            await asyncio.gather(*self._callbacks, return_exceptions=True)
+        for entry in self._pending.values():
+            if not entry.future.done():
+                entry.future.set_exception(RuntimeError("Agendador de polling do Genie encerrado"))
+        self._pending.clear()
+        self._heap.clear()
+
+    def _ensure_running(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        self._wakeup.set()
+
+    def _next_interval(self, entry: _PendingMessage) -> float:
+        interval = min(self.initial_interval * (self.backoff_factor ** entry.attempt), self.max_interval)
+        if entry.status in SLOW_MESSAGE_STATUSES:
+            interval = max(interval, self.slow_status_interval)
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _schedule(self, entry: _PendingMessage, delay: float):
+        self._sequence += 1
+        due = asyncio.get_running_loop().time() + delay
+        heapq.heappush(self._heap, (due, self._sequence, entry.message_id))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            now = loop.time()
+            due = max(self._heap[0][0], self._paused_until)
+            if due > now:
+                # Dorme até a próxima mensagem vencer, ou até uma nova ser registrada
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), due - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Agrupa todas as mensagens que vencem dentro da janela em um só ciclo
+            batch = []
+            seen = set()
+            horizon = now + self.coalesce_window
+            while self._heap and self._heap[0][0] <= horizon and len(batch) < self.max_batch_size:
+                _, _, message_id = heapq.heappop(self._heap)
+                entry = self._pending.get(message_id)
+                if entry is not None and message_id not in seen:
+                    seen.add(message_id)
+                    batch.append(entry)
+            if batch:
+                # Uma falha inesperada em uma mensagem não pode derrubar o agendador inteiro
+                results = await asyncio.gather(*(self._poll(entry) for entry in batch), return_exceptions=True)
+                for entry, result in zip(batch, results):
+                    if isinstance(result, Exception):
+                        logger.error("Falha inesperada no polling da mensagem %s: %s", entry.message_id, result)
+                        self._finish(entry, exception=result)
+
+    async def _poll(self, entry: _PendingMessage):
+        loop = asyncio.get_running_loop()
+        self.polls += 1
+        try:
+            message = await self._client.get_message(entry.space_id, entry.conversation_id, entry.message_id)
+        except GenieAPIError as e:
+            if e.status == 429:
+                # Limite de taxa atingido: pausa todo o polling, não só esta mensagem
+                pause = e.retry_after or self.max_interval
+                self._paused_until = max(self._paused_until, loop.time() + pause)
+                logger.warning("Genie retornou 429, pausando o polling por %.1fs", pause)
+                self._reschedule(entry, pause)
+                return
+            if e.is_retryable and entry.errors < self.max_errors:
+                entry.errors += 1
+                self._reschedule(entry, self._next_interval(entry))
+                return
+            self._finish(entry, exception=e)
+            return
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if entry.errors < self.max_errors:
+                entry.errors += 1
+                self._reschedule(entry, self._next_interval(entry))
+                return
+            self._finish(entry, exception=e)
+            return
+        except Exception as e:
+            # Resposta que não pôde ser interpretada (JSON inválido, payload inesperado...):
+            # repetir não adianta, então a pergunta termina com o erro
+            logger.error("Resposta inesperada ao consultar a mensagem %s: %s", entry.message_id, e)
+            self._finish(entry, exception=e)
+            return
+
+        entry.errors = 0
+        status_changed = message.status != entry.status
+        entry.status = message.status
+        if message.status == MessageStatus.COMPLETED:
+            self._finish(entry, result=message)
+        elif message.status in FAILED_MESSAGE_STATUSES:
+            self._finish(entry, exception=GenieMessageFailedError(message))
+        else:
+            if status_changed:
+                self._notify(entry)
+            entry.attempt += 1
+            self._reschedule(entry, self._next_interval(entry))
+
+    def _notify(self, entry: _PendingMessage):
+        """Avisa os interessados sobre a mudança de status, sem bloquear o ciclo de polling"""
+        for listener in entry.listeners:
+            try:
+                result = listener(entry.status)
+                if asyncio.iscoroutine(result):
+                    task = asyncio.get_running_loop().create_task(result)
+                    self._callbacks.add(task)
+                    task.add_done_callback(functools.partial(self._callback_done, entry.message_id))
+            except Exception as e:
+                logger.warning("Falha no callback de status da mensagem %s: %s", entry.message_id, e)
+
+    def _callback_done(self, message_id: str, task: asyncio.Task):
+        self._callbacks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Falha no callback de status da mensagem %s: %s", message_id, task.exception())
+
+    def _reschedule(self, entry: _PendingMessage, delay: float):
+        if asyncio.get_running_loop().time() + delay > entry.deadline:
+            self._finish(entry, exception=asyncio.TimeoutError(
+                f"timed out waiting for message {entry.message_id} (last status: {entry.status})"
+            ))
+            return
+        self._schedule(entry, delay)
+
+    def _finish(self, entry: _PendingMessage, result: Optional[GenieMessage] = None, exception: Optional[BaseException] = None):
+        self._pending.pop(entry.message_id, None)
+        if entry.future.done():
+            return
+        if exception is not None:
+            entry.future.set_exception(exception)
+        else:
+            entry.future.set_result(result)
@@ -0,0 +1,26 @@
+"""
+Cliente HTTP compartilhado pela aplicação.
+
+Uma única ``aiohttp.ClientSession`` é criada na inicialização do app e
+fechada no encerramento. Todas as chamadas REST diretas do bot (Genie,
+execução de instruções SQL, feedback) reaproveitam suas conexões keep-alive,
+evitando um novo handshake TCP+TLS com o Databricks a cada chamada.
+"""
+
+import aiohttp
+
+
+def create_http_session(config) -> aiohttp.ClientSession:
+    """Cria a sessão HTTP da aplicação com o connector ajustado pela configuração"""
+    connector = aiohttp.TCPConnector(
+        limit=config.HTTP_POOL_LIMIT,
+        limit_per_host=config.GENIE_HTTP_POOL_SIZE,
+        keepalive_timeout=config.HTTP_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=config.HTTP_DNS_CACHE_TTL,
+        enable_cleanup_closed=True,
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=config.GENIE_REQUEST_TIMEOUT,
+        connect=config.HTTP_CONNECT_TIMEOUT,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
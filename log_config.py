@@ -0,0 +1,201 @@
+"""
+Configuração dos logs da aplicação.
+
+Os handlers do ``logging`` são síncronos: escrever no stdout a partir de um
+handler do aiohttp bloqueia o loop de eventos. ``setup_logging`` deixa no
+logger raiz apenas um ``QueueHandler``, que enfileira o registro sem
+formatá-lo, e um ``QueueListener`` que formata e escreve em uma thread
+própria. No loop ficam só o filtro de nível, a amostragem e o enfileiramento.
+
+- Saída em JSON (uma linha por registro) ou texto, conforme ``LOG_FORMAT``.
+- Mensagens com formatação preguiçosa (``logger.info("... %s", valor)``),
+  resolvidas apenas na thread de escrita e só se o nível estiver habilitado.
+- Eventos ruidosos, identificados por ``extra={"event": ...}`` ou pelo nome do
+  logger, podem ser amostrados (``LOG_SAMPLE_RATES``); avisos e erros nunca são
+  descartados.
+- Texto digitado pelo usuário vai em ``extra={"user_text": ...}`` e sai como
+  tamanho + hash, a menos que ``LOG_USER_TEXT`` esteja habilitado.
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+# Atributos que todo LogRecord tem; o restante veio de ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+# Campos de ``extra`` com texto do usuário
+USER_TEXT_FIELDS = ("user_text",)
+
+
+def redact_text(text: Optional[str]) -> str:
+    """Resumo de um texto do usuário: permite correlacionar repetições sem expor o conteúdo"""
+    if text is None:
+        return "<vazio>"
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+    return f"<{len(text)} caracteres, sha256:{digest}>"
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """Converte "evento=0.1,aiohttp.access=0.01" em {nome: taxa}"""
+    rates = {}
+    for item in value.split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Mantém só uma fração dos registros de eventos ruidosos (abaixo de WARNING)"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not self.rates or record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(getattr(record, "event", None))
+        if rate is None:
+            rate = self.rates.get(record.name)
+        if rate is None or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """Enfileira o registro como está; com a fila cheia o registro é descartado, nunca espera"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # O QueueHandler padrão formata a mensagem aqui, no loop de eventos. Como a fila
+        # não sai do processo, o registro segue intacto e é formatado pelo listener.
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _extra_fields(record: logging.LogRecord, log_user_text: bool) -> Dict:
+    fields = {}
+    for key, value in vars(record).items():
+        if key in _RECORD_ATTRIBUTES:
+            continue
+        if key in USER_TEXT_FIELDS and not log_user_text:
+            value = redact_text(value)
+        fields[key] = value
+    return fields
+
+
+class JsonFormatter(logging.Formatter):
+    """Um objeto JSON por linha, com os campos de ``extra`` no nível de cima"""
+
+    def __init__(self, log_user_text: bool = False):
+        super().__init__()
+        self.log_user_text = log_user_text
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(_extra_fields(record, self.log_user_text))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Formato legível para desenvolvimento; os campos de ``extra`` vão ao final como chave=valor"""
+
+    def __init__(self, log_user_text: bool = False):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        self.log_user_text = log_user_text
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _extra_fields(record, self.log_user_text)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class LogPipeline:
+    """QueueHandler no logger raiz e QueueListener escrevendo no stdout em outra thread"""
+
+    def __init__(
+        self,
+        level: str = "INFO",
+        log_format: str = "json",
+        sample_rates: Optional[Dict[str, float]] = None,
+        log_user_text: bool = False,
+        queue_size: int = 10000,
+    ):
+        self.level = logging.getLevelName(level.upper()) if isinstance(level, str) else level
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.handler = _NonBlockingQueueHandler(self._queue)
+        self.sampler = SamplingFilter(sample_rates or {})
+        self.handler.addFilter(self.sampler)
+
+        output = logging.StreamHandler(sys.stdout)
+        formatter_class = TextFormatter if log_format == "text" else JsonFormatter
+        output.setFormatter(formatter_class(log_user_text))
+        self.listener = QueueListener(self._queue, output, respect_handler_level=False)
+        self._started = False
+
+    def start(self):
+        if self._started:
+            return
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(self.level)
+        self.listener.start()
+        self._started = True
+
+    def stop(self):
+        """Escreve o que ainda está na fila e encerra a thread de escrita"""
+        if not self._started:
+            return
+        self._started = False
+        self.listener.stop()
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "dropped": self.handler.dropped,
+            "sampled_out": self.sampler.sampled_out,
+        }
+
+
+def setup_logging(config) -> LogPipeline:
+    """Instala o pipeline de logs conforme a configuração e o encerra na saída do processo"""
+    pipeline = LogPipeline(
+        level=config.LOG_LEVEL,
+        log_format=config.LOG_FORMAT,
+        sample_rates=parse_sample_rates(config.LOG_SAMPLE_RATES),
+        log_user_text=config.LOG_USER_TEXT,
+        queue_size=config.LOG_QUEUE_MAX_SIZE,
+    )
+    pipeline.start()
+    atexit.register(pipeline.stop)
+    return pipeline
@@ -0,0 +1,252 @@
+"""
+Métricas da aplicação no formato texto do Prometheus.
+
+Implementação mínima de contadores, gauges e histogramas com rótulos, sem
+dependências externas. As métricas abaixo são registradas no ``REGISTRY``
+global e expostas pela rota ``/metrics``. Valores que só existem sob demanda
+(tamanho do armazenamento de sessões, fila dos executores...) são atualizados
+por coletores chamados a cada leitura.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+Collector = Callable[[], Union[None, Awaitable[None]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class CountingThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor que conta as tarefas ainda aguardando uma thread livre.
+
+    A fila interna do ``ThreadPoolExecutor`` não é API pública; a contagem é
+    feita aqui, na submissão e no início (ou cancelamento) de cada tarefa.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._count_lock = threading.Lock()
+        self._waiting = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._waiting
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        left_queue = []
+
+        def run():
+            self._leave_queue(left_queue)
+            return fn(*args, **kwargs)
+
+        with self._count_lock:
+            self._waiting += 1
+        try:
+            future = super().submit(run)
+        except BaseException:
+            self._leave_queue(left_queue)
+            raise
+        # Tarefas canceladas antes de começar também saem da fila
+        future.add_done_callback(lambda _: self._leave_queue(left_queue))
+        return future
+
+    def _leave_queue(self, left_queue: list):
+        with self._count_lock:
+            if not left_queue:
+                left_queue.append(True)
+                self._waiting -= 1
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Rótulos inválidos para {self.name}: {sorted(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Valor que só aumenta"""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Valor que sobe e desce"""
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Distribuição de valores (durações) em faixas cumulativas"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # rótulos -> [contagem por faixa..., soma, total]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 2)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Mede a duração do bloco, inclusive quando ele termina com exceção"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(bound)))} {_format_value(cumulative)}"
+                )
+            total = series[-1]
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {_format_value(total)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(total)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Conjunto de métricas exportadas juntas"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Collector] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Collector):
+        """Registra uma função (ou corrotina) que atualiza gauges antes de cada exportação"""
+        self._collectors.append(collector)
+
+    async def render(self) -> str:
+        for collector in self._collectors:
+            result = collector()
+            if asyncio.iscoroutine(result):
+                await result
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "genie_bot_stage_seconds",
+    "Duração de cada etapa do atendimento de uma pergunta",
+    ("stage",),
+)
+DATABRICKS_REQUEST_SECONDS = REGISTRY.histogram(
+    "genie_bot_databricks_request_seconds",
+    "Duração das chamadas REST ao Databricks por operação",
+    ("operation", "outcome"),
+)
+IN_FLIGHT = REGISTRY.gauge(
+    "genie_bot_in_flight",
+    "Trabalhos em andamento por tipo",
+    ("kind",),
+)
+EXECUTOR_QUEUE_DEPTH = REGISTRY.gauge(
+    "genie_bot_executor_queue_depth",
+    "Tarefas aguardando uma thread livre em cada executor",
+    ("executor",),
+)
+SESSIONS = REGISTRY.gauge(
+    "genie_bot_sessions",
+    "Sessões de usuário no armazenamento",
+)
+FEEDBACK_TOTAL = REGISTRY.counter(
+    "genie_bot_feedback_total",
+    "Feedbacks recebidos e enviados, por resultado",
+    ("outcome",),
+)
+GENIE_CIRCUIT_STATE = REGISTRY.gauge(
+    "genie_bot_genie_circuit_state",
+    "Estado do disjuntor das chamadas ao Databricks (1 no estado atual)",
+    ("state",),
+)
+COMPONENT_STAT = REGISTRY.gauge(
+    "genie_bot_component_stat",
+    "Contadores internos dos componentes (cache, fila de feedback, disjuntor...)",
+    ("component", "stat"),
+)
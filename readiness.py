@@ -0,0 +1,133 @@
+"""
+Verificação de prontidão da instância (rota ``/readyz``).
+
+Uma instância nova só deve receber tráfego depois de confirmar que o token do
+Databricks é aceito e que o SQL warehouse do espaço do Genie existe. O
+``ReadinessProbe`` faz essa verificação em segundo plano assim que o app sobe,
+a cada ``retry_interval`` enquanto não estiver pronto e a cada
+``cache_seconds`` depois disso. A rota só lê o último resultado, então uma
+sonda do balanceador nunca espera por uma chamada ao workspace nem a provoca.
+Um warehouse parado conta como pronto: ele é iniciado pela primeira consulta.
+
+A mesma verificação detecta alterações na configuração do espaço (``etag`` e
+``update_time``) e avisa ``on_space_change``, usado para invalidar o cache de
+respostas.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from databricks.sdk.service.sql import State
+
+logger = logging.getLogger(__name__)
+
+_UNAVAILABLE_WAREHOUSE_STATES = frozenset({State.DELETED, State.DELETING})
+
+
+class ReadinessProbe:
+    """Autenticação no workspace e acesso ao SQL warehouse, com resultado em cache"""
+
+    def __init__(
+        self,
+        client,
+        space_id: str,
+        warehouse_id: str = "",
+        cache_seconds: float = 30,
+        retry_interval: float = 5,
+    ):
+        self.client = client
+        self.space_id = space_id
+        self.warehouse_id = warehouse_id
+        self.cache_seconds = cache_seconds
+        self.retry_interval = retry_interval
+        self._result: Optional[Dict] = None
+        self._task: Optional[asyncio.Task] = None
+        # Chamado quando a configuração do espaço muda entre duas verificações
+        self.on_space_change: Optional[Callable[[], None]] = None
+        self._space_version: Optional[Tuple] = None
+        self.checks = 0
+        self.failures = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._result is not None and self._result["ready"]
+
+    @property
+    def result(self) -> Dict:
+        """Resultado da última verificação, sem chamar o workspace"""
+        if self._result is None:
+            return {"ready": False, "checks": {"databricks_auth": "verificação em andamento"}}
+        return self._result
+
+    def start(self):
+        """Inicia a verificação periódica em segundo plano"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def _refresh_loop(self):
+        while True:
+            was_ready = self.ready
+            result = await self._check()
+            if result["ready"] and not was_ready:
+                logger.info("Instância pronta para receber tráfego")
+            await asyncio.sleep(self.cache_seconds if result["ready"] else self.retry_interval)
+
+    async def _check(self) -> Dict:
+        self.checks += 1
+        checks = {}
+        ready = True
+        warehouse_id = self.warehouse_id
+        try:
+            if not self.space_id:
+                raise ValueError("DATABRICKS_SPACE_ID não definido")
+            space = await self.client.get_space(self.space_id)
+            warehouse_id = warehouse_id or space.warehouse_id
+            checks["databricks_auth"] = "ok"
+            self._track_space_version(space)
+        except Exception as e:
+            checks["databricks_auth"] = f"falha: {e}"
+            ready = False
+
+        if ready:
+            if not warehouse_id:
+                checks["warehouse"] = "ok: warehouse não informado pelo espaço"
+            else:
+                try:
+                    warehouse = await self.client.get_warehouse(warehouse_id)
+                    if warehouse.state in _UNAVAILABLE_WAREHOUSE_STATES:
+                        checks["warehouse"] = f"falha: warehouse {warehouse_id} em {warehouse.state.value}"
+                        ready = False
+                    else:
+                        state = warehouse.state.value if warehouse.state else "desconhecido"
+                        checks["warehouse"] = f"ok: {state}"
+                except Exception as e:
+                    checks["warehouse"] = f"falha: {e}"
+                    ready = False
+
+        if not ready:
+            self.failures += 1
+            logger.warning("Instância ainda não está pronta: %s", checks)
+        self._result = {"ready": ready, "checks": checks, "checked_at": time.time()}
+        return self._result
+
+    def _track_space_version(self, space):
+        version = (space.etag, space.update_time)
+        changed = self._space_version is not None and version != self._space_version
+        self._space_version = version
+        if changed:
+            logger.info("Configuração do espaço %s alterada", self.space_id)
+            if self.on_space_change is not None:
+                try:
+                    self.on_space_change()
+                except Exception as e:
+                    logger.warning("Falha ao tratar a alteração do espaço %s: %s", self.space_id, e)
+
+    async def close(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def metrics(self) -> Dict[str, int]:
+        return {"ready": int(self.ready), "checks": self.checks, "failures": self.failures}
@@ -0,0 +1,286 @@
+"""
+Exportação do resultado completo de uma consulta para CSV ou Parquet.
+
+A tabela enviada no chat é limitada; para obter todos os dados o usuário
+pede uma exportação da última consulta. Os blocos do resultado são lidos pelo
+``StatementResultReader`` e gravados um a um no arquivo por um pool de threads,
+então apenas alguns blocos ficam em memória e o event loop não é bloqueado.
+Os arquivos ficam em ``export_dir`` até serem enviados e são apagados depois
+de ``file_ttl`` segundos.
+"""
+
+import asyncio
+import base64
+import logging
+import os
+import re
+import tempfile
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, List, Optional
+
+import aiohttp
+from databricks.sdk.service.sql import ColumnInfo, StatementState
+
+from metrics import CountingThreadPoolExecutor
+from result_renderer import DECIMAL_TYPES, INTEGER_TYPES
+from statement_reader import StatementResultReader
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+_EXPORT_ID = re.compile(r"^[0-9a-f]{32}$")
+
+# Tamanho de cada parte enviada na sessão de upload do Teams (múltiplo de 320 KiB, exigido pelo OneDrive)
+UPLOAD_CHUNK_SIZE = 12 * 320 * 1024
+
+
+class ExportError(Exception):
+    """Falha na exportação, com uma mensagem que pode ser mostrada ao usuário"""
+
+
+class ExportFile:
+    """Arquivo gerado por uma exportação"""
+    __slots__ = ("export_id", "path", "filename", "file_format", "size", "rows", "truncated")
+
+    def __init__(self, export_id: str, path: str, filename: str, file_format: str, size: int, rows: int, truncated: bool):
+        self.export_id = export_id
+        self.path = path
+        self.filename = filename
+        self.file_format = file_format
+        self.size = size
+        self.rows = rows
+        self.truncated = truncated
+
+    @property
+    def content_type(self) -> str:
+        return EXPORT_FORMATS[self.file_format]
+
+
+def _column_dtype(column: ColumnInfo) -> str:
+    type_name = column.type_name.value if column.type_name else None
+    if type_name in INTEGER_TYPES:
+        return "int"
+    if type_name in DECIMAL_TYPES:
+        return "float"
+    return "string"
+
+
+def _import_pyarrow():
+    """Importa o pyarrow na primeira exportação em Parquet; None se não estiver instalado"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:  # pragma: no cover - dependência opcional
+        return None
+    return pyarrow
+
+
+def _to_frame(rows: List[List[Any]], columns: List[ColumnInfo], dtypes: List[str]) -> "pd.DataFrame":
+    """Converte um bloco de linhas (valores em texto ou já tipados) em DataFrame tipado"""
+    # Importado só na primeira exportação: o pandas é pesado e a maioria das instâncias nunca exporta
+    import pandas as pd
+
+    names = [column.name for column in columns]
+    frame = pd.DataFrame(rows, columns=names)
+    for name, dtype in zip(names, dtypes):
+        if dtype == "int":
+            frame[name] = pd.to_numeric(frame[name], errors="coerce").astype("Int64")
+        elif dtype == "float":
+            frame[name] = pd.to_numeric(frame[name], errors="coerce").astype("float64")
+        else:
+            frame[name] = frame[name].astype("string")
+    return frame
+
+
+class _CsvWriter:
+    def __init__(self, path: str, columns: List[ColumnInfo]):
+        self.columns = columns
+        self.dtypes = [_column_dtype(column) for column in columns]
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._header = True
+
+    def write(self, rows: List[List[Any]]):
+        _to_frame(rows, self.columns, self.dtypes).to_csv(self._file, header=self._header, index=False)
+        self._header = False
+
+    def close(self):
+        if self._header:
+            # Resultado vazio: o arquivo ainda leva o cabeçalho
+            self.write([])
+        self._file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path: str, columns: List[ColumnInfo]):
+        pyarrow = self._pyarrow = _import_pyarrow()
+        if pyarrow is None:
+            raise ExportError("A exportação em Parquet requer o pacote pyarrow, que não está instalado.")
+        self.columns = columns
+        self.dtypes = [_column_dtype(column) for column in columns]
+        arrow_types = {"int": pyarrow.int64(), "float": pyarrow.float64(), "string": pyarrow.string()}
+        self.schema = pyarrow.schema(
+            [(column.name, arrow_types[dtype]) for column, dtype in zip(columns, self.dtypes)]
+        )
+        self._writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, rows: List[List[Any]]):
+        frame = _to_frame(rows, self.columns, self.dtypes)
+        self._writer.write_table(self._pyarrow.Table.from_pandas(frame, schema=self.schema, preserve_index=False))
+
+    def close(self):
+        self._writer.close()
+
+
+class ResultExporter:
+    """Gera arquivos com o resultado completo de instruções SQL, fora do event loop"""
+
+    def __init__(
+        self,
+        client,
+        reader: StatementResultReader,
+        export_dir: Optional[str] = None,
+        workers: int = 2,
+        max_rows: int = 1_000_000,
+        file_ttl: float = 3600,
+    ):
+        self.client = client
+        self.reader = reader
+        self.export_dir = export_dir or os.path.join(tempfile.gettempdir(), "genie-bot-exports")
+        self.max_rows = max_rows
+        self.file_ttl = file_ttl
+        self._executor = CountingThreadPoolExecutor(max_workers=workers, thread_name_prefix="export")
+        # Limita as exportações simultâneas ao tamanho do pool
+        self._slots = asyncio.Semaphore(workers)
+        self._session: Optional[aiohttp.ClientSession] = None
+        os.makedirs(self.export_dir, exist_ok=True)
+
+    def attach_session(self, session: aiohttp.ClientSession):
+        """Usa a sessão HTTP compartilhada da aplicação para os uploads"""
+        self._session = session
+
+    @property
+    def queue_depth(self) -> int:
+        """Tarefas aguardando uma thread livre no pool de exportação"""
+        return self._executor.queue_depth
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def export(self, statement_id: str, file_format: str = "csv") -> ExportFile:
+        """Lê todos os blocos do resultado e grava o arquivo no formato pedido"""
+        if file_format not in EXPORT_FORMATS:
+            raise ExportError(f"Formato de exportação não suportado: {file_format}")
+
+        statement = await self.client.get_statement(statement_id)
+        state = statement.status.state if statement.status else None
+        if state != StatementState.SUCCEEDED or statement.manifest is None:
+            raise ExportError(
+                "O resultado da última consulta não está mais disponível. Faça a pergunta novamente e exporte em seguida."
+            )
+        columns = (statement.manifest.schema.columns if statement.manifest.schema else None) or []
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.cleanup)
+
+        export_id = uuid.uuid4().hex
+        path = self.path_for(export_id, file_format)
+        rows = 0
+        async with self._slots:
+            writer_class = _CsvWriter if file_format == "csv" else _ParquetWriter
+            writer = await loop.run_in_executor(self._executor, writer_class, path, columns)
+            chunks = self.reader.iter_chunks(statement, self.max_rows)
+            try:
+                # O leitor para sozinho ao atingir max_rows; só o último bloco pode precisar de corte
+                async for chunk in chunks:
+                    chunk = chunk[: self.max_rows - rows]
+                    await loop.run_in_executor(self._executor, writer.write, chunk)
+                    rows += len(chunk)
+            except BaseException:
+                await chunks.aclose()
+                await loop.run_in_executor(self._executor, writer.close)
+                await loop.run_in_executor(self._executor, self._remove, path)
+                raise
+            await loop.run_in_executor(self._executor, writer.close)
+
+        total_rows = statement.manifest.total_row_count
+        size = os.path.getsize(path)
+        filename = f"genie_{time.strftime('%Y%m%d_%H%M%S')}.{file_format}"
+        logger.info("Exportação %s concluída: %d linhas, %d bytes", export_id, rows, size)
+        return ExportFile(
+            export_id, path, filename, file_format, size, rows,
+            truncated=total_rows is not None and total_rows > rows,
+        )
+
+    def path_for(self, export_id: str, file_format: str) -> str:
+        """Caminho do arquivo de uma exportação; o ID vem de contextos enviados de volta pelo canal"""
+        if not _EXPORT_ID.match(export_id or "") or file_format not in EXPORT_FORMATS:
+            raise ExportError("Exportação inválida.")
+        return os.path.join(self.export_dir, f"{export_id}.{file_format}")
+
+    async def read_data_uri(self, export: ExportFile) -> str:
+        """Conteúdo do arquivo como data URI, para canais sem upload de arquivos"""
+        def encode() -> str:
+            with open(export.path, "rb") as exported:
+                return base64.b64encode(exported.read()).decode("ascii")
+
+        encoded = await asyncio.get_running_loop().run_in_executor(self._executor, encode)
+        return f"data:{export.content_type};base64,{encoded}"
+
+    async def upload(self, path: str, upload_url: str):
+        """Envia o arquivo para a sessão de upload do Teams, em partes"""
+        if self._session is None:
+            raise ExportError("Sessão HTTP não inicializada.")
+        loop = asyncio.get_running_loop()
+        # Abertura, leitura e fechamento do arquivo ficam no pool de exportação, fora do event loop
+        exported, size = await loop.run_in_executor(self._executor, self._open_for_upload, path)
+        try:
+            offset = 0
+            while offset < size:
+                data = await loop.run_in_executor(self._executor, exported.read, UPLOAD_CHUNK_SIZE)
+                if not data:
+                    break
+                headers = {"Content-Range": f"bytes {offset}-{offset + len(data) - 1}/{size}"}
+                async with self._session.put(upload_url, data=data, headers=headers) as response:
+                    if response.status >= 400:
+                        raise ExportError(f"Falha no upload do arquivo ({response.status}).")
+                offset += len(data)
+        finally:
+            await loop.run_in_executor(self._executor, exported.close)
+
+    @staticmethod
+    def _open_for_upload(path: str):
+        exported = open(path, "rb")
+        return exported, os.fstat(exported.fileno()).st_size
+
+    def discard(self, path: str):
+        self._remove(path)
+
+    def cleanup(self):
+        """Apaga os arquivos exportados mais antigos que ``file_ttl``"""
+        cutoff = time.time() - self.file_ttl
+        try:
+            entries = list(os.scandir(self.export_dir))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,85 @@
+"""
+Renderização dos resultados de consultas como tabela markdown.
+
+O formatador de cada coluna é escolhido uma única vez, a partir do tipo da
+coluna, e as linhas são consumidas de forma incremental até esgotar o orçamento
+de linhas ou de bytes. Assim o custo e o tamanho da mensagem ficam limitados,
+não importa o tamanho do resultado (o Teams rejeita mensagens muito grandes).
+"""
+
+from typing import Any, Callable, Iterable, List, Optional, Sequence
+
+from databricks.sdk.service.sql import ColumnInfo
+
+# Tipos das colunas (ColumnInfo.type_name) tratados como números; compartilhados
+# com a exportação, para que a tabela e o arquivo tipem as colunas do mesmo jeito
+DECIMAL_TYPES = frozenset({"DECIMAL", "DOUBLE", "FLOAT"})
+INTEGER_TYPES = frozenset({"BYTE", "SHORT", "INT", "BIGINT", "LONG"})
+
+Formatter = Callable[[Any], str]
+
+# Espaço reservado no orçamento de bytes para o rodapé de linhas exibidas
+_FOOTER_RESERVE = 64
+
+
+def _format_decimal(value: Any) -> str:
+    return "NULL" if value is None else f"{float(value):,.2f}"
+
+
+def _format_integer(value: Any) -> str:
+    return "NULL" if value is None else f"{int(value):,}"
+
+
+def _format_text(value: Any) -> str:
+    return "NULL" if value is None else str(value)
+
+
+def column_formatter(type_name: Optional[str]) -> Formatter:
+    """Retorna a função que formata os valores de uma coluna do tipo informado"""
+    if type_name in DECIMAL_TYPES:
+        return _format_decimal
+    if type_name in INTEGER_TYPES:
+        return _format_integer
+    return _format_text
+
+
+def render_table(
+    columns: List[ColumnInfo],
+    rows: Iterable[Sequence[Any]],
+    total_rows: Optional[int] = None,
+    max_rows: int = 200,
+    max_bytes: int = 20000,
+) -> str:
+    """Monta a tabela markdown, parando no limite de linhas ou de bytes.
+
+    ``rows`` pode ser qualquer iterável (inclusive um gerador que busca os dados
+    sob demanda); ele é consumido apenas até o limite. Quando a tabela é cortada,
+    um rodapé informa quantas linhas foram exibidas.
+    """
+    formatters = [column_formatter(col.type_name.value if col.type_name else None) for col in columns]
+    header = "| " + " | ".join(col.name or "" for col in columns) + " |"
+    separator = "|" + "|".join("---" for _ in columns) + "|"
+    parts = [header, "\n", separator, "\n"]
+    used_bytes = len(header.encode("utf-8")) + len(separator.encode("utf-8")) + 2
+
+    shown = 0
+    truncated = False
+    for row in rows:
+        if shown >= max_rows:
+            truncated = True
+            break
+        line = "| " + " | ".join([fmt(value) for fmt, value in zip(formatters, row)]) + " |\n"
+        line_bytes = len(line.encode("utf-8"))
+        if used_bytes + line_bytes > max_bytes - _FOOTER_RESERVE:
+            truncated = True
+            break
+        parts.append(line)
+        used_bytes += line_bytes
+        shown += 1
+
+    if truncated or (total_rows is not None and total_rows > shown):
+        if total_rows is not None:
+            parts.append(f"\n_Exibindo {shown:,} de {total_rows:,} linhas._\n")
+        else:
+            parts.append(f"\n_Exibindo as primeiras {shown:,} linhas._\n")
+    return "".join(parts)
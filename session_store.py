@@ -0,0 +1,433 @@
+"""
+Armazenamento das sessões de usuário do bot.
+
+``SessionStore`` define a interface assíncrona usada pelo bot, com TTL por
+chave. Há três implementações:
+
+- ``MemorySessionStore``: dicionário em memória com limite de tamanho (LRU) e
+  expiração por inatividade. É o padrão e serve para uma única instância.
+- ``SQLiteSessionStore``: arquivo SQLite local, compartilhado entre processos
+  da mesma máquina e preservado entre reinicializações.
+- ``RedisSessionStore``: qualquer servidor que fale o protocolo do Redis,
+  permitindo várias instâncias atrás de um balanceador de carga.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class UserSession:
+    """Representa uma sessão de usuário"""
+    __slots__ = (
+        "user_id", "name", "conversation_id", "created_at",
+        "last_activity", "is_authenticated", "user_context",
+    )
+
+    def __init__(self, user_id: str, name: str = None):
+        self.user_id = user_id  # Teams user ID
+        self.name = name or "Usuario"
+        self.conversation_id = None
+        self.created_at = datetime.now(timezone.utc)
+        self.last_activity = self.created_at
+        self.is_authenticated = True  # Always true for Teams users
+        self.user_context = {}
+
+    def update_activity(self):
+        """Atualize o registro de data e hora da última atividade."""
+        self.last_activity = datetime.now(timezone.utc)
+
+    def to_dict(self):
+        """Converta a sessão em dicionário para registro/debug"""
+        return {
+            "user_id": self.user_id,
+            "name": self.name,
+            "conversation_id": self.conversation_id,
+            "created_at": self.created_at.isoformat(),
+            "last_activity": self.last_activity.isoformat(),
+            "is_authenticated": self.is_authenticated
+        }
+
+    def get_display_name(self):
+        """Pega um nome de exibição amigável para o usuário."""
+        return f"{self.name} ({self.user_id})"
+
+    def to_state(self) -> Dict:
+        """Estado completo da sessão, usado pelos armazenamentos persistentes"""
+        state = self.to_dict()
+        state["user_context"] = self.user_context
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "UserSession":
+        session = cls(state["user_id"], state.get("name"))
+        session.conversation_id = state.get("conversation_id")
+        session.created_at = datetime.fromisoformat(state["created_at"])
+        session.last_activity = datetime.fromisoformat(state["last_activity"])
+        session.is_authenticated = state.get("is_authenticated", True)
+        session.user_context = state.get("user_context") or {}
+        return session
+
+
+class SessionStore(ABC):
+    """Interface dos armazenamentos de sessão.
+
+    Todas as operações são assíncronas. ``set`` aceita um TTL por chave; sem ele
+    vale o TTL padrão do armazenamento. Como os armazenamentos persistentes
+    devolvem cópias, quem altera uma sessão deve chamar ``set`` para gravá-la.
+    """
+
+    def __init__(self, default_ttl: float = 14400):
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    async def get(self, user_id: str) -> Optional[UserSession]:
+        """Sessão do usuário, ou None se não existir ou tiver expirado"""
+
+    @abstractmethod
+    async def set(self, session: UserSession, ttl: Optional[float] = None):
+        """Grava a sessão com o TTL informado (ou o padrão)"""
+
+    @abstractmethod
+    async def delete(self, user_id: str):
+        """Remove a sessão do usuário"""
+
+    @abstractmethod
+    async def size(self) -> int:
+        """Quantidade de sessões armazenadas"""
+
+    def metrics(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def start(self):
+        """Inicia tarefas em segundo plano, se houver"""
+
+    async def close(self):
+        """Libera os recursos do armazenamento"""
+
+    def _count(self, session: Optional[UserSession]) -> Optional[UserSession]:
+        if session is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return session
+
+
+class MemorySessionStore(SessionStore):
+    """Sessões em memória com despejo LRU e expiração por inatividade"""
+
+    def __init__(self, max_size: int = 10000, idle_ttl: float = 14400, sweep_interval: float = 300):
+        super().__init__(idle_ttl)
+        self.max_size = max_size
+        self.sweep_interval = sweep_interval
+        # Da sessão usada há mais tempo para a mais recente: (sessão, expira_em)
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._sweeper: Optional[asyncio.Task] = None
+        self.evictions = 0  # Removidas por exceder o tamanho máximo
+        self.expirations = 0  # Removidas por inatividade
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._sessions
+
+    async def get(self, user_id: str) -> Optional[UserSession]:
+        """Retorna a sessão do usuário, ou None se não existir ou tiver expirado"""
+        item = self._sessions.get(user_id)
+        if item is None:
+            return self._count(None)
+        session, expires_at = item
+        if time.monotonic() > expires_at:
+            del self._sessions[user_id]
+            self.expirations += 1
+            return self._count(None)
+        self._sessions.move_to_end(user_id)
+        return self._count(session)
+
+    async def set(self, session: UserSession, ttl: Optional[float] = None):
+        """Armazena a sessão, despejando as menos usadas se o limite for excedido"""
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.default_ttl)
+        self._sessions[session.user_id] = (session, expires_at)
+        self._sessions.move_to_end(session.user_id)
+        while len(self._sessions) > self.max_size:
+            user_id, _ = self._sessions.popitem(last=False)
+            self.evictions += 1
+            logger.debug("Sessão despejada por limite de tamanho: %s", user_id)
+
+    async def delete(self, user_id: str):
+        self._sessions.pop(user_id, None)
+
+    async def size(self) -> int:
+        return len(self._sessions)
+
+    def sweep(self) -> int:
+        """Remove as sessões expiradas e retorna quantas foram removidas"""
+        now = time.monotonic()
+        expired = [user_id for user_id, (_, expires_at) in self._sessions.items() if now > expires_at]
+        for user_id in expired:
+            del self._sessions[user_id]
+        self.expirations += len(expired)
+        return len(expired)
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "size": len(self._sessions),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def start(self):
+        """Inicia a limpeza periódica em segundo plano"""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_loop())
+
+    async def close(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            removed = self.sweep()
+            if removed:
+                logger.info("Limpeza de sessões: %d removidas, métricas %s", removed, self.metrics())
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessões em um arquivo SQLite local.
+
+    As consultas rodam em uma thread separada para não bloquear o loop de
+    eventos. O modo WAL permite que vários processos da mesma máquina usem o
+    mesmo arquivo.
+    """
+
+    def __init__(self, path: str, default_ttl: float = 14400, sweep_interval: float = 300):
+        super().__init__(default_ttl)
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " user_id TEXT PRIMARY KEY, state TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)")
+        # Uma única conexão compartilhada entre as threads do executor
+        self._lock = threading.Lock()
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    async def get(self, user_id: str) -> Optional[UserSession]:
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT state FROM sessions WHERE user_id = ? AND expires_at > ?",
+            (user_id, time.time()),
+        )
+        return self._count(UserSession.from_state(json.loads(rows[0][0])) if rows else None)
+
+    async def set(self, session: UserSession, ttl: Optional[float] = None):
+        expires_at = time.time() + (ttl if ttl is not None else self.default_ttl)
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT OR REPLACE INTO sessions (user_id, state, expires_at) VALUES (?, ?, ?)",
+            (session.user_id, json.dumps(session.to_state()), expires_at),
+        )
+
+    async def delete(self, user_id: str):
+        await asyncio.to_thread(self._execute, "DELETE FROM sessions WHERE user_id = ?", (user_id,))
+
+    async def size(self) -> int:
+        rows = await asyncio.to_thread(
+            self._execute, "SELECT COUNT(*) FROM sessions WHERE expires_at > ?", (time.time(),)
+        )
+        return rows[0][0]
+
+    def start(self):
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_loop())
+
+    async def close(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+        with self._lock:
+            self._conn.close()
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await asyncio.to_thread(
+                    self._execute, "DELETE FROM sessions WHERE expires_at <= ?", (time.time(),)
+                )
+            except sqlite3.Error as e:
+                logger.error("Falha na limpeza de sessões do SQLite: %s", e)
+
+
+class RedisError(Exception):
+    """Erro retornado por um servidor Redis"""
+
+
+class _RedisConnection:
+    """Conexão mínima com o protocolo RESP do Redis"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    async def execute(self, *args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(f"${len(data)}\r\n".encode())
+            parts.append(data + b"\r\n")
+        self.writer.write(b"".join(parts))
+        await self.writer.drain()
+        return await self._read_reply()
+
+    async def _read_reply(self):
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("Conexão com o Redis encerrada")
+        prefix, rest = line[:1], line[1:-2]
+        if prefix == b"+":
+            return rest.decode()
+        if prefix == b"-":
+            raise RedisError(rest.decode())
+        if prefix == b":":
+            return int(rest)
+        if prefix == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            return (await self.reader.readexactly(length + 2))[:-2]
+        if prefix == b"*":
+            length = int(rest)
+            if length < 0:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise RedisError(f"Resposta inesperada do Redis: {line!r}")
+
+    def close(self):
+        self.writer.close()
+
+
+class RedisSessionStore(SessionStore):
+    """Sessões em um servidor Redis (ou compatível), com expiração nativa por chave"""
+
+    def __init__(
+        self,
+        url: str,
+        default_ttl: float = 14400,
+        max_connections: int = 10,
+        key_prefix: str = "genie-bot:session:",
+    ):
+        super().__init__(default_ttl)
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.use_ssl = parsed.scheme == "rediss"
+        self.key_prefix = key_prefix
+        self._idle: List[_RedisConnection] = []
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def _connect(self) -> _RedisConnection:
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.use_ssl or None)
+        connection = _RedisConnection(reader, writer)
+        try:
+            if self.password:
+                await connection.execute("AUTH", self.password)
+            if self.db:
+                await connection.execute("SELECT", self.db)
+        except BaseException:
+            connection.close()
+            raise
+        return connection
+
+    async def _execute(self, *args):
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else await self._connect()
+            try:
+                result = await connection.execute(*args)
+            except RedisError:
+                # Erro do comando: a resposta foi lida inteira e a conexão segue utilizável
+                self._idle.append(connection)
+                raise
+            except BaseException:
+                # Conexão quebrada ou chamada cancelada no meio da resposta: descarta
+                # para que o próximo comando não leia o resto do fluxo RESP
+                connection.close()
+                raise
+            self._idle.append(connection)
+            return result
+
+    async def get(self, user_id: str) -> Optional[UserSession]:
+        data = await self._execute("GET", self.key_prefix + user_id)
+        return self._count(UserSession.from_state(json.loads(data)) if data else None)
+
+    async def set(self, session: UserSession, ttl: Optional[float] = None):
+        ttl_ms = int((ttl if ttl is not None else self.default_ttl) * 1000)
+        await self._execute(
+            "SET", self.key_prefix + session.user_id, json.dumps(session.to_state()), "PX", max(ttl_ms, 1)
+        )
+
+    async def delete(self, user_id: str):
+        await self._execute("DEL", self.key_prefix + user_id)
+
+    async def size(self) -> int:
+        # DBSIZE conta todas as chaves do banco; use um banco dedicado ao bot
+        return await self._execute("DBSIZE")
+
+    async def close(self):
+        while self._idle:
+            self._idle.pop().close()
+
+
+def create_session_store(config) -> SessionStore:
+    """Cria o armazenamento de sessões configurado em SESSION_BACKEND"""
+    backend = config.SESSION_BACKEND.lower()
+    if backend == "sqlite":
+        return SQLiteSessionStore(
+            config.SESSION_SQLITE_PATH,
+            default_ttl=config.SESSION_IDLE_TTL_SECONDS,
+            sweep_interval=config.SESSION_SWEEP_INTERVAL_SECONDS,
+        )
+    if backend == "redis":
+        return RedisSessionStore(config.SESSION_REDIS_URL, default_ttl=config.SESSION_IDLE_TTL_SECONDS)
+    if backend != "memory":
+        raise ValueError(f"SESSION_BACKEND inválido: {config.SESSION_BACKEND}")
+    return MemorySessionStore(
+        max_size=config.SESSION_MAX_SIZE,
+        idle_ttl=config.SESSION_IDLE_TTL_SECONDS,
+        sweep_interval=config.SESSION_SWEEP_INTERVAL_SECONDS,
+    )
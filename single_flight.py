@@ -0,0 +1,133 @@
+"""
+Execução em fila única por usuário.
+
+Se um usuário envia duas perguntas seguidas, elas não podem rodar ao mesmo
+tempo: ambas continuariam a mesma conversa do Genie e sobrescreveriam o
+``conversation_id`` uma da outra. ``UserSingleFlight`` mantém uma fila por
+usuário, criada sob demanda e descartada quando fica vazia, e registra as
+perguntas em andamento para que um reenvio idêntico apenas aguarde a original.
+
+O lugar na fila é reservado de forma síncrona (``reserve``), no momento em que
+a mensagem chega; assim a ordem das perguntas e o agrupamento de reenvios
+valem mesmo quando a execução começa depois, em uma tarefa em segundo plano.
+A espera pela vez tem limite (``UserLaneTimeout``), para que uma pergunta
+travada não segure indefinidamente as mensagens seguintes do usuário, e a fila
+de cada usuário tem tamanho máximo (``UserLaneFull``): quem aguarda a vez ainda
+não passou pelo controle de admissão, então sem esse limite um único usuário
+poderia manter abertas quantas requisições quisesse.
+"""
+
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+
+class UserLaneTimeout(Exception):
+    """A pergunta esperou demais pelas anteriores do mesmo usuário"""
+
+
+class UserLaneFull(Exception):
+    """O usuário já tem o máximo de perguntas em andamento ou aguardando"""
+
+
+class _UserLane:
+    """Fila e perguntas em andamento de um usuário"""
+    __slots__ = ("queue", "flights")
+
+    def __init__(self):
+        self.queue: Deque["Flight"] = deque()
+        self.flights: Dict[str, asyncio.Future] = {}
+
+
+class Flight:
+    """Lugar reservado na fila de um usuário"""
+    __slots__ = ("user_id", "key", "lane", "turn", "done", "released")
+
+    def __init__(self, user_id: str, key: str, lane: _UserLane, loop: asyncio.AbstractEventLoop):
+        self.user_id = user_id
+        self.key = key
+        self.lane = lane
+        self.turn = loop.create_future()  # resolvido quando chega a vez desta pergunta
+        self.done = loop.create_future()  # resolvido quando a pergunta termina
+        self.released = False
+
+
+class UserSingleFlight:
+    """Serializa as mensagens de cada usuário e agrupa reenvios idênticos"""
+
+    def __init__(self, max_per_user: int = 5):
+        self.max_per_user = max_per_user
+        self._lanes: Dict[str, _UserLane] = {}
+        self.coalesced = 0
+        self.timed_out = 0
+        self.rejected = 0
+
+    @property
+    def active_users(self) -> int:
+        return len(self._lanes)
+
+    def join(self, user_id: str, key: str) -> Optional[asyncio.Future]:
+        """Retorna um aguardável para a execução idêntica em andamento, se houver"""
+        lane = self._lanes.get(user_id)
+        future = lane.flights.get(key) if lane is not None else None
+        if future is None:
+            return None
+        self.coalesced += 1
+        # O cancelamento de quem aguarda não pode cancelar a execução original
+        return asyncio.shield(future)
+
+    def reserve(self, user_id: str, key: str) -> Flight:
+        """Entra na fila do usuário; deve ser liberado por ``run_reserved`` ou ``release``.
+
+        Levanta ``UserLaneFull`` se o usuário já tem ``max_per_user`` perguntas na fila.
+        """
+        lane = self._lanes.get(user_id)
+        if lane is None:
+            lane = self._lanes[user_id] = _UserLane()
+        elif len(lane.queue) >= self.max_per_user:
+            self.rejected += 1
+            raise UserLaneFull(f"{len(lane.queue)} perguntas do usuário já na fila")
+        flight = Flight(user_id, key, lane, asyncio.get_running_loop())
+        lane.flights[key] = flight.done
+        lane.queue.append(flight)
+        if len(lane.queue) == 1:
+            flight.turn.set_result(None)
+        return flight
+
+    @asynccontextmanager
+    async def run_reserved(self, flight: Flight, wait_timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """Executa o bloco depois das mensagens anteriores do mesmo usuário, esperando até ``wait_timeout``"""
+        try:
+            try:
+                await asyncio.wait_for(asyncio.shield(flight.turn), wait_timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise UserLaneTimeout(f"aguardou mais de {wait_timeout:.0f}s pelas perguntas anteriores") from None
+            yield
+        finally:
+            self.release(flight)
+
+    def release(self, flight: Flight):
+        """Sai da fila e passa a vez para a próxima pergunta; chamadas repetidas não têm efeito"""
+        if flight.released:
+            return
+        flight.released = True
+        lane = flight.lane
+        if lane.flights.get(flight.key) is flight.done:
+            del lane.flights[flight.key]
+        flight.done.set_result(None)
+        was_first = lane.queue[0] is flight
+        lane.queue.remove(flight)
+        if was_first and lane.queue:
+            lane.queue[0].turn.set_result(None)
+        if not lane.queue:
+            del self._lanes[flight.user_id]
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "active_users": self.active_users,
+            "coalesced": self.coalesced,
+            "timed_out": self.timed_out,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,132 @@
+"""
+Leitura paginada do resultado de instruções SQL.
+
+A resposta de uma instrução traz apenas o primeiro bloco (chunk) do resultado.
+``StatementResultReader`` busca os blocos seguintes em
+``/api/2.0/sql/statements/{id}/result/chunks/{i}``, alguns em paralelo, e os
+entrega em ordem assim que chegam. A leitura para assim que o limite de linhas
+pedido é atingido, então nunca se baixa mais do que o necessário.
+
+São suportados os dados embutidos (``JSON_ARRAY``) e os links externos nos
+formatos ``JSON_ARRAY`` e ``ARROW_STREAM``. O formato é escolhido pelo Genie ao
+executar a consulta, por isso o ``pyarrow`` está em requirements.txt; ele só é
+importado no primeiro resultado Arrow, fora da inicialização do app. Os links
+externos podem ter vários MB, então a decodificação (Arrow ou JSON) roda em uma
+thread, fora do event loop.
+"""
+
+import asyncio
+import json
+from collections import deque
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from databricks.sdk.service.sql import Format, ResultData, ResultManifest, StatementResponse
+
+Rows = List[List[Any]]
+
+
+def _arrow_rows(payload: bytes) -> Rows:
+    # Importado no primeiro resultado ARROW_STREAM, fora da inicialização do app
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError:  # pragma: no cover - instalação sem requirements.txt
+        raise RuntimeError("O pacote pyarrow é necessário para ler resultados no formato ARROW_STREAM") from None
+    table = pyarrow.ipc.open_stream(payload).read_all()
+    columns = [column.to_pylist() for column in table.columns]
+    return [list(row) for row in zip(*columns)]
+
+
+class StatementResultReader:
+    """Lê os blocos do resultado de uma instrução, com busca antecipada limitada"""
+
+    def __init__(self, client, max_concurrency: int = 4):
+        self.client = client
+        self.max_concurrency = max(1, max_concurrency)
+
+    async def read(self, statement: StatementResponse, max_rows: Optional[int] = None) -> List[Rows]:
+        """Retorna os blocos de linhas até atingir ``max_rows`` (ou o resultado inteiro)"""
+        chunks = []
+        async for rows in self.iter_chunks(statement, max_rows):
+            chunks.append(rows)
+        return chunks
+
+    async def iter_chunks(self, statement: StatementResponse, max_rows: Optional[int] = None) -> AsyncIterator[Rows]:
+        """Entrega os blocos de linhas em ordem, conforme são baixados"""
+        manifest = statement.manifest
+        result_format = manifest.format if manifest else None
+        rows_read = 0
+        next_index = 0
+
+        first = statement.result
+        if first is not None and (first.data_array is not None or first.external_links):
+            rows = await self._rows(first, result_format)
+            yield rows
+            rows_read += len(rows)
+            if first.next_chunk_index is None and not self._has_more(manifest, first):
+                return
+            next_index = first.next_chunk_index if first.next_chunk_index is not None else (first.chunk_index or 0) + 1
+
+        if max_rows is not None and rows_read >= max_rows:
+            return
+
+        indices = self._chunk_indices(manifest, next_index, max_rows)
+        pending: deque = deque()
+        loop = asyncio.get_running_loop()
+        try:
+            for index in indices:
+                pending.append(loop.create_task(self._fetch_chunk(statement.statement_id, index, result_format)))
+                if len(pending) >= self.max_concurrency:
+                    break
+            while pending:
+                rows = await pending.popleft()
+                # Mantém a janela de busca antecipada cheia enquanto o bloco atual é consumido
+                index = next(indices, None)
+                if index is not None:
+                    pending.append(loop.create_task(self._fetch_chunk(statement.statement_id, index, result_format)))
+                yield rows
+                rows_read += len(rows)
+                if max_rows is not None and rows_read >= max_rows:
+                    return
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    @staticmethod
+    def _has_more(manifest: Optional[ResultManifest], first: ResultData) -> bool:
+        total_chunks = manifest.total_chunk_count if manifest else None
+        return total_chunks is not None and (first.chunk_index or 0) + 1 < total_chunks
+
+    @staticmethod
+    def _chunk_indices(manifest: Optional[ResultManifest], start: int, max_rows: Optional[int]) -> Iterator[int]:
+        """Índices dos blocos a buscar, descartando os que começam depois do limite de linhas"""
+        total_chunks = manifest.total_chunk_count if manifest and manifest.total_chunk_count is not None else 0
+        offsets = {chunk.chunk_index: chunk.row_offset for chunk in (manifest.chunks or [])} if manifest else {}
+        for index in range(start, total_chunks):
+            offset = offsets.get(index)
+            if max_rows is not None and offset is not None and offset >= max_rows:
+                return
+            yield index
+
+    async def _fetch_chunk(self, statement_id: str, chunk_index: int, result_format: Optional[Format]) -> Rows:
+        data = await self.client.get_statement_result_chunk(statement_id, chunk_index)
+        return await self._rows(data, result_format)
+
+    async def _rows(self, data: ResultData, result_format: Optional[Format]) -> Rows:
+        if data.data_array is not None:
+            return data.data_array
+        if not data.external_links:
+            return []
+        payloads = await asyncio.gather(
+            *(self.client.download_external_link(link.external_link) for link in data.external_links)
+        )
+        rows: Rows = []
+        for payload in payloads:
+            if result_format == Format.ARROW_STREAM:
+                rows.extend(await asyncio.to_thread(_arrow_rows, payload))
+            elif result_format in (None, Format.JSON_ARRAY):
+                rows.extend(await asyncio.to_thread(json.loads, payload))
+            else:
+                raise ValueError(f"Formato de resultado não suportado: {result_format.value}")
+        return rows
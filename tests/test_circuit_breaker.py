@@ -0,0 +1,117 @@
+"""Testes do CircuitBreaker com relógio controlado"""
+
+import asyncio
+import unittest
+from unittest import mock
+
+from genie_client import CircuitBreaker, CircuitOpenError, GenieAPIError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("genie_client.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(
+            window=30, min_calls=4, failure_rate=0.5, open_seconds=10, acl_open_seconds=100, half_open_probes=1
+        )
+
+    def _fail(self, times: int = 1):
+        for _ in range(times):
+            self.breaker.before_call()
+            self.breaker.record_failure(GenieAPIError(503, "UNAVAILABLE", "down"))
+
+    def _succeed(self, times: int = 1):
+        for _ in range(times):
+            self.breaker.before_call()
+            self.breaker.record_success()
+
+    def test_stays_closed_below_min_calls(self):
+        self._fail(3)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_opens_at_failure_rate_and_rejects(self):
+        self._succeed(2)
+        self._fail(2)
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError) as raised:
+            self.breaker.before_call()
+        self.assertEqual(raised.exception.status, 503)
+        self.assertAlmostEqual(raised.exception.retry_after, 10)
+        self.assertEqual(self.breaker.metrics()["rejected"], 1)
+        self.assertEqual(self.breaker.metrics()["opened"], 1)
+
+    def test_client_errors_do_not_count_as_failures(self):
+        for _ in range(10):
+            self.breaker.before_call()
+            self.breaker.record_failure(GenieAPIError(404, "NOT_FOUND", "missing"))
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_network_errors_count_as_failures(self):
+        for _ in range(4):
+            self.breaker.before_call()
+            self.breaker.record_failure(asyncio.TimeoutError())
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+    def test_old_failures_leave_the_window(self):
+        self._fail(3)
+        self.clock.now += 31
+        self._fail(1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_success_closes(self):
+        self._fail(4)
+        self.clock.now += 10.1
+
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        # Só uma chamada de teste por vez
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.breaker.record_success()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.before_call()
+
+    def test_half_open_failure_reopens(self):
+        self._fail(4)
+        self.clock.now += 10.1
+
+        self._fail(1)
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_cancelled_probe_frees_the_slot(self):
+        self._fail(4)
+        self.clock.now += 10.1
+
+        self.breaker.before_call()
+        self.breaker.record_cancel()
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+    def test_ip_acl_block_opens_immediately(self):
+        self.breaker.before_call()
+        self.breaker.record_failure(GenieAPIError(403, "FORBIDDEN", "Source IP address is blocked by Databricks IP ACL"))
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError) as raised:
+            self.breaker.before_call()
+        self.assertEqual(raised.exception.status, 403)
+        self.assertAlmostEqual(raised.exception.retry_after, 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
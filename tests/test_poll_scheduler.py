@@ -0,0 +1,199 @@
+"""Testes do GeniePollScheduler com um cliente falso, sem rede"""
+
+import asyncio
+import unittest
+from typing import Dict, List, Tuple
+
+from databricks.sdk.service.dashboards import GenieMessage, MessageStatus
+
+from genie_client import GenieAPIError, GenieMessageFailedError, GeniePollScheduler
+
+
+def _message(message_id: str, status: MessageStatus) -> GenieMessage:
+    return GenieMessage(
+        space_id="space", conversation_id=f"conv-{message_id}", content="", message_id=message_id, status=status
+    )
+
+
+class FakeClient:
+    """Responde get_message seguindo um roteiro por mensagem; o último passo se repete"""
+
+    def __init__(self, scripts: Dict[str, list]):
+        self.scripts = scripts
+        self.calls: List[Tuple[float, str]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_message(self, space_id: str, conversation_id: str, message_id: str) -> GenieMessage:
+        self.calls.append((asyncio.get_running_loop().time(), message_id))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0)
+            script = self.scripts[message_id]
+            step = script.pop(0) if len(script) > 1 else script[0]
+            if isinstance(step, BaseException):
+                raise step
+            return _message(message_id, step)
+        finally:
+            self.in_flight -= 1
+
+    def calls_for(self, message_id: str) -> List[float]:
+        return [at for at, called in self.calls if called == message_id]
+
+
+def _scheduler(client: FakeClient, **options) -> GeniePollScheduler:
+    defaults = {
+        "initial_interval": 0.01,
+        "max_interval": 0.05,
+        "backoff_factor": 2.0,
+        "slow_status_interval": 0.01,
+        "jitter": 0.0,
+        "coalesce_window": 0.005,
+    }
+    defaults.update(options)
+    return GeniePollScheduler(client, **defaults)
+
+
+class GeniePollSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_completes_and_notifies_status_changes(self):
+        client = FakeClient({"m1": [MessageStatus.ASKING_AI, MessageStatus.ASKING_AI,
+                                    MessageStatus.EXECUTING_QUERY, MessageStatus.COMPLETED]})
+        scheduler = _scheduler(client)
+        seen = []
+
+        async def on_status(status):
+            seen.append(status)
+
+        message = await scheduler.wait("space", "conv-m1", "m1", timeout=5, on_status=on_status)
+        await asyncio.sleep(0)
+
+        self.assertEqual(message.status, MessageStatus.COMPLETED)
+        self.assertEqual(seen, [MessageStatus.ASKING_AI, MessageStatus.EXECUTING_QUERY])
+        self.assertEqual(scheduler.pending_count, 0)
+        await scheduler.close()
+
+    async def test_failed_status_raises(self):
+        client = FakeClient({"m1": [MessageStatus.FAILED]})
+        scheduler = _scheduler(client)
+
+        with self.assertRaises(GenieMessageFailedError):
+            await scheduler.wait("space", "conv-m1", "m1", timeout=5)
+        await scheduler.close()
+
+    async def test_same_message_is_polled_once_for_all_waiters(self):
+        client = FakeClient({"m1": [MessageStatus.ASKING_AI, MessageStatus.COMPLETED]})
+        scheduler = _scheduler(client)
+
+        first, second = await asyncio.gather(
+            scheduler.wait("space", "conv-m1", "m1", timeout=5),
+            scheduler.wait("space", "conv-m1", "m1", timeout=5),
+        )
+
+        self.assertIs(first, second)
+        self.assertEqual(len(client.calls_for("m1")), 2)
+        await scheduler.close()
+
+    async def test_messages_due_together_are_polled_in_one_cycle(self):
+        client = FakeClient({f"m{i}": [MessageStatus.COMPLETED] for i in range(5)})
+        scheduler = _scheduler(client, coalesce_window=0.05)
+
+        await asyncio.gather(*(scheduler.wait("space", f"conv-m{i}", f"m{i}", timeout=5) for i in range(5)))
+
+        self.assertEqual(len(client.calls), 5)
+        self.assertEqual(client.max_in_flight, 5)
+        await scheduler.close()
+
+    async def test_backoff_grows_up_to_max_interval(self):
+        scheduler = _scheduler(FakeClient({}), initial_interval=1.0, max_interval=5.0, backoff_factor=2.0)
+        entry = type("Entry", (), {"attempt": 0, "status": MessageStatus.ASKING_AI})()
+
+        intervals = []
+        for attempt in range(5):
+            entry.attempt = attempt
+            intervals.append(scheduler._next_interval(entry))
+
+        self.assertEqual(intervals, [1.0, 2.0, 4.0, 5.0, 5.0])
+
+    async def test_slow_status_has_a_minimum_interval(self):
+        scheduler = _scheduler(FakeClient({}), initial_interval=1.0, slow_status_interval=3.0)
+        entry = type("Entry", (), {"attempt": 0, "status": MessageStatus.EXECUTING_QUERY})()
+
+        self.assertEqual(scheduler._next_interval(entry), 3.0)
+
+    async def test_rate_limit_pauses_all_polling(self):
+        client = FakeClient({
+            "m1": [GenieAPIError(429, "RATE_LIMITED", "slow down", retry_after=0.2), MessageStatus.COMPLETED],
+            "m2": [MessageStatus.ASKING_AI, MessageStatus.ASKING_AI, MessageStatus.COMPLETED],
+        })
+        scheduler = _scheduler(client)
+
+        await asyncio.gather(
+            scheduler.wait("space", "conv-m1", "m1", timeout=5),
+            scheduler.wait("space", "conv-m2", "m2", timeout=5),
+        )
+
+        limited_at = client.calls_for("m1")[0]
+        after = [at for at, _ in client.calls if at > limited_at + 0.001]
+        self.assertTrue(after)
+        self.assertGreaterEqual(min(after) - limited_at, 0.19)
+        await scheduler.close()
+
+    async def test_retryable_errors_give_up_after_max_errors(self):
+        error = GenieAPIError(503, "UNAVAILABLE", "down")
+        client = FakeClient({"m1": [error]})
+        scheduler = _scheduler(client, max_errors=2)
+
+        with self.assertRaises(GenieAPIError):
+            await scheduler.wait("space", "conv-m1", "m1", timeout=5)
+        self.assertEqual(len(client.calls_for("m1")), 3)
+        await scheduler.close()
+
+    async def test_message_timeout(self):
+        client = FakeClient({"m1": [MessageStatus.ASKING_AI]})
+        scheduler = _scheduler(client)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await scheduler.wait("space", "conv-m1", "m1", timeout=0.1)
+        self.assertEqual(scheduler.pending_count, 0)
+        await scheduler.close()
+
+    async def test_unexpected_error_fails_only_that_message(self):
+        client = FakeClient({
+            "bad": [ValueError("Expecting value: line 1 column 1")],
+            "good": [MessageStatus.ASKING_AI, MessageStatus.COMPLETED],
+        })
+        scheduler = _scheduler(client)
+
+        bad, good = await asyncio.wait_for(
+            asyncio.gather(
+                scheduler.wait("space", "conv-bad", "bad", timeout=3),
+                scheduler.wait("space", "conv-good", "good", timeout=3),
+                return_exceptions=True,
+            ),
+            timeout=2,
+        )
+
+        self.assertIsInstance(bad, ValueError)
+        self.assertEqual(good.status, MessageStatus.COMPLETED)
+        self.assertEqual(scheduler.pending_count, 0)
+
+        # O agendador continua atendendo mensagens novas
+        client.scripts["next"] = [MessageStatus.COMPLETED]
+        message = await asyncio.wait_for(scheduler.wait("space", "conv-next", "next", timeout=3), timeout=2)
+        self.assertEqual(message.status, MessageStatus.COMPLETED)
+        await scheduler.close()
+
+    async def test_close_fails_pending_waiters(self):
+        client = FakeClient({"m1": [MessageStatus.ASKING_AI]})
+        scheduler = _scheduler(client)
+        future = scheduler.watch("space", "conv-m1", "m1", timeout=5)
+
+        await scheduler.close()
+
+        with self.assertRaises(RuntimeError):
+            await future
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""Testes da fila por usuário (UserSingleFlight)"""
+
+import asyncio
+import unittest
+
+from single_flight import UserLaneFull, UserLaneTimeout, UserSingleFlight
+
+
+class UserSingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    async def _run(self, flights, flight, order, delay=0.0, work=0.01, wait_timeout=None):
+        await asyncio.sleep(delay)
+        try:
+            async with flights.run_reserved(flight, wait_timeout):
+                order.append(flight.key)
+                await asyncio.sleep(work)
+        except UserLaneTimeout:
+            order.append(("timeout", flight.key))
+
+    async def test_runs_in_reservation_order_even_if_started_late(self):
+        flights = UserSingleFlight()
+        order = []
+        first = flights.reserve("u", "A")
+        second = flights.reserve("u", "B")
+
+        # A primeira começa depois da segunda, como no modo proativo
+        await asyncio.gather(self._run(flights, first, order, delay=0.05), self._run(flights, second, order))
+
+        self.assertEqual(order, ["A", "B"])
+        self.assertEqual(flights.active_users, 0)
+
+    async def test_users_do_not_wait_for_each_other(self):
+        flights = UserSingleFlight()
+        first = flights.reserve("u1", "A")
+        other_user = flights.reserve("u2", "A")
+        same_user = flights.reserve("u1", "B")
+
+        self.assertTrue(first.turn.done())
+        self.assertTrue(other_user.turn.done())
+        self.assertFalse(same_user.turn.done())
+        self.assertEqual(flights.active_users, 2)
+
+    async def test_identical_resend_joins_the_running_question(self):
+        flights = UserSingleFlight()
+        flight = flights.reserve("u", "pergunta")
+
+        joined = flights.join("u", "pergunta")
+        self.assertIsNotNone(joined)
+        self.assertIsNone(flights.join("u", "outra"))
+        self.assertFalse(joined.done())
+
+        flights.release(flight)
+        await joined
+        self.assertEqual(flights.metrics()["coalesced"], 1)
+
+    async def test_wait_timeout_passes_the_turn_on(self):
+        flights = UserSingleFlight()
+        order = []
+        a, b, c = (flights.reserve("u", key) for key in "ABC")
+
+        await asyncio.gather(
+            self._run(flights, a, order, work=0.2),
+            self._run(flights, b, order, wait_timeout=0.05),
+            self._run(flights, c, order),
+        )
+
+        self.assertEqual(order, ["A", ("timeout", "B"), "C"])
+        self.assertEqual(flights.metrics()["timed_out"], 1)
+
+    async def test_lane_depth_is_capped(self):
+        flights = UserSingleFlight(max_per_user=2)
+        first = flights.reserve("u", "A")
+        flights.reserve("u", "B")
+
+        with self.assertRaises(UserLaneFull):
+            flights.reserve("u", "C")
+        flights.reserve("other", "C")
+
+        flights.release(first)
+        flights.reserve("u", "C")
+        self.assertEqual(flights.metrics()["rejected"], 1)
+
+    async def test_release_is_idempotent(self):
+        flights = UserSingleFlight()
+        flight = flights.reserve("u", "A")
+
+        flights.release(flight)
+        flights.release(flight)
+
+        self.assertEqual(flights.active_users, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()